@@ -0,0 +1,158 @@
+"""
+Admission control for the generation endpoints.
+Each controller caps concurrent generations and holds excess requests in a
+bounded FIFO queue with a deadline; anything beyond that is rejected at once
+with a Retry-After estimate, so latency stays bounded under traffic spikes
+instead of every request slowing down together.
+
+Speculative work (see app/prefetch.py) runs inside `speculative(headroom)`:
+it is admitted only while `headroom` slots would still be free for real
+requests afterwards, and it never waits in the queue.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Iterator, Optional
+
+from .metrics import ADMISSION_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted; carries a Retry-After hint in seconds"""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+_headroom: ContextVar[Optional[int]] = ContextVar("admission_headroom", default=None)
+
+
+@contextmanager
+def speculative(headroom: int) -> Iterator[None]:
+    """Admit generations started in this context (and tasks it spawns) only with `headroom` slots to spare"""
+    token = _headroom.set(headroom)
+    try:
+        yield
+    finally:
+        _headroom.reset(token)
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long an admitted request holds its slot
+        self._service_time = 10.0
+        self._in_flight_gauge = ADMISSION_REQUESTS.labels(name, "in_flight")
+        self._queued_gauge = ADMISSION_REQUESTS.labels(name, "queued")
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _publish(self) -> None:
+        self._in_flight_gauge.set(self.in_flight)
+        self._queued_gauge.set(self.queued)
+
+    def retry_after(self) -> int:
+        waves = (self.queued + 1) / max(self.max_in_flight, 1)
+        return max(1, math.ceil(self._service_time * waves))
+
+    async def acquire(self) -> None:
+        headroom = _headroom.get()
+        if headroom is not None:
+            # Speculative work never queues, so it can't delay a real request
+            if self._waiters or self.in_flight + headroom >= self.max_in_flight:
+                raise Overloaded(self.retry_after(), f"{self.name} has no headroom for speculative work")
+            self.in_flight += 1
+            self._publish()
+            return
+
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            logger.warning(f"{self.name} admission queue full ({self.in_flight} in flight, {self.queued} queued)")
+            raise Overloaded(self.retry_after(), f"{self.name} queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            # The slot is handed over by release(), so in_flight is already counted.
+            # asyncio.timeout rather than wait_for: on 3.11 wait_for swallows a
+            # cancellation that arrives after the slot was handed over.
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot as the deadline passed; take it
+                return
+            self._remove(waiter)
+            logger.warning(f"{self.name} request waited {self.queue_timeout}s without a slot")
+            raise Overloaded(self.retry_after(), f"{self.name} queue deadline exceeded")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we were cancelled; pass it on
+                self.release()
+            else:
+                self._remove(waiter)
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._publish()
+                return
+        self.in_flight -= 1
+        self._publish()
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._publish()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self.release()
+
+
+itinerary_admission = AdmissionController(
+    "itinerary",
+    max_in_flight=int(os.getenv("ITINERARY_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("ITINERARY_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("ITINERARY_QUEUE_TIMEOUT", "15")),
+)
+
+vacation_admission = AdmissionController(
+    "vacation",
+    max_in_flight=int(os.getenv("VACATION_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("VACATION_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("VACATION_QUEUE_TIMEOUT", "15")),
+)
+
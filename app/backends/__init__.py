@@ -0,0 +1,69 @@
+"""
+LLM backends behind the generation pipeline.
+`gemini` calls the Gemini API; `stub` replays canned JSON locally with
+configurable latency, token rate and fault injection, so the service can be
+load-tested on a machine with no network. LLM_BACKEND selects one.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from ..budgets import GenerationBudget
+
+
+class LLMBackend(ABC):
+    """Generates text for a prompt on a named model tier"""
+
+    name = "base"
+    # Whether the service refuses requests when GEMINI_API_KEY is unset
+    requires_api_key = True
+
+    def start(
+        self,
+        api_key: Optional[str],
+        schemas: Iterable[Type[BaseModel]],
+        system_instructions: Iterable[str] = (),
+    ) -> None:
+        """Prepare clients before the first request.
+
+        `schemas` are the common response schemas and `system_instructions`
+        the static instructions most requests are sent with.
+        """
+
+    @abstractmethod
+    async def generate(
+        self,
+        model_name: str,
+        prompt: str,
+        schema: Optional[Type[BaseModel]] = None,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> Any:
+        """Return a response with `.text` (JSON matching `schema` if given) and `.usage_metadata`.
+
+        `budget` limits the output and sets temperature and thinking budget;
+        None leaves the model defaults.
+        """
+
+    @abstractmethod
+    def stream(
+        self,
+        model_name: str,
+        prompt: str,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> AsyncIterator[str]:
+        """Yield the generated text in chunks as it is produced"""
+
+
+def create_backend(name: str, model_names: Sequence[str]) -> LLMBackend:
+    """Build the backend called `name`, serving the given model tiers"""
+    if name == "gemini":
+        from .gemini import GeminiBackend
+        return GeminiBackend(model_names)
+    if name == "stub":
+        from .stub import StubBackend
+        return StubBackend.from_env()
+    raise ValueError(f"LLM_BACKEND must be 'gemini' or 'stub', not {name!r}")
@@ -0,0 +1,384 @@
+"""
+Gemini API backend.
+Model handles are built once per (model tier, response schema, system
+instruction) and share one warmed connection, so a request only pays for the
+call itself. With GEMINI_CONTEXT_CACHE, static system instructions large
+enough for Gemini's context cache are registered with it for the primary
+tier, so its calls are billed and prefilled for the per-request part only.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple, Type
+
+from google.ai import generativelanguage_v1beta as glm
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.auth import exceptions as google_auth_exceptions
+from google.ai.generativelanguage_v1beta.services.generative_service.transports.grpc_asyncio import (
+    GenerativeServiceGrpcAsyncIOTransport,
+)
+from google.generativeai import client as genai_client
+from google.generativeai.types import generation_types
+from google.protobuf import field_mask_pb2
+from pydantic import BaseModel
+
+from . import LLMBackend
+from ..budgets import GenerationBudget
+
+logger = logging.getLogger(__name__)
+
+# "grpc" (async gRPC channel with keepalive) or "rest" (pooled HTTP client run in worker threads)
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc").lower()
+GEMINI_KEEPALIVE_MS = int(os.getenv("GEMINI_KEEPALIVE_MS", "30000"))
+
+# Off by default: the shipped instructions are below the minimum cacheable size
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+# Gemini rejects caches smaller than this; larger tiers may need more (e.g. 2048 or 4096)
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# Lifetime of an upstream cache, in seconds; extended while it is still in use
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Extend a cache once less than this many seconds of its TTL remain
+GEMINI_CONTEXT_CACHE_REFRESH = int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH", "300"))
+# Wait before trying again after a cache could not be created or extended
+GEMINI_CONTEXT_CACHE_RETRY = int(os.getenv("GEMINI_CONTEXT_CACHE_RETRY", "600"))
+# Stop referencing a cache this close to its expiry, so no call races its deletion
+_EXPIRY_MARGIN = 30
+
+# Raised for a cache that has expired or was deleted upstream
+_CACHE_GONE = (google_exceptions.NotFound, google_exceptions.PermissionDenied)
+
+# Older google-ai-generativelanguage releases can't send a thinking budget
+_THINKING_CONFIG = "thinking_config" in glm.GenerationConfig.meta.fields
+
+SAFETY_SETTINGS = {
+    'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+}
+
+
+def _gemini_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    # Inline $refs and keep only the keys Gemini's Schema understands
+    if "$ref" in node:
+        node = defs[node["$ref"].split("/")[-1]]
+    schema: Dict[str, Any] = {"type": node["type"]}
+    if "description" in node:
+        schema["description"] = node["description"]
+    if "properties" in node:
+        schema["properties"] = {k: _gemini_schema(v, defs) for k, v in node["properties"].items()}
+        schema["required"] = list(node.get("required", []))
+    if "items" in node:
+        schema["items"] = _gemini_schema(node["items"], defs)
+    return schema
+
+
+@lru_cache(maxsize=64)
+def json_generation_config(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Build a generation config that constrains output to the given schema.
+
+    The SDK's own pydantic conversion drops `required`, so the JSON schema is
+    converted here, once, instead of on every call.
+    """
+    json_schema = schema.model_json_schema()
+    response_schema = _gemini_schema(json_schema, json_schema.get("$defs", {}))
+    return generation_types.to_generation_config_dict(
+        genai.GenerationConfig(response_mime_type="application/json", response_schema=response_schema)
+    )
+
+
+def call_config(model_name: str, budget: Optional[GenerationBudget]) -> Optional[Dict[str, Any]]:
+    """Per-call generation config overrides for a budget, within the model tier's limits"""
+    if budget is None:
+        return None
+    config: Dict[str, Any] = {"temperature": budget.temperature}
+    # Only 2.5-series tiers think, and earlier ones cap output at 8192 tokens
+    if "2.5" not in model_name:
+        config["max_output_tokens"] = min(budget.output_tokens, 8192)
+    elif _THINKING_CONFIG:
+        config["max_output_tokens"] = min(budget.max_output_tokens, 65536)
+        config["thinking_config"] = {"thinking_budget": budget.thinking_budget}
+    # Otherwise leave the limit unset: thoughts count against max_output_tokens,
+    # and without a thinking budget they could use up the cap and truncate the JSON
+    return config
+
+
+def _keepalive_channel(host: str, **kwargs: Any) -> Any:
+    # Keep the HTTP/2 connection warm between bursts instead of reconnecting
+    kwargs["options"] = list(kwargs.get("options") or []) + [
+        ("grpc.keepalive_time_ms", GEMINI_KEEPALIVE_MS),
+        ("grpc.keepalive_timeout_ms", 10000),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+    ]
+    return GenerativeServiceGrpcAsyncIOTransport.create_channel(host, **kwargs)
+
+
+def _grpc_transport(**kwargs: Any) -> GenerativeServiceGrpcAsyncIOTransport:
+    return GenerativeServiceGrpcAsyncIOTransport(channel=_keepalive_channel, **kwargs)
+
+
+class _BelowMinimum(Exception):
+    """An instruction too small for Gemini to cache"""
+
+
+class _CacheEntry:
+    __slots__ = ("content", "expires_at", "retry_at", "busy")
+
+    def __init__(self):
+        self.content: Optional[glm.CachedContent] = None
+        self.expires_at = 0.0
+        self.retry_at = 0.0
+        self.busy = False
+
+
+class ContextCache:
+    """Upstream context caches for static system instructions, keyed by (model tier, instruction).
+
+    `lookup` never blocks a request: a missing cache is created, and one near
+    its expiry extended, in a worker thread while callers keep sending the
+    instruction inline. Expiry is tracked locally from the TTL, so a cache is
+    dropped before Gemini deletes it. Instructions shorter than `min_tokens`
+    are counted once and then always sent inline.
+    """
+
+    def __init__(
+        self,
+        ttl: int = GEMINI_CONTEXT_CACHE_TTL,
+        refresh: int = GEMINI_CONTEXT_CACHE_REFRESH,
+        retry: int = GEMINI_CONTEXT_CACHE_RETRY,
+        min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    ):
+        self.ttl = ttl
+        self.refresh = refresh
+        self.retry = retry
+        self.min_tokens = min_tokens
+        self._client: Optional[glm.CacheServiceClient] = None
+        self._counter: Optional[glm.GenerativeServiceClient] = None
+        self._entries: Dict[Tuple[str, str], _CacheEntry] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def configure(self, api_key: Optional[str]) -> None:
+        self._entries.clear()
+        if not api_key:
+            # Without a key the clients would look for Application Default Credentials; send instructions inline
+            self._client = self._counter = None
+            return
+        # Clients of its own: the default ones would inherit the async gRPC transport
+        self._client = glm.CacheServiceClient(client_options={"api_key": api_key})
+        self._counter = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def lookup(self, model_name: str, system: str) -> Optional[glm.CachedContent]:
+        """The live cache for this instruction, or None to send it inline"""
+        entry = self._entries.setdefault((model_name, system), _CacheEntry())
+        now = time.monotonic()
+        if entry.content is not None and now >= entry.expires_at - _EXPIRY_MARGIN:
+            entry.content = None
+        if self._client is not None and not entry.busy and now >= entry.retry_at:
+            if entry.content is None:
+                self._schedule(entry, "create", lambda: self._create(model_name, system))
+            elif entry.expires_at - now < self.refresh:
+                name = entry.content.name
+                self._schedule(entry, "extend", lambda: self._extend(name))
+        return entry.content
+
+    def invalidate(self, model_name: str, system: str) -> None:
+        """Forget a cache Gemini no longer has; the next lookup creates a new one"""
+        entry = self._entries.get((model_name, system))
+        if entry is not None:
+            entry.content = None
+
+    def _create(self, model_name: str, system: str) -> glm.CachedContent:
+        model = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        tokens = self._counter.count_tokens(
+            model=model, contents=[glm.Content(parts=[glm.Part(text=system)])], timeout=30
+        ).total_tokens
+        if tokens < self.min_tokens:
+            raise _BelowMinimum(f"{tokens} tokens, below the {self.min_tokens}-token minimum")
+        return self._client.create_cached_content(
+            cached_content=glm.CachedContent(
+                model=model,
+                system_instruction=glm.Content(parts=[glm.Part(text=system)]),
+                ttl=timedelta(seconds=self.ttl),
+            ),
+            timeout=30,
+        )
+
+    def _extend(self, name: str) -> glm.CachedContent:
+        return self._client.update_cached_content(
+            cached_content=glm.CachedContent(name=name, ttl=timedelta(seconds=self.ttl)),
+            update_mask=field_mask_pb2.FieldMask(paths=["ttl"]),
+            timeout=30,
+        )
+
+    def _schedule(self, entry: _CacheEntry, action: str, call: Callable[[], glm.CachedContent]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts); the first call made from one does it
+            return
+        entry.busy = True
+        task = loop.create_task(self._run(entry, action, call))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, entry: _CacheEntry, action: str, call: Callable[[], glm.CachedContent]) -> None:
+        started = time.monotonic()
+        try:
+            content = await asyncio.to_thread(call)
+        except _BelowMinimum as e:
+            logger.info(f"Not caching a system instruction of {e}; sending it inline")
+            entry.retry_at = math.inf
+        except Exception as e:
+            logger.warning(f"Could not {action} Gemini context cache, sending the instruction inline: {e}")
+            entry.retry_at = time.monotonic() + self.retry
+        else:
+            if action == "create":
+                entry.content = content
+                logger.info(f"Created Gemini context cache {content.name} for {content.model}")
+            entry.expires_at = started + self.ttl
+        finally:
+            entry.busy = False
+
+
+class GeminiBackend(LLMBackend):
+    """Long-lived GenerativeModel handles keyed by model tier, response schema and system instruction.
+
+    Safety settings and the JSON generation config are baked into each handle
+    when it is built, so calls don't convert them again, and every handle
+    shares the SDK's single client connection. A handle for a cached system
+    instruction is rebuilt whenever its upstream cache changes.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_names: Sequence[str], transport: str = GEMINI_TRANSPORT, context_cache: bool = GEMINI_CONTEXT_CACHE):
+        if transport not in ("grpc", "rest"):
+            raise ValueError(f"GEMINI_TRANSPORT must be 'grpc' or 'rest', not {transport!r}")
+        self.model_names = [name for name in dict.fromkeys(model_names) if name]
+        self.transport = transport
+        self.context_cache = ContextCache() if context_cache else None
+        self._configured = False
+        # (tier, schema, system) -> (name of the cache the handle uses, handle)
+        self._models: Dict[Tuple[str, Optional[Type[BaseModel]], Optional[str]], Tuple[Optional[str], Any]] = {}
+
+    def configure(self, api_key: Optional[str]) -> None:
+        genai.configure(api_key=api_key, transport=_grpc_transport if self.transport == "grpc" else "rest")
+        if self.context_cache is not None:
+            self.context_cache.configure(api_key)
+        self._models.clear()
+        self._configured = True
+
+    def model(self, model_name: str, schema: Optional[Type[BaseModel]] = None, system: Optional[str] = None) -> Any:
+        if not self._configured:
+            # Used without the app lifespan (scripts, benchmarks)
+            self.configure(os.getenv("GEMINI_API_KEY"))
+        content = None
+        # Only the primary tier takes enough traffic to be worth a cache
+        if system and self.context_cache is not None and model_name == self.model_names[0]:
+            content = self.context_cache.lookup(model_name, system)
+        cache_name = content.name if content is not None else None
+
+        key = (model_name, schema, system)
+        handle = self._models.get(key)
+        if handle is None or handle[0] != cache_name:
+            generation_config = json_generation_config(schema) if schema is not None else None
+            if content is not None:
+                model = genai.GenerativeModel.from_cached_content(
+                    content, generation_config=generation_config, safety_settings=SAFETY_SETTINGS
+                )
+            else:
+                model = genai.GenerativeModel(
+                    model_name,
+                    safety_settings=SAFETY_SETTINGS,
+                    generation_config=generation_config,
+                    system_instruction=system,
+                )
+            handle = self._models[key] = (cache_name, model)
+        return handle[1]
+
+    def start(
+        self,
+        api_key: Optional[str],
+        schemas: Iterable[Type[BaseModel]],
+        system_instructions: Iterable[str] = (),
+    ) -> None:
+        """Configure the client, pre-build handles for every tier, open the connection and start caching instructions"""
+        self.configure(api_key)
+        system_instructions = list(system_instructions)
+        for name in self.model_names:
+            self.model(name)
+            for schema in schemas:
+                self.model(name, schema)
+            for system in system_instructions:
+                # For the primary tier this schedules the upstream cache; handles are rebuilt on it once it exists
+                self.model(name, None, system)
+        logger.info(f"Built {len(self._models)} Gemini model handles over {self.transport}")
+
+        if self.transport == "grpc" and api_key:
+            # Start connecting now so the first request doesn't pay for the TLS handshake.
+            # Best effort: the app must still start (and serve /questions) if this fails
+            try:
+                genai_client.get_default_generative_async_client().transport.grpc_channel.get_state(try_to_connect=True)
+            except google_auth_exceptions.DefaultCredentialsError as e:
+                logger.warning(f"Skipping Gemini connection warm-up: {str(e)}")
+
+    async def _generate(self, model: Any, prompt: str, config: Optional[Dict[str, Any]]) -> Any:
+        if self.transport == "rest":
+            return await asyncio.to_thread(model.generate_content, prompt, generation_config=config)
+        return await model.generate_content_async(prompt, generation_config=config)
+
+    async def generate(
+        self,
+        model_name: str,
+        prompt: str,
+        schema: Optional[Type[BaseModel]] = None,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> Any:
+        model = self.model(model_name, schema, system)
+        config = call_config(model_name, budget)
+        try:
+            return await self._generate(model, prompt, config)
+        except _CACHE_GONE:
+            if model.cached_content is None:
+                raise
+            # The cache expired or was deleted upstream before we noticed
+            self.context_cache.invalidate(model_name, system)
+            return await self._generate(self.model(model_name, schema, system), prompt, config)
+
+    async def stream(
+        self,
+        model_name: str,
+        prompt: str,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> AsyncIterator[str]:
+        model = self.model(model_name, None, system)
+        config = call_config(model_name, budget)
+        try:
+            if self.transport == "rest":
+                response = await asyncio.to_thread(model.generate_content, prompt, generation_config=config, stream=True)
+                chunks = iter(response)
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        return
+                    if chunk.text:
+                        yield chunk.text
+
+            response = await model.generate_content_async(prompt, generation_config=config, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except _CACHE_GONE:
+            # Chunks may already be out, so don't retry; the next request sends the instruction inline
+            if model.cached_content is not None:
+                self.context_cache.invalidate(model_name, system)
+            raise
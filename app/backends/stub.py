@@ -0,0 +1,224 @@
+"""
+Local stub backend for offline benchmarking.
+Replays canned itinerary/vacation JSON shaped to the requested response
+schema. Latency is a fixed time to first token, plus prompt tokens divided
+by a prefill rate, plus output tokens divided by a token rate, and a seeded RNG injects upstream errors and truncated
+(malformed) output at configurable rates, so runs are reproducible.
+With context caching on, a system instruction of at least
+context_cache_min_tokens registered at start (or seen on an earlier call)
+is reported as cached tokens and costs no prefill time, like Gemini's
+context cache. Output longer than a call's budget is cut off
+at it, like a response that hit max_output_tokens. Day plans and outlines
+are fitted to the days the prompt asks for, cycling through the samples.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterable, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from . import LLMBackend
+from ..budgets import GenerationBudget
+from ..data.prompts import estimate_tokens
+from ..data.samples import SAMPLE_CITY_GUIDE, SAMPLE_DAY_OUTLINE, SAMPLE_ITINERARY, SAMPLE_VACATION
+from ..schemas import TripItineraryOutput
+
+# Sources searched, in order, for a value that fits each requested field
+_CANDIDATES = (
+    {"itinerary": SAMPLE_ITINERARY},
+    SAMPLE_ITINERARY,
+    SAMPLE_VACATION,
+    SAMPLE_CITY_GUIDE,
+    {"day_outline": SAMPLE_DAY_OUTLINE},
+)
+
+STREAM_CHUNK_CHARS = 200
+
+# Day windows of a long trip, then whole trips (see app.data.prompts)
+_WINDOW_DAYS = re.compile(r"days (\d+) to (\d+) \((\d{4}-\d{2}-\d{2}) to")
+_TRIP_DAYS = re.compile(r"Duration: (\d+) from (\d{4}-\d{2}-\d{2})")
+
+
+class InjectedError(RuntimeError):
+    """Simulated upstream failure"""
+
+
+@lru_cache(maxsize=64)
+def canned_output(schema: Type[BaseModel]) -> str:
+    """Canned JSON containing every field of `schema` that a sample can fill"""
+    data = {}
+    for name, field in schema.model_fields.items():
+        adapter = TypeAdapter(field.annotation)
+        for candidate in _CANDIDATES:
+            if name not in candidate:
+                continue
+            try:
+                adapter.validate_python(candidate[name])
+            except ValidationError:
+                continue
+            data[name] = candidate[name]
+            break
+    return json.dumps(data, ensure_ascii=False)
+
+
+def requested_days(prompt: str) -> Optional[Tuple[int, int, str]]:
+    """(first day, last day, date of the first day) the prompt asks for, if it says"""
+    match = _WINDOW_DAYS.search(prompt)
+    if match:
+        return int(match[1]), int(match[2]), match[3]
+    match = _TRIP_DAYS.search(prompt)
+    if match:
+        return 1, int(match[1]) + 1, match[2]
+    return None
+
+
+def fit_days(text: str, days: Optional[Tuple[int, int, str]]) -> str:
+    """Resize the day lists in canned JSON to the requested days"""
+    if days is None:
+        return text
+    first, last, start_date = days
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    data = json.loads(text)
+    for holder in (data, data.get("itinerary")):
+        if not isinstance(holder, dict):
+            continue
+        for key in ("daily_itinerary", "day_outline"):
+            samples = holder.get(key)
+            if samples:
+                holder[key] = [
+                    dict(
+                        samples[(number - first) % len(samples)],
+                        day_number=number,
+                        date=(start + timedelta(days=number - first)).strftime("%Y-%m-%d"),
+                    )
+                    for number in range(first, last + 1)
+                ]
+    return json.dumps(data, ensure_ascii=False)
+
+
+class StubBackend(LLMBackend):
+    name = "stub"
+    requires_api_key = False
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        tokens_per_second: float = 0.0,
+        prefill_tokens_per_second: float = 0.0,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        context_cache: bool = True,
+        context_cache_min_tokens: int = 1024,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        # 0 returns the whole output as soon as the first token would arrive
+        self.tokens_per_second = tokens_per_second
+        # 0 makes the prompt length free
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.context_cache = context_cache
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self._cached: Set[str] = set()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "StubBackend":
+        seed = os.getenv("STUB_SEED", "0")
+        return cls(
+            latency=float(os.getenv("STUB_LATENCY", "0.5")),
+            tokens_per_second=float(os.getenv("STUB_TOKENS_PER_SECOND", "0")),
+            prefill_tokens_per_second=float(os.getenv("STUB_PREFILL_TOKENS_PER_SECOND", "0")),
+            error_rate=float(os.getenv("STUB_ERROR_RATE", "0")),
+            malformed_rate=float(os.getenv("STUB_MALFORMED_RATE", "0")),
+            context_cache=os.getenv("STUB_CONTEXT_CACHE", "true").lower() in ("1", "true", "yes"),
+            context_cache_min_tokens=int(os.getenv("STUB_CONTEXT_CACHE_MIN_TOKENS", "1024")),
+            seed=int(seed) if seed else None,
+        )
+
+    def _output(
+        self, schema: Optional[Type[BaseModel]], budget: Optional[GenerationBudget] = None, prompt: str = ""
+    ) -> str:
+        if self._random.random() < self.error_rate:
+            raise InjectedError("Injected stub backend error")
+        text = fit_days(canned_output(schema or TripItineraryOutput), requested_days(prompt))
+        if self._random.random() < self.malformed_rate:
+            # Cut the JSON off part way, like a response that ran out of output tokens
+            text = text[:int(len(text) * self._random.uniform(0.5, 0.95))]
+        if budget is not None and estimate_tokens(text) > budget.output_tokens:
+            text = text[:budget.output_tokens * 4]
+        return text
+
+    def _generation_time(self, text: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return estimate_tokens(text) / self.tokens_per_second
+
+    def start(self, api_key: Optional[str], schemas: Iterable[Type[BaseModel]], system_instructions: Iterable[str] = ()) -> None:
+        if self.context_cache:
+            self._cached.update(s for s in system_instructions if self._cacheable(s))
+
+    def _cacheable(self, system: str) -> bool:
+        return estimate_tokens(system) >= self.context_cache_min_tokens
+
+    def _prompt_tokens(self, prompt: str, system: Optional[str]) -> Tuple[int, int]:
+        """(total, cached) prompt tokens; caches `system` for later calls"""
+        if not system:
+            return estimate_tokens(prompt), 0
+        total = estimate_tokens(system) + estimate_tokens(prompt)
+        if not self.context_cache or not self._cacheable(system):
+            return total, 0
+        if system not in self._cached:
+            self._cached.add(system)
+            return total, 0
+        return total, estimate_tokens(system)
+
+    def _first_token_time(self, prompt_tokens: int) -> float:
+        if self.prefill_tokens_per_second <= 0:
+            return self.latency
+        return self.latency + prompt_tokens / self.prefill_tokens_per_second
+
+    async def generate(
+        self,
+        model_name: str,
+        prompt: str,
+        schema: Optional[Type[BaseModel]] = None,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> Any:
+        prompt_tokens, cached_tokens = self._prompt_tokens(prompt, system)
+        await asyncio.sleep(self._first_token_time(prompt_tokens - cached_tokens))
+        text = self._output(schema, budget, prompt)
+        await asyncio.sleep(self._generation_time(text))
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=cached_tokens,
+                candidates_token_count=estimate_tokens(text),
+                total_token_count=prompt_tokens + estimate_tokens(text),
+            ),
+        )
+
+    async def stream(
+        self,
+        model_name: str,
+        prompt: str,
+        system: Optional[str] = None,
+        budget: Optional[GenerationBudget] = None,
+    ) -> AsyncIterator[str]:
+        prompt_tokens, cached_tokens = self._prompt_tokens(prompt, system)
+        await asyncio.sleep(self._first_token_time(prompt_tokens - cached_tokens))
+        text = self._output(None, budget, prompt)
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            chunk = text[start:start + STREAM_CHUNK_CHARS]
+            await asyncio.sleep(self._generation_time(chunk))
+            yield chunk
@@ -0,0 +1,193 @@
+"""
+Generation budgets scaled to the size of the requested output.
+A 2-day, one-city itinerary and a 30-day, five-city one differ by an order
+of magnitude in output length, so every itinerary and vacation call derives
+max_output_tokens, temperature and thinking budget from the size of what it
+produces through a per-pipeline profile: the whole trip for single-shot and
+streamed itineraries, and the skeleton, each day window and the city guides
+for sectioned ones.
+
+Profiles are linear: base + per day + per destination, capped. Override any
+field with GENERATION_PROFILES, a JSON object such as
+'{"itinerary": {"tokens_per_day": 450, "max_thinking": 4096}}'. Every call
+records the share of its output budget it used
+(trip_planner_output_budget_used_ratio) and logs the raw numbers, which is
+what the profiles are tuned from.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict
+
+from .metrics import OUTPUT_BUDGET_USED
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetProfile:
+    """Output-token and thinking budgets for one pipeline as a function of trip size"""
+
+    FIELDS = (
+        "base_tokens",
+        "tokens_per_day",
+        "tokens_per_destination",
+        "max_tokens",
+        "default_days",
+        "thinking_base",
+        "thinking_per_destination",
+        "max_thinking",
+        "temperature",
+        "long_output_tokens",
+        "long_temperature",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, **fields: Any):
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown budget profile fields: {', '.join(sorted(unknown))}")
+        for name in self.FIELDS:
+            setattr(self, name, fields[name])
+
+    def budget(self, pipeline: str, days: int, destinations: int) -> "GenerationBudget":
+        # Trips without dates are budgeted as a typical trip
+        days = days if days > 0 else self.default_days
+        destinations = max(1, destinations)
+        output_tokens = min(
+            self.max_tokens,
+            self.base_tokens + self.tokens_per_day * days + self.tokens_per_destination * destinations,
+        )
+        thinking_budget = min(self.max_thinking, self.thinking_base + self.thinking_per_destination * destinations)
+        # Long JSON documents are sampled cooler so they stay well-formed to the end
+        temperature = self.long_temperature if output_tokens >= self.long_output_tokens else self.temperature
+        return GenerationBudget(pipeline, days, destinations, output_tokens, thinking_budget, temperature)
+
+
+class GenerationBudget:
+    """Generation settings for one call, and the trip size they were derived from"""
+
+    __slots__ = ("pipeline", "days", "destinations", "output_tokens", "thinking_budget", "temperature")
+
+    def __init__(self, pipeline: str, days: int, destinations: int, output_tokens: int, thinking_budget: int, temperature: float):
+        self.pipeline = pipeline
+        self.days = days
+        self.destinations = destinations
+        self.output_tokens = output_tokens
+        self.thinking_budget = thinking_budget
+        self.temperature = temperature
+
+    @property
+    def max_output_tokens(self) -> int:
+        # Thinking models count thoughts against max_output_tokens
+        return self.output_tokens + self.thinking_budget
+
+    def record(self, response: Any) -> None:
+        """Record how much of the output budget a response used"""
+        usage = getattr(response, "usage_metadata", None)
+        self.record_tokens(getattr(usage, "candidates_token_count", 0) or 0)
+
+    def record_tokens(self, used: int) -> None:
+        """Record `used` output tokens against the budget"""
+        if not used:
+            return
+        OUTPUT_BUDGET_USED.labels(self.pipeline).observe(used / self.output_tokens)
+        logger.info(
+            f"{self.pipeline} output budget: used {used}/{self.output_tokens} tokens "
+            f"for {self.days} days, {self.destinations} destinations"
+        )
+
+
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Per day: title and a several-sentence description. Per destination:
+    # 3 hotels and 3 restaurants with full addresses, and 3-5 hidden gems
+    "itinerary": {
+        "base_tokens": 800,
+        "tokens_per_day": 350,
+        "tokens_per_destination": 700,
+        "max_tokens": 32768,
+        "default_days": 7,
+        "thinking_base": 1024,
+        "thinking_per_destination": 512,
+        "max_thinking": 8192,
+        "temperature": 0.7,
+        "long_output_tokens": 8192,
+        "long_temperature": 0.4,
+    },
+    # Sectioned itineraries. Skeleton: summary, costs and a one-line outline per day
+    "itinerary_skeleton": {
+        "base_tokens": 600,
+        "tokens_per_day": 60,
+        "tokens_per_destination": 100,
+        "max_tokens": 8192,
+        "default_days": 7,
+        "thinking_base": 1024,
+        "thinking_per_destination": 256,
+        "max_thinking": 4096,
+        "temperature": 0.7,
+        "long_output_tokens": 8192,
+        "long_temperature": 0.4,
+    },
+    # The day plans of one window (or a short trip's core sections)
+    "itinerary_days": {
+        "base_tokens": 400,
+        "tokens_per_day": 350,
+        "tokens_per_destination": 0,
+        "max_tokens": 16384,
+        "default_days": 7,
+        "thinking_base": 512,
+        "thinking_per_destination": 0,
+        "max_thinking": 2048,
+        "temperature": 0.7,
+        "long_output_tokens": 8192,
+        "long_temperature": 0.4,
+    },
+    # Accommodation, dining and hidden gems for one or more cities
+    "city_guide": {
+        "base_tokens": 200,
+        "tokens_per_day": 0,
+        "tokens_per_destination": 700,
+        "max_tokens": 16384,
+        "default_days": 7,
+        "thinking_base": 512,
+        "thinking_per_destination": 256,
+        "max_thinking": 4096,
+        "temperature": 0.7,
+        "long_output_tokens": 8192,
+        "long_temperature": 0.4,
+    },
+    # Always 5 recommendations; the trip length barely changes them
+    "vacation": {
+        "base_tokens": 1000,
+        "tokens_per_day": 0,
+        "tokens_per_destination": 900,
+        "max_tokens": 16384,
+        "default_days": 7,
+        "thinking_base": 2048,
+        "thinking_per_destination": 0,
+        "max_thinking": 4096,
+        "temperature": 0.9,
+        "long_output_tokens": 16384,
+        "long_temperature": 0.9,
+    },
+}
+
+
+def load_profiles(overrides: str = "") -> Dict[str, BudgetProfile]:
+    """Build the profiles from the defaults and a JSON object of per-pipeline overrides"""
+    custom = json.loads(overrides) if overrides else {}
+    unknown = set(custom) - set(DEFAULT_PROFILES)
+    if unknown:
+        raise ValueError(f"GENERATION_PROFILES has unknown pipelines: {', '.join(sorted(unknown))}")
+    return {
+        pipeline: BudgetProfile(**{**defaults, **custom.get(pipeline, {})})
+        for pipeline, defaults in DEFAULT_PROFILES.items()
+    }
+
+
+PROFILES = load_profiles(os.getenv("GENERATION_PROFILES", ""))
+
+
+def budget_for(pipeline: str, days: int, destinations: int) -> GenerationBudget:
+    """Generation settings for a call producing `days` days across `destinations` destinations"""
+    return PROFILES[pipeline].budget(pipeline, days, destinations)
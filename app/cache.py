@@ -0,0 +1,195 @@
+"""
+Result cache for generated itineraries and vacation recommendations.
+Entries are keyed on a canonical hash of the sanitized answers, so submissions
+that differ only in list order, letter case or whitespace share one entry.
+
+Lookups go through a per-process TTL+LRU cache first and then a SQLite file
+shared by every worker on the host, so results survive deploys and a result
+generated by one worker can be served by another.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from . import fastjson
+from .sqlite import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_MAXSIZE = int(os.getenv("RESULT_CACHE_MAXSIZE", "512"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+
+# Shared on-disk cache; set RESULT_CACHE_DB to an empty string to disable it
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", ".cache/results.sqlite3")
+RESULT_CACHE_DB_TTL = int(os.getenv("RESULT_CACHE_DB_TTL", "86400"))
+RESULT_CACHE_DB_MAX_BYTES = int(os.getenv("RESULT_CACHE_DB_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# TTLCache evicts least recently used entries once maxsize is reached
+result_cache: TTLCache = TTLCache(maxsize=RESULT_CACHE_MAXSIZE, ttl=RESULT_CACHE_TTL)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().lower()
+    if isinstance(value, (list, tuple)):
+        return sorted(_normalize(v) for v in value if v is not None)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def make_cache_key(kind: str, sanitized_answers: Dict[str, Any]) -> str:
+    """Build a canonical cache key for a generation request"""
+    canonical = json.dumps(_normalize(sanitized_answers), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class DiskCache:
+    """SQLite-backed cache of zlib-compressed JSON, safe to share between processes.
+
+    WAL mode lets every worker read while one writes. Expired rows and the
+    least recently used rows beyond `max_bytes` are evicted periodically.
+    A hit only records its access time once per TOUCH_INTERVAL, so reads
+    don't queue behind the single writer.
+    """
+
+    EVICT_EVERY = 50
+    TOUCH_INTERVAL = 300
+
+    def __init__(self, path: str, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self.db = SQLiteDatabase(path, (
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)",
+        ))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self.db.connect()
+        row = conn.execute("SELECT value, accessed_at FROM results WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        if row is None:
+            return None
+        value, accessed_at = row
+        if now - accessed_at >= self.TOUCH_INTERVAL:
+            self._touch(conn, key, now)
+        return fastjson.loads(zlib.decompress(value))
+
+    def _touch(self, conn: sqlite3.Connection, key: str, now: float) -> None:
+        # Recency only steers eviction, so skip it rather than wait for another writer
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Skipped disk cache access time update: {str(e)}")
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {SQLiteDatabase.BUSY_TIMEOUT_MS}")
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        blob = zlib.compress(fastjson.dumps(value))
+        self.db.connect().execute(
+            "INSERT OR REPLACE INTO results (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), now + self.ttl, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def recent(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """Most recently used live entries, for warming a fresh worker"""
+        rows = self.db.connect().execute(
+            "SELECT key, value FROM results WHERE expires_at > ? ORDER BY accessed_at DESC LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [(key, fastjson.loads(zlib.decompress(value))) for key, value in rows]
+
+    def evict(self) -> int:
+        """Drop expired rows, then the least recently used ones until under the size cap"""
+        conn = self.db.connect()
+        removed = conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total > self.max_bytes:
+            # Free down to 90% of the cap so eviction doesn't run on every write
+            target = total - int(self.max_bytes * 0.9)
+            stale: List[str] = []
+            freed = 0
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed_at"):
+                stale.append(key)
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM results WHERE key = ?", [(key,) for key in stale])
+            removed += len(stale)
+        return removed
+
+
+disk_cache: Optional[DiskCache] = None
+if RESULT_CACHE_DB:
+    try:
+        disk_cache = DiskCache(RESULT_CACHE_DB, RESULT_CACHE_DB_TTL, RESULT_CACHE_DB_MAX_BYTES)
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Disk result cache disabled: {str(e)}")
+
+
+async def get_cached_result(key: str) -> Optional[Dict[str, Any]]:
+    """Look a result up in memory, then in the shared disk cache"""
+    value = result_cache.get(key)
+    if value is not None or disk_cache is None:
+        return value
+    try:
+        value = await asyncio.to_thread(disk_cache.get, key)
+    except sqlite3.Error as e:
+        logger.warning(f"Disk cache read failed: {str(e)}")
+        return None
+    if value is not None:
+        result_cache[key] = value
+    return value
+
+
+async def store_result(key: str, value: Dict[str, Any]) -> None:
+    """Store a result in memory and in the shared disk cache"""
+    result_cache[key] = value
+    if disk_cache is None:
+        return
+    try:
+        await asyncio.to_thread(disk_cache.set, key, value)
+    except sqlite3.Error as e:
+        logger.warning(f"Disk cache write failed: {str(e)}")
+
+
+async def warm_result_cache() -> int:
+    """Preload the most recently used disk entries into the in-process cache"""
+    if disk_cache is None:
+        return 0
+    try:
+        entries = await asyncio.to_thread(disk_cache.recent, RESULT_CACHE_MAXSIZE)
+    except sqlite3.Error as e:
+        logger.warning(f"Disk cache warm-up failed: {str(e)}")
+        return 0
+    # Insert oldest first so the most recently used end up freshest in the LRU
+    for key, value in reversed(entries):
+        result_cache[key] = value
+    return len(entries)
@@ -0,0 +1,81 @@
+"""
+Chunked generation of daily_itinerary for long trips.
+A small skeleton call first outlines every day of the trip; the full day
+plans are then generated concurrently in fixed-size day windows that share
+that outline for continuity, and stitched back together in order.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+# Days per window; trips no longer than this are generated in one piece.
+# Set to 0 to disable chunking.
+CHUNK_DAYS = int(os.getenv("ITINERARY_CHUNK_DAYS", "7"))
+
+
+def trip_days(sanitized_answers: Dict[str, Any]) -> int:
+    """Number of calendar days covered by the trip, including both ends"""
+    duration = sanitized_answers.get("duration")
+    return duration + 1 if isinstance(duration, int) and duration >= 0 else 0
+
+
+def needs_chunking(sanitized_answers: Dict[str, Any], chunk_days: Optional[int] = None) -> bool:
+    chunk_days = CHUNK_DAYS if chunk_days is None else chunk_days
+    return chunk_days > 0 and trip_days(sanitized_answers) > chunk_days
+
+
+def day_windows(total_days: int, chunk_days: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split days 1..total_days into inclusive (first, last) windows"""
+    chunk_days = CHUNK_DAYS if chunk_days is None else chunk_days
+    return [(first, min(first + chunk_days - 1, total_days)) for first in range(1, total_days + 1, chunk_days)]
+
+
+def window_dates(start_date: str, first_day: int, last_day: int) -> Tuple[str, str]:
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    return (
+        (start + timedelta(days=first_day - 1)).strftime("%Y-%m-%d"),
+        (start + timedelta(days=last_day - 1)).strftime("%Y-%m-%d"),
+    )
+
+
+def format_outline(outline: List[Dict[str, Any]]) -> str:
+    """Render the skeleton's day outline as compact prompt lines"""
+    return "\n".join(
+        f"- Day {day.get('day_number')} ({day.get('date')}, {day.get('city')}): {day.get('title')}"
+        for day in outline
+    )
+
+
+def complete_days(days: List[Dict[str, Any]], total_days: int) -> bool:
+    """Whether `days` covers exactly day 1..total_days, in order; trips without dates always pass"""
+    if total_days <= 0:
+        return True
+    return [day.get("day_number") for day in days] == list(range(1, total_days + 1))
+
+
+def missing_windows(windows: List[Tuple[Tuple[int, int], Optional[List[Dict[str, Any]]]]]) -> List[Tuple[int, int]]:
+    """Windows whose day plans don't cover every one of their days"""
+    missing = []
+    for (first, last), plans in windows:
+        numbers = {day.get("day_number") for day in plans or [] if isinstance(day, dict)}
+        if not numbers.issuperset(range(first, last + 1)):
+            missing.append((first, last))
+    return missing
+
+
+def stitch_days(windows: List[Tuple[Tuple[int, int], Optional[List[Dict[str, Any]]]]], total_days: int) -> Optional[List[Dict[str, Any]]]:
+    """Merge per-window day plans into one ordered daily_itinerary.
+
+    Returns None when any day is missing, so the caller can regenerate it.
+    """
+    days: Dict[int, Dict[str, Any]] = {}
+    for (first, last), plans in windows:
+        for day in plans or []:
+            number = day.get("day_number")
+            if isinstance(number, int) and first <= number <= last and number not in days:
+                days[number] = day
+
+    if len(days) < total_days:
+        return None
+    return [days[number] for number in sorted(days)]
@@ -1,5 +1,32 @@
-def create_trip_prompt(sanitized_answers: dict) -> str:
-    """Create a detailed, optimized prompt for Gemini AI"""
+import os
+from typing import Optional
+
+from ..schemas import TripItineraryOutput, VacationOutput, schema_sketch
+
+# "full" sends the original annotated JSON example; "compact" sends a one-line
+# outline of the response schema and deduplicated rules instead
+PROMPT_VARIANT = os.getenv("PROMPT_VARIANT", "full")
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token count (about 4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+class PromptTemplate:
+    """A prompt split into a static system instruction and a per-request user part.
+
+    The system instruction (persona, output format and requirements) is the
+    same for every request, so backends can send it once as a cached system
+    instruction; only the preferences block is formatted on each call.
+    """
+
+    __slots__ = ("system", "static_tokens")
+
+    def __init__(self, system: str):
+        self.system = system.strip()
+        self.static_tokens = estimate_tokens(self.system)
+
+def _trip_preferences(sanitized_answers: dict) -> str:
+    """Format the trip specifications and traveler details block"""
     travel_style_str = ", ".join(sanitized_answers["travel_style"])
     accommodation_str = ", ".join(sanitized_answers["accommodation"])
     interests_str = ", ".join(sanitized_answers["interests"])
@@ -9,10 +36,7 @@ def create_trip_prompt(sanitized_answers: dict) -> str:
     if sanitized_answers["start_date"]:
         date_info = f"from {sanitized_answers['start_date']} to {sanitized_answers['end_date']}"
 
-    prompt = f"""
-As an expert travel planner with 20+ years of experience, create a highly personalized and detailed travel itinerary based on the following preferences. Your response must be a valid JSON object in the exact format specified below.
-
-**Trip Specifications:**
+    return f"""**Trip Specifications:**
 - Starting Location: {sanitized_answers["start_location"]}
 - Destinations: {sanitized_answers["destinations"]} 
 - Duration: {sanitized_answers["duration"]} {date_info}
@@ -26,59 +50,64 @@ As an expert travel planner with 20+ years of experience, create a highly person
 - Transportation Preferences: {sanitized_answers["transportation"]}
 - Interests: {interests_str}
 - Dietary Restrictions: {dietary_str}
-- Special Requirements: {sanitized_answers["special_requirements"]}
+- Special Requirements: {sanitized_answers["special_requirements"]}"""
+
+TRIP_PROMPTS = {
+    "full": PromptTemplate(
+        """
+As an expert travel planner with 20+ years of experience, create a highly personalized and detailed travel itinerary based on the preferences in the user message. Your response must be a valid JSON object in the exact format specified below.
 
 **Output Format:**
 You must return a valid JSON object with exactly this structure:
-{{
-    itinerary: {{
+{
+    "itinerary": {
         "summary": "Brief engaging overview of the trip",
         "destinations": [ "destination1", "destination2", "destination3" ],
-        "trip_duration": {{
+        "trip_duration": {
             "start_date": "YYYY-MM-DD",
             "end_date": "YYYY-MM-DD",
-            "total_days": 7,
-        }},
+            "total_days": 7
+        },
         "daily_itinerary": [
-            {{
+            {
                 "day_number": 1,
                 "date": "YYYY-MM-DD",
                 "title": "Day Title",
-                "description": "Detailed description of the day's activities",
-            }},
-            {{
+                "description": "Detailed description of the day's activities"
+            },
+            {
                 "day_number": 2,
                 "date": "YYYY-MM-DD",
                 "title": "Day Title",
-                "description": "Detailed description of the day's activities",
-            }},
+                "description": "Detailed description of the day's activities"
+            }
         ],
-        "accommodation": [{{
+        "accommodation": [{
             "city": "City name",
             "recommendations": [
-            {{
+            {
                 "name": "Hotel/Hostel Name",
-                "address": "Full address including street, city, state, zip code",
-            }}
+                "address": "Full address including street, city, state, zip code"
+            }
             ]
-        }}],
-        "dining": [{{
+        }],
+        "dining": [{
             "city": "City name",
             "recommendations": [
-            {{
+            {
                 "name": "Restaurant Name",
-                "address": "Full address including street, city, state, zip code",
-            }}
+                "address": "Full address including street, city, state, zip code"
+            }
             ]
-        }}],
+        }],
         "hidden_gems": ["Hidden gem 1", "Hidden gem 2", "Hidden gem 3"],
-        "estimated_costs": {{
+        "estimated_costs": {
             "currency": "departure location currency",
             "minimum_total": 1000,
-            "maximum_total": 2000,
-        }}
-    }},
-}}
+            "maximum_total": 2000
+        }
+    }
+}
 
 Important Requirements:
 1. The response MUST be a valid JSON object. Return the JSON in a single line.
@@ -94,21 +123,56 @@ Important Requirements:
 11. For dining and accommodation, provide 3 recommendations per city with full addresses
 12. Ensure the daily itinerary is well-paced and considers travel time between activities
 13. The start location is only for current location context, not part of the itinerary
-"""
-    return prompt
+""",
+    ),
+    "compact": PromptTemplate(
+        f"""
+As an expert travel planner, create a personalized, detailed itinerary for the trip in the user message.
+
+Return one JSON object in this shape:
+{schema_sketch(TripItineraryOutput)}
+
+Rules:
+1. Costs use the departure location's currency code, never symbols, and respect the budget
+2. Dates are YYYY-MM-DD; every array has at least one item; no placeholder values
+3. For each destination: 3 accommodation and 3 dining recommendations with full addresses, and 3-5 hidden gems
+4. Pace each day sensibly, allowing travel time between activities
+5. The start location is only for current location context, not part of the itinerary
+""",
+    ),
+}
+
+def trip_system_instruction(variant: Optional[str] = None) -> str:
+    """Static instructions for itinerary generation, sent as the system instruction"""
+    return TRIP_PROMPTS[variant or PROMPT_VARIANT].system
+
+def create_trip_prompt(sanitized_answers: dict) -> str:
+    """Create the per-request part of the itinerary prompt (see trip_system_instruction).
 
-def create_vacation_prompt(sanitized_answers: dict) -> str:
-    """Create a prompt to get vacation destination recommendations based on user preferences"""
-    
+    The preferences block is the same for both prompt variants; only the
+    system instruction differs.
+    """
+    return _trip_preferences(sanitized_answers)
+
+def _vacation_preferences(sanitized_answers: dict, compact: bool = False) -> str:
+    """Format the traveler preferences block for vacation recommendations"""
     # Format the dates if provided
     date_info = ""
     if sanitized_answers.get("start_date") and sanitized_answers.get("end_date"):
         date_info = f"from {sanitized_answers['start_date']} to {sanitized_answers['end_date']}"
 
-    prompt = f"""
-As an expert travel consultant with extensive global experience, provide personalized vacation destination recommendations based on the following preferences. Focus on creating practical, well-matched suggestions that align with the traveler's interests and constraints.
+    if compact:
+        return f"""**Traveler Preferences:**
+- Vacation Style: {", ".join(sanitized_answers["vacation_style"])}
+- Departure Location: {sanitized_answers["departure_location"]}
+- Travel Dates: {date_info}
+- Vacation Budget: {sanitized_answers["budget"]}
+- Preferred Destination Region/Country: {sanitized_answers.get("preferred_region", "Open to all regions")}
+- Visa Flexibility: {sanitized_answers.get("visa_flexibility", "Any")}
+- Special Requirements: {sanitized_answers["special_requirements"]}
+- Group Size: {sanitized_answers["group_size"]}"""
 
-**Traveler Preferences:**
+    return f"""**Traveler Preferences:**
 - Vacation Style: {sanitized_answers["vacation_style"]}  # e.g., beach, adventure, mountains, cultural
 - Departure Location: {sanitized_answers["departure_location"]}
 - Travel Dates: {date_info}
@@ -116,7 +180,12 @@ As an expert travel consultant with extensive global experience, provide persona
 - Preferred Destination Region/Country: {sanitized_answers.get("preferred_region", "Open to all regions")}
 - Visa Flexibility: {sanitized_answers.get("visa_flexibility", "Any")}  
 - Special Requirements: {sanitized_answers["special_requirements"]}
-- Group Size: {sanitized_answers["group_size"]}
+- Group Size: {sanitized_answers["group_size"]}"""
+
+VACATION_PROMPTS = {
+    "full": PromptTemplate(
+        """
+As an expert travel consultant with extensive global experience, provide personalized vacation destination recommendations based on the preferences in the user message. Focus on creating practical, well-matched suggestions that align with the traveler's interests and constraints.
 
 **Requirements for Recommendations:**
 1. Provide exactly 5 best-matched destinations
@@ -133,70 +202,70 @@ As an expert travel consultant with extensive global experience, provide persona
 
 **Output Format:**
 Return the recommendations in valid JSON format with this structure:
-{{
+{
     "summary": "Brief engaging overview of the trip",
     "recommendations": [
-        {{
-            "destination": {{
+        {
+            "destination": {
                 "country": "Country name",
                 "region": "Specific region/city",
                 "match_score": 95  # 0-100 score based on preference match
-            }},
+            },
             "why_perfect_match": "Detailed explanation of why this matches their preferences",
-            "costs": {{
+            "costs": {
                 "currency": "departure location currency",
                 "total_per_person": 2000,
-                "breakdown": {{
+                "breakdown": {
                     "accommodation": 800,
                     "food": 400,
                     "activities": 500,
                     "transportation": 300
-                }}
-            }},
-            "visa_requirements": {{
+                }
+            },
+            "visa_requirements": {
                 "type": "visa-free/visa-on-arrival/e-visa/embassy-visa",
                 "processing_time": "X business days",
                 "cost": "departure location currency XX",
                 "requirements": ["requirement1", "requirement2"]
-            }},
-            "best_time_to_visit": {{
+            },
+            "best_time_to_visit": {
                 "peak_season": ["Month1", "Month2"],
                 "shoulder_season": ["Month3", "Month4"],
                 "weather": "Description of weather during requested dates"
-            }},
-            "transportation": {{
+            },
+            "transportation": {
                 "score": 8,
                 "explanation": "Detailed explanation of public transport system",
                 "main_options": ["option1", "option2"]
-            }},
-            "safety": {{
+            },
+            "safety": {
                 "score": 9,
                 "explanation": "Safety assessment explanation",
                 "special_considerations": ["consideration1", "consideration2"]
-            }},
+            },
             "must_do_activities": [
-                {{
+                {
                     "name": "Activity name",
                     "description": "Brief description",
                     "estimated_cost": "departure location currency XX"
-                }}
+                }
             ],
-            "recommended_duration": {{
+            "recommended_duration": {
                 "minimum_days": 5,
                 "optimal_days": 7,
                 "explanation": "Why this duration is recommended"
-            }}
-        }}
+            }
+        }
     ],
-    "meta": {{
+    "meta": {
         "currency": "departure location currency",
-        "search_criteria": {{
+        "search_criteria": {
             "vacation_style": "User's input style",
             "budget_range": "User's input budget",
             "dates": "User's input dates"
-        }}
-    }}
-}}
+        }
+    }
+}
 
 Important notes:
 - All costs should be in departure location currency with currency symbols
@@ -206,5 +275,127 @@ Important notes:
 - Recommendations should respect budget constraints
 - The output must be valid JSON in the exact format specified above
 - Use currency code for the currency of the departure location. Do not use symbols.
+""",
+    ),
+    "compact": PromptTemplate(
+        f"""
+As an expert travel consultant, recommend vacation destinations that match the preferences in the user message.
+
+Return one JSON object in this shape:
+{schema_sketch(VacationOutput)}
+
+Rules:
+1. Exactly 5 recommendations, each naming a specific region or city
+2. Costs are per person, in the departure location's currency code (no symbols), and respect the budget
+3. Visa requirements must be current and specific to the departure location
+4. Transportation scores cover local and inter-city options; safety scores reflect current conditions
+5. must_do_activities holds the top 3 activities
+""",
+    ),
+}
+
+if PROMPT_VARIANT not in TRIP_PROMPTS:
+    raise ValueError(f"PROMPT_VARIANT must be 'full' or 'compact', not {PROMPT_VARIANT!r}")
+
+def vacation_system_instruction(variant: Optional[str] = None) -> str:
+    """Static instructions for vacation recommendations, sent as the system instruction"""
+    return VACATION_PROMPTS[variant or PROMPT_VARIANT].system
+
+def create_vacation_prompt(sanitized_answers: dict, variant: Optional[str] = None) -> str:
+    """Create the per-request part of the vacation prompt (see vacation_system_instruction)"""
+    return _vacation_preferences(sanitized_answers, compact=(variant or PROMPT_VARIANT) == "compact")
+
+def create_trip_sections_prompt(sanitized_answers: dict, sections: list, existing: dict) -> str:
+    """Create a short follow-up prompt that asks only for the missing itinerary sections"""
+    overview = f"\nTrip overview already planned: {existing['summary']}\n" if isinstance(existing.get("summary"), str) else ""
+
+    prompt = f"""
+As an expert travel planner, complete part of a travel itinerary for the trip below. Return a valid JSON object containing only these keys: {", ".join(sections)}.
+
+{_trip_preferences(sanitized_answers)}
+{overview}
+Important Requirements:
+1. Follow the response schema exactly and fill every field
+2. All dates must be in YYYY-MM-DD format
+3. Use currency code for the currency of the departure location. Do not use symbols.
+4. For dining and accommodation, provide 3 recommendations per city with full addresses
+5. Include 3-5 hidden gems or off-the-beaten-path suggestions for each destination
+6. Ensure the daily itinerary is well-paced and considers travel time between activities
+7. The start location is only for current location context, not part of the itinerary
+"""
+    return prompt
+
+def create_city_guide_prompt(sanitized_answers: dict, city: str) -> str:
+    """Create a small prompt for one city's accommodation, dining and hidden gems"""
+    accommodation_str = ", ".join(sanitized_answers["accommodation"])
+    dietary_str = ", ".join(sanitized_answers["dietary_restrictions"]) if sanitized_answers["dietary_restrictions"] else "None"
+
+    prompt = f"""
+As an expert travel planner, recommend where to stay and eat in {city}, plus hidden gems worth visiting. Return a valid JSON object with the keys accommodation, dining and hidden_gems.
+
+**Traveler Details:**
+- City: {city}
+- Budget: {sanitized_answers["budget"]}
+- Accommodation Preferences: {accommodation_str}
+- Dietary Restrictions: {dietary_str}
+
+Important Requirements:
+1. Provide 3 accommodation and 3 dining recommendations with full addresses
+2. Include 3-5 hidden gems or off-the-beaten-path suggestions in {city}
+3. Respect the budget and dietary restrictions
+4. No placeholder or example values should be in the final output
+"""
+    return prompt
+
+def create_vacation_sections_prompt(sanitized_answers: dict, sections: list, existing: dict) -> str:
+    """Create a short follow-up prompt that asks only for the missing vacation sections"""
+    overview = f"\nOverview already written: {existing['summary']}\n" if isinstance(existing.get("summary"), str) else ""
+
+    prompt = f"""
+As an expert travel consultant, complete part of a set of vacation destination recommendations for the traveler below. Return a valid JSON object containing only these keys: {", ".join(sections)}.
+
+{_vacation_preferences(sanitized_answers)}
+{overview}
+Important notes:
+- Follow the response schema exactly and fill every field
+- Provide exactly 5 best-matched destinations when recommendations are requested
+- Use currency code for the currency of the departure location. Do not use symbols.
+- Recommendations should respect budget constraints
+"""
+    return prompt
+
+def create_trip_skeleton_prompt(sanitized_answers: dict) -> str:
+    """Create a prompt for a compact day-by-day outline of a long trip"""
+    prompt = f"""
+As an expert travel planner with 20+ years of experience, outline the trip below. Return a valid JSON object with summary, destinations, trip_duration, estimated_costs and day_outline.
+
+{_trip_preferences(sanitized_answers)}
+
+Important Requirements:
+1. day_outline must contain one entry per day with the city and a short title; no descriptions
+2. Order the destinations into a practical route and consider travel time between cities
+3. All dates must be in YYYY-MM-DD format
+4. Use currency code for the currency of the departure location. Do not use symbols.
+5. The start location is only for current location context, not part of the itinerary
 """
-    return prompt
\ No newline at end of file
+    return prompt
+
+def create_day_window_prompt(sanitized_answers: dict, skeleton: dict, outline: str, first_day: int, last_day: int, date_range: str) -> str:
+    """Create a prompt for the detailed daily_itinerary of one window of a long trip"""
+    overview = f"Trip overview: {skeleton['summary']}\n" if isinstance(skeleton.get("summary"), str) else ""
+
+    prompt = f"""
+As an expert travel planner, write the detailed daily itinerary for days {first_day} to {last_day} ({date_range}) of the trip below. Return a valid JSON object with a daily_itinerary array containing exactly those days.
+
+{_trip_preferences(sanitized_answers)}
+
+{overview}**Full Trip Outline:**
+{outline or "Not available; plan a practical route."}
+
+Important Requirements:
+1. Follow the outline so these days connect with the rest of the trip
+2. Keep day_number and date consistent with the outline
+3. Ensure each day is well-paced and considers travel time between activities
+4. No placeholder or example values should be in the final output
+"""
+    return prompt
@@ -0,0 +1,156 @@
+"""
+Canned model output replayed by the local stub backend.
+Shaped like real Gemini responses so the whole pipeline (parsing, repair,
+section merging, caching) runs as it would against the live API.
+"""
+
+SAMPLE_ITINERARY = {
+    "summary": "Five days pairing Parisian boulevards and museums with Rome's ancient sites and trattorias.",
+    "destinations": ["Paris", "Rome"],
+    "trip_duration": {"start_date": "2025-07-01", "end_date": "2025-07-05", "total_days": 5},
+    "daily_itinerary": [
+        {
+            "day_number": 1,
+            "date": "2025-07-01",
+            "title": "Arrival and the Left Bank",
+            "description": "Check in near Saint-Germain, stroll the Luxembourg Gardens and "
+                           "end with dinner in the Latin Quarter.",
+        },
+        {
+            "day_number": 2,
+            "date": "2025-07-02",
+            "title": "Louvre and the Seine",
+            "description": "Morning at the Louvre, lunch on Île Saint-Louis and a sunset "
+                           "cruise along the Seine.",
+        },
+        {
+            "day_number": 3,
+            "date": "2025-07-03",
+            "title": "Train to Rome",
+            "description": "High-speed train to Rome, afternoon walk from the Spanish Steps "
+                           "to the Trevi Fountain.",
+        },
+        {
+            "day_number": 4,
+            "date": "2025-07-04",
+            "title": "Ancient Rome",
+            "description": "Guided tour of the Colosseum, Roman Forum and Palatine Hill, "
+                           "then dinner in Monti.",
+        },
+        {
+            "day_number": 5,
+            "date": "2025-07-05",
+            "title": "Trastevere and departure",
+            "description": "Morning market in Campo de' Fiori, lunch in Trastevere and "
+                           "transfer to the airport.",
+        },
+    ],
+    "accommodation": [
+        {
+            "city": "Paris",
+            "recommendations": [
+                {"name": "Hôtel de l'Abbaye", "address": "10 Rue Cassette, 75006 Paris, France"},
+                {"name": "Hôtel des Grands Hommes", "address": "17 Place du Panthéon, 75005 Paris, France"},
+            ],
+        },
+        {
+            "city": "Rome",
+            "recommendations": [
+                {"name": "Hotel Artemide", "address": "Via Nazionale 22, 00184 Rome, Italy"},
+                {"name": "Hotel Campo de' Fiori", "address": "Via del Biscione 6, 00186 Rome, Italy"},
+            ],
+        },
+    ],
+    "dining": [
+        {
+            "city": "Paris",
+            "recommendations": [
+                {"name": "Le Comptoir du Relais", "address": "9 Carrefour de l'Odéon, 75006 Paris, France"},
+                {"name": "Bouillon Chartier", "address": "7 Rue du Faubourg Montmartre, 75009 Paris, France"},
+            ],
+        },
+        {
+            "city": "Rome",
+            "recommendations": [
+                {"name": "Da Enzo al 29", "address": "Via dei Vascellari 29, 00153 Rome, Italy"},
+                {"name": "Roscioli", "address": "Via dei Giubbonari 21, 00186 Rome, Italy"},
+            ],
+        },
+    ],
+    "hidden_gems": [
+        "Musée de la Vie Romantique in Pigalle",
+        "Canal Saint-Martin at dusk",
+        "The keyhole view on the Aventine Hill",
+        "Basilica of San Clemente's underground levels",
+    ],
+    "estimated_costs": {"currency": "USD", "minimum_total": 2400, "maximum_total": 3800},
+}
+
+SAMPLE_DAY_OUTLINE = [
+    {"day_number": day["day_number"], "date": day["date"], "city": "Paris" if day["day_number"] < 3 else "Rome",
+     "title": day["title"]}
+    for day in SAMPLE_ITINERARY["daily_itinerary"]
+]
+
+SAMPLE_CITY_GUIDE = {
+    "accommodation": SAMPLE_ITINERARY["accommodation"][0]["recommendations"],
+    "dining": SAMPLE_ITINERARY["dining"][0]["recommendations"],
+    "hidden_gems": SAMPLE_ITINERARY["hidden_gems"][:2],
+}
+
+
+def _recommendation(country: str, region: str, score: int, currency_total: float) -> dict:
+    return {
+        "destination": {"country": country, "region": region, "match_score": score},
+        "why_perfect_match": f"{region} combines the beaches, food and culture on your list within budget.",
+        "costs": {
+            "currency": "USD",
+            "total_per_person": currency_total,
+            "breakdown": {
+                "accommodation": round(currency_total * 0.4, 2),
+                "food": round(currency_total * 0.25, 2),
+                "activities": round(currency_total * 0.2, 2),
+                "transportation": round(currency_total * 0.15, 2),
+            },
+        },
+        "visa_requirements": {
+            "type": "visa-free",
+            "processing_time": "None",
+            "cost": "Free",
+            "requirements": ["Passport valid for 6 months", "Return ticket"],
+        },
+        "best_time_to_visit": {
+            "peak_season": ["July", "August"],
+            "shoulder_season": ["May", "June", "September"],
+            "weather": "Warm and sunny, 25-30°C with little rain.",
+        },
+        "transportation": {
+            "score": 8,
+            "explanation": "Frequent trains and buses connect the main towns.",
+            "main_options": ["Train", "Bus", "Ferry"],
+        },
+        "safety": {
+            "score": 9,
+            "explanation": "Low crime; usual care with belongings in crowded areas.",
+            "special_considerations": ["Strong midday sun"],
+        },
+        "must_do_activities": [
+            {"name": "Old town walking tour", "description": "Guided walk through the historic centre.", "estimated_cost": "USD 25"},
+            {"name": "Boat trip", "description": "Half-day trip along the coast.", "estimated_cost": "USD 60"},
+        ],
+        "recommended_duration": {"minimum_days": 4, "optimal_days": 7, "explanation": "Enough time for the coast and a day trip inland."},
+    }
+
+
+SAMPLE_VACATION = {
+    "summary": "Three Mediterranean escapes that balance beaches, food and culture for a summer trip.",
+    "recommendations": [
+        _recommendation("Portugal", "Algarve", 92, 1850),
+        _recommendation("Greece", "Crete", 88, 2100),
+        _recommendation("Croatia", "Split", 81, 1950),
+    ],
+    "meta": {
+        "currency": "USD",
+        "search_criteria": {"vacation_style": "Beach", "budget_range": "USD 1500-2500", "dates": "2025-07-01 to 2025-07-10"},
+    },
+}
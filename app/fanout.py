@@ -0,0 +1,84 @@
+"""
+Per-destination fan-out for multi-city itineraries.
+The trip core (summary, day plan, costs) and each city's accommodation,
+dining and hidden gems are generated as separate, smaller calls that run
+concurrently, then merged back into the regular itinerary shape.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import make_cache_key
+
+FANOUT_ENABLED = os.getenv("ITINERARY_FANOUT", "false").lower() in ("1", "true", "yes")
+
+# Reuse per-city guides across different fanned-out trips to the same city
+CITY_FRAGMENT_CACHE = os.getenv("CITY_FRAGMENT_CACHE", "true").lower() in ("1", "true", "yes")
+
+# Itinerary sections generated by the core call; the rest come from city guides
+CORE_SECTIONS = ("summary", "destinations", "trip_duration", "daily_itinerary", "estimated_costs")
+CITY_GUIDE_SECTIONS = ("accommodation", "dining", "hidden_gems")
+
+
+class FragmentStats:
+    """Running hit/miss counts for the per-city fragment cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+fragment_stats = FragmentStats()
+
+
+def city_fragment_key(sanitized_answers: Dict[str, Any], city: str) -> str:
+    """Cache key for a city guide, built only from the inputs the city prompt uses"""
+    return make_cache_key("city", {
+        "city": city,
+        "budget": sanitized_answers["budget"],
+        "accommodation": sanitized_answers["accommodation"],
+        "dietary_restrictions": sanitized_answers["dietary_restrictions"],
+    })
+
+
+def split_destinations(destinations: Optional[str]) -> List[str]:
+    """Split the comma-separated destinations, dropping blanks and duplicates"""
+    cities: List[str] = []
+    seen = set()
+    for city in (destinations or "").split(","):
+        city = city.strip()
+        if city and city.lower() not in seen:
+            seen.add(city.lower())
+            cities.append(city)
+    return cities
+
+
+def merge_city_guides(core: Dict[str, Any], guides: List[Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """Assemble the core sections and per-city guides into one itinerary"""
+    itinerary = dict(core)
+    itinerary["accommodation"] = []
+    itinerary["dining"] = []
+    itinerary["hidden_gems"] = []
+    for city, guide in guides:
+        if not guide:
+            continue
+        if "accommodation" in guide:
+            itinerary["accommodation"].append({"city": city, "recommendations": guide["accommodation"]})
+        if "dining" in guide:
+            itinerary["dining"].append({"city": city, "recommendations": guide["dining"]})
+        itinerary["hidden_gems"].extend(guide.get("hidden_gems", []))
+
+    # Let the caller re-request sections no city guide produced
+    for section in ("accommodation", "dining", "hidden_gems"):
+        if not itinerary[section]:
+            del itinerary[section]
+    return itinerary
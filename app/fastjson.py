@@ -0,0 +1,49 @@
+"""
+Fast JSON encoding and decoding.
+Model output, cached results and generation responses are large nested
+documents (a 30-day itinerary is around 20 KB), so they are parsed and
+rendered with orjson when it is installed, falling back to the json module
+otherwise. Both paths produce the same compact UTF-8 output. Set
+FAST_JSON=false to force the stdlib path.
+"""
+
+import json
+import os
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json without it
+    orjson = None
+
+FAST_JSON = orjson is not None and os.getenv("FAST_JSON", "true").lower() in ("1", "true", "yes")
+
+# orjson.JSONDecodeError subclasses this, so callers catch one type on either path
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if FAST_JSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if FAST_JSON:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps`.
+
+    Return it for content that is already plain JSON data (validated model
+    output, cache entries) so FastAPI skips jsonable_encoder and the
+    response_model round trip.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
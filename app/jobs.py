@@ -0,0 +1,270 @@
+"""
+Asynchronous generation jobs.
+Clients submit a job, get an id back immediately and poll for the result,
+so long generations don't hold an HTTP connection open past proxy timeouts.
+Jobs are persisted in SQLite. Running jobs send a heartbeat, and every
+worker periodically requeues jobs whose heartbeat stopped, so a job survives
+its worker dying as well as a restart.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from . import fastjson
+from .metrics import JOBS_PENDING
+from .sqlite import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Set JOBS_DB to an empty string to disable the job endpoints
+JOBS_DB = os.getenv("JOBS_DB", ".cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "1000"))
+# Finished jobs are kept this long for polling
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "86400"))
+# Running jobs refresh updated_at this often; one not updated for
+# JOB_STALE_AFTER belongs to a dead worker and is requeued by the next sweep
+JOB_HEARTBEAT = int(os.getenv("JOB_HEARTBEAT", "30"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+Runner = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """SQLite table of jobs, shared by every worker process on the host"""
+
+    def __init__(self, path: str):
+        self.db = SQLiteDatabase(path, (
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)",
+        ))
+
+    def create(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = str(uuid4())
+        now = time.time()
+        self.db.connect().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), now, now),
+        )
+        return job_id
+
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically move a queued job to running; None if another worker got it first"""
+        conn = self.db.connect()
+        claimed = conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, time.time(), job_id, QUEUED),
+        ).rowcount
+        if not claimed:
+            return None
+        kind, payload = conn.execute("SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return {"id": job_id, "kind": kind, "payload": json.loads(payload)}
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        blob = zlib.compress(fastjson.dumps(result)) if result is not None else None
+        self.db.connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (FAILED if error else SUCCEEDED, blob, error, time.time(), job_id),
+        )
+
+    def requeue(self, job_id: str) -> None:
+        self.db.connect().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), job_id, RUNNING),
+        )
+
+    def touch(self, job_id: str) -> None:
+        """Heartbeat for a running job, so it isn't taken for an orphan"""
+        self.db.connect().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?",
+            (time.time(), job_id, RUNNING),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.connect().execute(
+            "SELECT id, kind, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "created_at": row[5],
+            "updated_at": row[6],
+        }
+        if row[3] is not None:
+            job["result"] = fastjson.loads(zlib.decompress(row[3]))
+        if row[4] is not None:
+            job["error"] = row[4]
+        return job
+
+    def recover(self) -> List[str]:
+        """Requeue jobs orphaned by a dead worker and return every queued job id"""
+        conn = self.db.connect()
+        self.sweep()
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, time.time() - JOB_RETENTION),
+        )
+        rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)).fetchall()
+        return [row[0] for row in rows]
+
+    def sweep(self) -> List[str]:
+        """Requeue running jobs whose heartbeat stopped, and queued jobs no worker has claimed, for this worker to run"""
+        conn = self.db.connect()
+        cutoff = time.time() - JOB_STALE_AFTER
+        stale = conn.execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ? ORDER BY created_at",
+            (QUEUED, RUNNING, cutoff),
+        ).fetchall()
+        swept = []
+        for (job_id,) in stale:
+            # Only one worker wins each job; the others see rowcount 0
+            if conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?) AND updated_at < ?",
+                (QUEUED, time.time(), job_id, QUEUED, RUNNING, cutoff),
+            ).rowcount:
+                swept.append(job_id)
+        return swept
+
+
+class JobQueue:
+    """In-process worker pool that runs persisted jobs with registered runners"""
+
+    def __init__(self, store: Optional[JobStore], workers: int, max_pending: int):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self._runners: Dict[str, Runner] = {}
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def register(self, kind: str, runner: Runner) -> None:
+        self._runners[kind] = runner
+
+    async def start(self) -> None:
+        if self.store is None:
+            return
+        for job_id in await asyncio.to_thread(self.store.recover):
+            self._queue.put_nowait(job_id)
+        JOBS_PENDING.set(self.pending)
+        if self._queue.qsize():
+            logger.info(f"Recovered {self._queue.qsize()} queued jobs")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = await asyncio.to_thread(self.store.create, kind, payload)
+        self._queue.put_nowait(job_id)
+        JOBS_PENDING.set(self.pending)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            JOBS_PENDING.set(self.pending)
+            try:
+                job = await asyncio.to_thread(self.store.claim, job_id)
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error on {job_id}: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _sweep(self) -> None:
+        """Pick up jobs orphaned by a worker that died while this one keeps running"""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT)
+            try:
+                swept = await asyncio.to_thread(self.store.sweep)
+            except sqlite3.Error as e:
+                logger.warning(f"Job sweep failed: {str(e)}")
+                continue
+            for job_id in swept:
+                self._queue.put_nowait(job_id)
+            if swept:
+                JOBS_PENDING.set(self.pending)
+                logger.info(f"Requeued {len(swept)} orphaned jobs")
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT)
+            try:
+                await asyncio.to_thread(self.store.touch, job_id)
+            except sqlite3.Error as e:
+                logger.warning(f"Job {job_id} heartbeat failed: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        runner = self._runners.get(job["kind"])
+        if runner is None:
+            await asyncio.to_thread(self.store.finish, job["id"], None, f"Unknown job kind {job['kind']}")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await runner(job["payload"])
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next start picks it up
+            await asyncio.shield(asyncio.to_thread(self.store.requeue, job["id"]))
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or "An unexpected error occurred. Our team has been notified."
+            logger.error(f"Job {job['id']} failed: {str(e)}")
+            await asyncio.to_thread(self.store.finish, job["id"], None, str(detail))
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self.store.finish, job["id"], result)
+        logger.info(f"Job {job['id']} succeeded")
+
+
+job_store: Optional[JobStore] = None
+if JOBS_DB:
+    try:
+        job_store = JobStore(JOBS_DB)
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Background jobs disabled: {str(e)}")
+
+job_queue = JobQueue(job_store, JOB_WORKERS, JOB_MAX_PENDING)
@@ -0,0 +1,136 @@
+"""
+Tolerant JSON repair for near-valid model output.
+Fixes the faults Gemini output most often has (code fences, trailing commas,
+unquoted keys, `#` comments, raw newlines in strings, truncation) and reports
+which top-level sections still fail schema validation, so only those need
+to be generated again.
+"""
+
+import json
+from typing import Any, List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+
+def _strip_trailing_comma(out: List[str]) -> None:
+    k = len(out)
+    while k and out[k - 1].isspace():
+        k -= 1
+    if k and out[k - 1] == ",":
+        del out[k - 1:]
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """Best-effort repair of a malformed JSON object; returns None if hopeless.
+
+    Truncated output is cut back to the last complete value and the open
+    containers are closed, so a partial trailing entry is dropped rather
+    than guessed at.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    out: List[str] = []
+    # Each frame is [closing char, expecting an object key]
+    stack: List[List[Any]] = []
+    safe_len, safe_closers = 0, ""
+    in_string = escape = string_is_key = False
+    i, n = start, len(text)
+
+    def mark_safe() -> None:
+        nonlocal safe_len, safe_closers
+        safe_len = len(out)
+        safe_closers = "".join(frame[0] for frame in reversed(stack))
+
+    while i < n:
+        c = text[i]
+
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == "\\":
+                escape = True
+                out.append(c)
+            elif c == '"':
+                in_string = False
+                out.append(c)
+                if not string_is_key:
+                    mark_safe()
+            elif c == "\n":
+                out.append("\\n")
+            elif c != "\r":
+                out.append(c)
+            i += 1
+            continue
+
+        if c == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1][1]
+            out.append(c)
+        elif c in "{[":
+            stack.append(["}" if c == "{" else "]", c == "{"])
+            out.append(c)
+            if len(stack) == 1:
+                mark_safe()
+        elif c in "}]":
+            _strip_trailing_comma(out)
+            out.append(stack.pop()[0])
+            mark_safe()
+            if not stack:
+                break
+        elif c == ":":
+            stack[-1][1] = False
+            out.append(c)
+        elif c == ",":
+            _strip_trailing_comma(out)
+            last = next((t for t in reversed(out) if not t.isspace()), "")
+            if last not in ("{", "[", ":", ""):
+                mark_safe()
+            if stack[-1][0] == "}":
+                stack[-1][1] = True
+            out.append(c)
+        elif c == "#":
+            # Skip comments copied from the prompt's example JSON
+            while i < n and text[i] != "\n":
+                i += 1
+            continue
+        elif stack[-1][1] and (c.isalpha() or c == "_"):
+            # Unquoted object key
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            out.append(f'"{text[i:j]}"')
+            i = j
+            continue
+        else:
+            out.append(c)
+        i += 1
+
+    if stack:
+        # Truncated: keep everything up to the last complete value
+        out = out[:safe_len]
+        _strip_trailing_comma(out)
+        out.append(safe_closers)
+
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError:
+        return None
+
+
+def invalid_sections(data: Any, schema: Type[BaseModel]) -> List[str]:
+    """Return the top-level fields of `schema` that are missing or invalid in `data`"""
+    if not isinstance(data, dict):
+        return list(schema.model_fields)
+    try:
+        schema.model_validate(data)
+    except ValidationError as e:
+        sections: List[str] = []
+        for error in e.errors():
+            if error["loc"] and error["loc"][0] not in sections:
+                sections.append(error["loc"][0])
+        return sections
+    return []
+
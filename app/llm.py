@@ -0,0 +1,254 @@
+"""
+LLM call helpers for the trip planner API.
+Generation goes through the async generate API and is bounded per worker,
+so a slow upstream call never blocks the event loop for other requests.
+
+Calls go to the backend chosen by LLM_BACKEND (the Gemini API, or a local
+stub for offline load tests). Every call is bounded by the request deadline.
+A call still running at its pipeline's p95 latency on the primary tier is
+hedged with a second request and the first answer wins; while the primary
+tier is failing, calls go to the fallback tier.
+
+Time spent queued for one of the worker's MAX_CONCURRENCY slots counts
+against the request deadline only: the per-call timeout and the hedge delay
+start once a call holds a slot, only upstream failures feed the circuit
+breaker, and no hedge is sent while every slot is taken.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set, Type
+
+from pydantic import BaseModel
+
+from .backends import create_backend
+from .budgets import GenerationBudget
+from .metrics import LLM_CIRCUIT_OPEN, LLM_HEDGES, LLM_IN_FLIGHT, record_llm_call
+from .resilience import CircuitBreaker, DeadlineExceeded, LatencyTracker, time_left, time_to_deadline
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent Gemini calls per worker
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-preview-05-20")
+# Lighter tier used while the primary's circuit is open; empty disables the fallback
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-2.0-flash-lite")
+# Tier for hedge requests; defaults to the primary model
+GEMINI_HEDGE_MODEL = os.getenv("GEMINI_HEDGE_MODEL", GEMINI_MODEL)
+
+# "gemini" or "stub" (canned responses, no network; see app/backends/stub.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+
+# Upper bound for a single Gemini call, on top of the request deadline
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "90"))
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "true").lower() in ("1", "true", "yes")
+# Hedge delay used until enough calls have been seen to know the real p95
+GEMINI_HEDGE_AFTER = float(os.getenv("GEMINI_HEDGE_AFTER", "30"))
+
+# Primary-tier latencies per pipeline: a 30-day itinerary window and a city
+# guide take very different times, so each gets its own hedge delay
+primary_latency: Dict[str, LatencyTracker] = {}
+primary_breaker = CircuitBreaker(
+    GEMINI_MODEL,
+    window=int(os.getenv("GEMINI_BREAKER_WINDOW", "20")),
+    min_calls=int(os.getenv("GEMINI_BREAKER_MIN_CALLS", "10")),
+    error_rate=float(os.getenv("GEMINI_BREAKER_ERROR_RATE", "0.5")),
+    cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30")),
+    on_change=lambda is_open: LLM_CIRCUIT_OPEN.set(int(is_open)),
+)
+
+backend = create_backend(LLM_BACKEND, (GEMINI_MODEL, GEMINI_FALLBACK_MODEL, GEMINI_HEDGE_MODEL))
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _latency_for(budget: Optional[GenerationBudget]) -> LatencyTracker:
+    pipeline = budget.pipeline if budget is not None else "default"
+    tracker = primary_latency.get(pipeline)
+    if tracker is None:
+        tracker = primary_latency[pipeline] = LatencyTracker()
+    return tracker
+
+
+def hedge_delay(budget: Optional[GenerationBudget] = None) -> float:
+    """Seconds to wait on a call before hedging it: the observed p95 of its pipeline on the primary tier"""
+    p95 = _latency_for(budget).percentile(0.95)
+    return GEMINI_HEDGE_AFTER if p95 is None else p95
+
+
+@asynccontextmanager
+async def _slot() -> AsyncIterator[float]:
+    """Hold one of the worker's concurrent call slots, waiting no longer than the request deadline.
+
+    Yields the call's timeout, which only starts once the slot is held.
+    """
+    semaphore = _get_semaphore()
+    try:
+        async with asyncio.timeout(time_to_deadline()):
+            await semaphore.acquire()
+    except TimeoutError:
+        # Queued locally, so not the upstream's fault: the breaker isn't told
+        raise DeadlineExceeded("request deadline passed while waiting for a Gemini slot")
+    try:
+        timeout = time_left(GEMINI_TIMEOUT)
+        if timeout <= 0:
+            raise DeadlineExceeded("request deadline passed while waiting for a Gemini slot")
+        yield timeout
+    finally:
+        semaphore.release()
+
+
+def _pick_model() -> str:
+    """Primary tier unless its circuit is open and a fallback tier is configured"""
+    if primary_breaker.allow() or not GEMINI_FALLBACK_MODEL:
+        return GEMINI_MODEL
+    return GEMINI_FALLBACK_MODEL
+
+
+async def _attempt(
+    model_name: str,
+    prompt: str,
+    schema: Optional[Type[BaseModel]],
+    system: Optional[str],
+    budget: Optional[GenerationBudget],
+    holding_slot: Optional[asyncio.Event] = None,
+) -> Any:
+    async with _slot() as timeout:
+        if holding_slot is not None:
+            holding_slot.set()
+        started = time.monotonic()
+        try:
+            with LLM_IN_FLIGHT.track_inprogress():
+                async with asyncio.timeout(timeout):
+                    response = await backend.generate(model_name, prompt, schema, system, budget)
+        except asyncio.CancelledError:
+            record_llm_call(model_name, "cancelled", time.monotonic() - started)
+            raise
+        except TimeoutError:
+            record_llm_call(model_name, "timeout", time.monotonic() - started)
+            if model_name == GEMINI_MODEL:
+                primary_breaker.record(False)
+            raise DeadlineExceeded(f"Gemini call exceeded {timeout:.1f}s")
+        except Exception:
+            record_llm_call(model_name, "error", time.monotonic() - started)
+            if model_name == GEMINI_MODEL:
+                primary_breaker.record(False)
+            raise
+    elapsed = time.monotonic() - started
+    record_llm_call(model_name, "ok", elapsed, response)
+    if model_name == GEMINI_MODEL:
+        primary_breaker.record(True)
+        _latency_for(budget).record(elapsed)
+    return response
+
+
+async def _hedged(
+    model_name: str,
+    prompt: str,
+    schema: Optional[Type[BaseModel]],
+    system: Optional[str],
+    budget: Optional[GenerationBudget],
+) -> Any:
+    holding_slot = asyncio.Event()
+    first = asyncio.create_task(_attempt(model_name, prompt, schema, system, budget, holding_slot))
+    pending: Set[asyncio.Task] = {first}
+    try:
+        if not GEMINI_HEDGE:
+            return await first
+
+        # The hedge clock starts once the call is upstream, not while it queues
+        slot = asyncio.create_task(holding_slot.wait())
+        try:
+            await asyncio.wait({first, slot}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            slot.cancel()
+        if first.done():
+            return first.result()
+
+        delay = hedge_delay(budget)
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return first.result()
+
+        if _get_semaphore().locked():
+            # Every slot is taken, so a hedge would only queue behind other calls
+            return await first
+
+        # Don't hedge onto a tier whose circuit is open
+        hedge_model = GEMINI_HEDGE_MODEL if model_name == GEMINI_MODEL else model_name
+        logger.info(f"Hedging {model_name} call with {hedge_model} after {delay:.1f}s")
+        LLM_HEDGES.inc()
+        pending.add(asyncio.create_task(_attempt(hedge_model, prompt, schema, system, budget)))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        # The losing request is no longer needed
+        for task in pending:
+            task.cancel()
+
+
+async def generate_content(
+    prompt: str,
+    schema: Optional[Type[BaseModel]] = None,
+    system: Optional[str] = None,
+    budget: Optional[GenerationBudget] = None,
+) -> Any:
+    """Run a Gemini generation without blocking the event loop, as JSON matching `schema` if given.
+
+    `system` is sent as the system instruction; backends cache it upstream
+    where they can, so keep it identical across requests. `budget` sets the
+    output limit, temperature and thinking budget (see app/budgets.py).
+    """
+    if time_left(GEMINI_TIMEOUT) <= 0:
+        raise DeadlineExceeded("request deadline already passed")
+    return await _hedged(_pick_model(), prompt, schema, system, budget)
+
+
+async def stream_content(
+    prompt: str,
+    system: Optional[str] = None,
+    budget: Optional[GenerationBudget] = None,
+) -> AsyncIterator[str]:
+    """Yield generated text chunks as Gemini streams them back"""
+    # A stream can't be hedged once it has started, so only the deadline and breaker apply
+    if time_left(GEMINI_TIMEOUT) <= 0:
+        raise DeadlineExceeded("request deadline already passed")
+    model_name = _pick_model()
+    async with _slot() as timeout:
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(timeout):
+                with LLM_IN_FLIGHT.track_inprogress():
+                    async for text in backend.stream(model_name, prompt, system, budget):
+                        yield text
+        except TimeoutError:
+            record_llm_call(model_name, "timeout", time.monotonic() - started)
+            if model_name == GEMINI_MODEL:
+                primary_breaker.record(False)
+            raise DeadlineExceeded(f"Gemini stream exceeded {timeout:.1f}s")
+        except Exception:
+            record_llm_call(model_name, "error", time.monotonic() - started)
+            if model_name == GEMINI_MODEL:
+                primary_breaker.record(False)
+            raise
+    record_llm_call(model_name, "ok", time.monotonic() - started)
+    if model_name == GEMINI_MODEL:
+        primary_breaker.record(True)
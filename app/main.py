@@ -1,29 +1,104 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from typing import List, Dict, Any, Optional
-import google.generativeai as genai
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+import asyncio
 import os
 from dotenv import load_dotenv
 import logging
-import re
 from uuid import uuid4
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.security import APIKeyHeader
-from functools import lru_cache
 import json
 from datetime import UTC, datetime, timedelta
+
+# Load environment variables before the app modules read their settings
+load_dotenv()
+
 from .data.questions import TRIP_QUESTIONS, VACATION_QUESTIONS
-from .data.prompts import create_trip_prompt, create_vacation_prompt
+from .data.prompts import (
+    PROMPT_VARIANT,
+    create_city_guide_prompt,
+    create_day_window_prompt,
+    create_trip_prompt,
+    create_trip_sections_prompt,
+    create_trip_skeleton_prompt,
+    create_vacation_prompt,
+    create_vacation_sections_prompt,
+    estimate_tokens,
+    trip_system_instruction,
+    vacation_system_instruction,
+)
+from . import llm
+from .llm import generate_content, stream_content
+from .resilience import DeadlineExceeded, deadline
+from .cache import get_cached_result, make_cache_key, store_result, warm_result_cache
+from .schemas import (
+    CityGuide,
+    Itinerary,
+    TripItineraryOutput,
+    TripSkeleton,
+    VacationOutput,
+    VacationRecommendation,
+    section_schema,
+)
+from .json_repair import invalid_sections, repair_json
+from .fanout import (
+    CITY_FRAGMENT_CACHE,
+    CITY_GUIDE_SECTIONS,
+    CORE_SECTIONS,
+    FANOUT_ENABLED,
+    city_fragment_key,
+    fragment_stats,
+    merge_city_guides,
+    split_destinations,
+)
+from .chunking import (
+    complete_days,
+    day_windows,
+    format_outline,
+    missing_windows,
+    needs_chunking,
+    stitch_days,
+    trip_days,
+    window_dates,
+)
+from .singleflight import generation_flight, prompt_key
+from .admission import Overloaded, itinerary_admission, vacation_admission
+from .jobs import job_queue
+from .prefetch import itinerary_prefetcher
+from .streaming import IncrementalJSONParser, format_sse, itinerary_event, want_itinerary_section
+from .precomputed import PrecomputedJSON
+from .sanitize import sanitize_answers
+from . import fastjson
+from .fastjson import FastJSONResponse
+from .budgets import GenerationBudget, budget_for
+from .metrics import PARSE_FAILURES, PROMPT_TOKENS, record_cache, render as render_metrics, stage
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve results cached by other or previous workers right away
+    warmed = await warm_result_cache()
+    if warmed:
+        logger.info(f"Warmed result cache with {warmed} entries")
+    llm.backend.start(
+        GEMINI_API_KEY,
+        (TripItineraryOutput, VacationOutput),
+        (trip_system_instruction(), vacation_system_instruction()),
+    )
+    await job_queue.start()
+    yield
+    await itinerary_prefetcher.stop()
+    await job_queue.stop()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Enhanced Trip Planner API",
     description="A robust API for generating personalized travel itineraries using Gemini AI",
     version="2.1.0",
@@ -47,8 +122,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini AI
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Read once; the Gemini client is configured at startup by the LLM backend
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+SKELETON_SECTIONS = tuple(TripSkeleton.model_fields)
+# The vacation prompts ask for exactly this many destinations
+VACATION_RECOMMENDATIONS = 5
 
 # API Key for additional security (optional)
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
@@ -85,21 +164,6 @@ class VacationAnswers(BaseModel):
    special_requirements: str = Field(..., description="Choose place where I can go skydiving")
    group_size: str = Field(..., description="Group size, e.g., 'Solo traveler', 'Couple'")
 
-def sanitize_input(text: Optional[str]) -> Optional[str]:
-    """Sanitize inputs to prevent prompt injection"""
-    if not text:
-        return text
-    # Remove potentially harmful characters and keywords
-    dangerous_patterns = [
-        r"[\n\r;]",
-        r"(?i)(prompt|inject|execute|script|system|file|http)",
-        r"[<>{}[\]\\]"
-    ]
-    sanitized = text
-    for pattern in dangerous_patterns:
-        sanitized = re.sub(pattern, "", sanitized)
-    return sanitized.strip()[:500]  # Limit length
-
 @app.get("/")
 async def root():
     return {
@@ -109,130 +173,497 @@ async def root():
         "redoc": "/redoc"
     }
 
+# Serialized and compressed once; served with an ETag and long Cache-Control
+TRIP_QUESTIONS_RESPONSE = PrecomputedJSON(TRIP_QUESTIONS)
+VACATION_QUESTIONS_RESPONSE = PrecomputedJSON(VACATION_QUESTIONS)
+
 @app.get("/questions", response_model=Dict[str, Any])
-async def get_questions():
+async def get_questions(request: Request):
     """Return curated questions for trip planning with improved structure"""
-    return TRIP_QUESTIONS
+    return TRIP_QUESTIONS_RESPONSE.response(request)
 
 @app.get("/vacation-questions", response_model=Dict[str, Any])
-async def get_vacation_questions():
+async def get_vacation_questions(request: Request):
     """Return curated questions for vacation planning with improved structure"""
-    return VACATION_QUESTIONS
+    return VACATION_QUESTIONS_RESPONSE.response(request)
 
-@app.post("/generate-itinerary", response_model=Dict[str, Any])
-async def generate_itinerary(answers: TripAnswers):
-    """Generate a personalized trip itinerary using Gemini AI"""
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker (all workers in multiprocess mode)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def _require_gemini_key() -> None:
+    """Fail fast when the Gemini API key is missing"""
+    if llm.backend.requires_api_key and not GEMINI_API_KEY:
+        logger.error("Gemini API key not configured")
+        raise HTTPException(
+            status_code=500,
+            detail="Service configuration error. Please contact support."
+        )
+
+OVERLOADED_DETAIL = "The trip planner is busy right now. Please try again shortly."
+DEADLINE_DETAIL = "Generating your plan took too long. Please try again."
+
+# Upper bound on the total time spent generating one result
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "120"))
+
+def _deadline_error(e: DeadlineExceeded) -> HTTPException:
+    """Turn a generation that ran past its deadline into a 504"""
+    logger.error(f"Generation deadline exceeded: {str(e)}")
+    return HTTPException(status_code=504, detail=DEADLINE_DETAIL)
+
+def _overloaded_error(e: Overloaded) -> HTTPException:
+    """Turn an admission rejection into a 429 with a Retry-After hint"""
+    return HTTPException(
+        status_code=429,
+        detail=OVERLOADED_DETAIL,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _parse_model_output(text: str, label: str) -> Dict[str, Any]:
+    """Parse a Gemini JSON response, repairing near-valid output"""
     try:
-        # Validate API key
-        if not os.getenv("GEMINI_API_KEY"):
-            logger.error("Gemini API key not configured")
+        data = fastjson.loads(text)
+    except fastjson.JSONDecodeError as e:
+        # Structured output should make this rare; repair rather than discard the generation
+        logger.error(f"Failed to parse {label} JSON: {str(e)}")
+        PARSE_FAILURES.labels("json_decode").inc()
+        data = repair_json(text)
+        if data is None:
+            PARSE_FAILURES.labels("unrepairable").inc()
             raise HTTPException(
                 status_code=500,
-                detail="Service configuration error. Please contact support."
+                detail=f"We couldn't process the {label}. Please adjust your inputs and try again."
             )
+        logger.info(f"Repaired malformed {label} JSON")
 
-        # Create the model
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20')
+    if not isinstance(data, dict):
+        logger.error(f"Invalid {label} format: {type(data).__name__}")
+        PARSE_FAILURES.labels("not_object").inc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while processing your {label}."
+        )
 
-        # Sanitize and prepare answers
-        sanitized_answers = {
-            "start_location": sanitize_input(answers.start_location),
-            "destinations": sanitize_input(answers.destinations),
-            "budget": sanitize_input(answers.budget),
-            "travel_style": [sanitize_input(s) for s in answers.travel_style],
-            "accommodation": [sanitize_input(a) for a in answers.accommodation],
-            "interests": [sanitize_input(i) for i in answers.interests],
-            "group_size": sanitize_input(answers.group_size),
-            "transportation": sanitize_input(answers.transportation),
-            "dietary_restrictions": [sanitize_input(d) for d in answers.dietary_restrictions] if answers.dietary_restrictions else None,
-            "special_requirements": sanitize_input(answers.special_requirements),
-            "pace": sanitize_input(answers.pace),
-            "start_date": answers.start_date,
-            "end_date": answers.end_date,
-            "duration": None
-        }
+    return data
 
-        try:
-            start_dt = datetime.strptime(answers.start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(answers.end_date, "%Y-%m-%d")
-            sanitized_answers["duration"] = (end_dt - start_dt).days
-        except Exception:
-            pass
+async def _generate_sections(
+    prompt: str,
+    schema: Type[BaseModel],
+    sections: Sequence[str],
+    label: str,
+    budget: Optional[GenerationBudget] = None,
+    required: bool = False,
+) -> Dict[str, Any]:
+    """Ask Gemini for only the given sections; returns whichever ones come back valid.
+
+    A failed call returns no sections, or raises when the rest of the
+    generation depends on it (`required`).
+    """
+    partial_schema = section_schema(schema, tuple(sections))
+
+    try:
+        response = await generate_content(prompt, partial_schema, budget=budget)
+        if budget is not None:
+            budget.record(response)
+        data = _parse_model_output(response.text, label)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Could not generate {label} sections {', '.join(sections)}: {str(e)}")
+        if required:
+            raise
+        return {}
 
-        # Generate the prompt
+    still_invalid = invalid_sections(data, partial_schema)
+    return {k: data[k] for k in sections if k in data and k not in still_invalid}
+
+def _invalid_itinerary_sections(itinerary: Dict[str, Any], sanitized_answers: Dict[str, Any]) -> List[str]:
+    """Sections that fail the schema, or pass it but are incomplete.
+
+    Repaired truncated output is schema-valid with its tail dropped, so the
+    day plan must cover every day of the trip and accommodation and dining
+    must have an entry per destination.
+    """
+    invalid = invalid_sections(itinerary, Itinerary)
+    if "daily_itinerary" not in invalid and not complete_days(itinerary["daily_itinerary"], trip_days(sanitized_answers)):
+        invalid.append("daily_itinerary")
+    destinations = len(split_destinations(sanitized_answers["destinations"]))
+    for section in ("accommodation", "dining"):
+        if section not in invalid and len(itinerary[section]) < destinations:
+            invalid.append(section)
+    return invalid
+
+def _require_complete(still_invalid: List[str], label: str) -> None:
+    """Fail the generation if sections are still invalid after regeneration, so it is never cached"""
+    if still_invalid:
+        PARSE_FAILURES.labels("incomplete").inc()
+        logger.error(f"Giving up on {label}: still missing {', '.join(still_invalid)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"We couldn't generate a complete {label}. Please try again."
+        )
+
+def _sanitize_trip_answers(answers: TripAnswers) -> Dict[str, Any]:
+    """Sanitize trip answers and compute the trip duration"""
+    sanitized_answers = sanitize_answers(answers, exclude=("start_date", "end_date"))
+    if not sanitized_answers["dietary_restrictions"]:
+        sanitized_answers["dietary_restrictions"] = None
+    sanitized_answers["duration"] = None
+
+    try:
+        start_dt = datetime.strptime(answers.start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(answers.end_date, "%Y-%m-%d")
+        sanitized_answers["duration"] = (end_dt - start_dt).days
+    except Exception:
+        pass
+
+    return sanitized_answers
+
+def _sanitize_vacation_answers(answers: VacationAnswers) -> Dict[str, Any]:
+    """Sanitize vacation answers"""
+    return sanitize_answers(answers, exclude=("start_date", "end_date"))
+
+def _itinerary_budget(sanitized_answers: Dict[str, Any]) -> GenerationBudget:
+    """Output budget for a whole itinerary, from the trip's length and destinations"""
+    return budget_for("itinerary", trip_days(sanitized_answers), len(split_destinations(sanitized_answers["destinations"])))
+
+def _vacation_budget(sanitized_answers: Dict[str, Any]) -> GenerationBudget:
+    """Output budget for vacation recommendations, from the travel dates if given"""
+    days = 0
+    try:
+        start_dt = datetime.strptime(sanitized_answers["start_date"], "%Y-%m-%d")
+        end_dt = datetime.strptime(sanitized_answers["end_date"], "%Y-%m-%d")
+        days = (end_dt - start_dt).days + 1
+    except Exception:
+        pass
+    return budget_for("vacation", days, VACATION_RECOMMENDATIONS)
+
+async def _generate_itinerary(sanitized_answers: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    """Generate an itinerary and cache it under `cache_key`, sharing the work with identical in-flight requests"""
+    # Generate the prompt
+    with stage("itinerary", "prompt"):
         prompt = create_trip_prompt(sanitized_answers)
-        logger.info(f"Generating itinerary for: {answers.destinations}")
-
-        # Generate content with safety settings
-        response = model.generate_content(
-            prompt,
-            safety_settings={
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-            }
+    PROMPT_TOKENS.labels("itinerary", PROMPT_VARIANT).observe(estimate_tokens(trip_system_instruction()) + estimate_tokens(prompt))
+    logger.info(f"Generating itinerary for: {sanitized_answers['destinations']}")
+
+    async def admitted() -> Dict[str, Any]:
+        async with itinerary_admission.admit():
+            try:
+                with deadline(GENERATION_DEADLINE):
+                    itinerary = await _complete_itinerary(prompt, sanitized_answers)
+            except DeadlineExceeded as e:
+                raise _deadline_error(e)
+        # Stored once by the shared generation, even if every waiter has gone
+        with stage("itinerary", "cache_store"):
+            await store_result(cache_key, itinerary)
+        return itinerary
+
+    return await generation_flight.do(prompt_key("itinerary", prompt), admitted)
+
+async def _complete_itinerary(prompt: str, sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Produce a complete itinerary, re-requesting any sections that come back invalid"""
+    cities = split_destinations(sanitized_answers["destinations"])
+    fragments = await _lookup_city_fragments(sanitized_answers, cities)
+
+    chunked = needs_chunking(sanitized_answers)
+    if FANOUT_ENABLED or chunked:
+        itinerary = {"itinerary": await _sectioned_itinerary(sanitized_answers, cities, fragments)}
+    else:
+        itinerary = await _single_shot_itinerary(prompt, _itinerary_budget(sanitized_answers))
+
+    # Re-request only the sections that are missing or invalid
+    with stage("itinerary", "validate"):
+        missing = _invalid_itinerary_sections(itinerary["itinerary"], sanitized_answers)
+    # A chunked day plan has already had its failed windows retried; one call
+    # for the whole of a long trip would just be truncated again
+    repairable = [section for section in missing if not (chunked and section == "daily_itinerary")]
+    if repairable:
+        PARSE_FAILURES.labels("invalid_sections").inc()
+        logger.warning(f"Regenerating itinerary sections: {', '.join(repairable)}")
+        itinerary["itinerary"].update(await _generate_sections(
+            create_trip_sections_prompt(sanitized_answers, repairable, itinerary["itinerary"]),
+            Itinerary,
+            repairable,
+            "itinerary",
+            _itinerary_budget(sanitized_answers)
+        ))
+    if missing:
+        _require_complete(_invalid_itinerary_sections(itinerary["itinerary"], sanitized_answers), "itinerary")
+
+    return itinerary
+
+async def _single_shot_itinerary(prompt: str, budget: Optional[GenerationBudget] = None) -> Dict[str, Any]:
+    """Call Gemini for a trip itinerary and parse the JSON response"""
+    # Structured output: Gemini returns JSON matching the schema
+    response = await generate_content(prompt, TripItineraryOutput, trip_system_instruction(), budget)
+    if budget is not None:
+        budget.record(response)
+
+    if not response.text:
+        logger.error("Empty response from Gemini AI")
+        raise HTTPException(
+            status_code=500,
+            detail="The trip planner service is currently unavailable. Please try again later."
         )
 
-        if not response.text:
-            logger.error("Empty response from Gemini AI")
-            raise HTTPException(
-                status_code=500,
-                detail="The trip planner service is currently unavailable. Please try again later."
-            )
-        
-        # Parse response as JSON
-        try:
-            itinerary = json.loads(response.text)
-            if not isinstance(itinerary, dict):
-                raise ValueError("Invalid itinerary format")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON: {str(e)}")
-            # Attempt to extract JSON from malformed response
-            json_match = re.search(r'```json\n(.*?)\n```', response.text, re.DOTALL)
-
-            if json_match:
-                retries = 0
-                max_retries = 2
-                while retries <= max_retries:
-                    try:
-                        itinerary = json.loads(json_match.group(1))
-                        break
-                    except json.JSONDecodeError:
-                        if retries == max_retries:
-                            raise HTTPException(
-                                status_code=500,
-                                detail="We couldn't process the itinerary after multiple attempts. Please adjust your inputs and try again."
-                            )
-                        retries += 1
-                        logger.warning(f"JSON decode failed, attempt {retries} of {max_retries}")
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail="We couldn't process the itinerary. Please adjust your inputs and try again."
-                )
-        except Exception as e:
-            logger.error(f"Unexpected parsing error: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail="An error occurred while processing your itinerary."
-            )
+    # Parse response as JSON
+    with stage("itinerary", "parse"):
+        itinerary = _parse_model_output(response.text, "itinerary")
+
+    return _wrap_itinerary(itinerary)
+
+def _wrap_itinerary(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise model output to the cached {"itinerary": {...}} shape"""
+    if not isinstance(data.get("itinerary"), dict):
+        return {"itinerary": data}
+    return data
+
+async def _gather_or_cancel(*aws: Awaitable[Any]) -> List[Any]:
+    """Like asyncio.gather, but the first failure cancels the others and is raised as-is"""
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(aw) for aw in aws]
+    except BaseExceptionGroup as e:
+        # Callers handle HTTPException and friends, not exception groups
+        raise e.exceptions[0]
+    return [task.result() for task in tasks]
+
+async def _sectioned_itinerary(sanitized_answers: Dict[str, Any], cities: List[str], fragments: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Generate the trip core and any uncached per-city sections concurrently, then merge them"""
+    if FANOUT_ENABLED:
+        # Only ask Gemini for the city guides that aren't cached yet
+        uncached = [city for city in cities if city not in fragments]
+        logger.info(f"Fanning out itinerary over {len(uncached)} of {len(cities)} destinations")
+        core, *generated = await _gather_or_cancel(
+            _generate_core(sanitized_answers),
+            *[_generate_city_guide(sanitized_answers, city) for city in uncached]
+        )
+        guides = {**fragments, **dict(zip(uncached, generated))}
+        return merge_city_guides(core, [(city, guides[city]) for city in cities])
+
+    city_prompt = create_trip_sections_prompt(sanitized_answers, list(CITY_GUIDE_SECTIONS), {})
+    core, city_sections = await _gather_or_cancel(
+        _generate_core(sanitized_answers),
+        _generate_sections(
+            city_prompt, Itinerary, CITY_GUIDE_SECTIONS, "itinerary", budget_for("city_guide", trip_days(sanitized_answers), len(cities))
+        )
+    )
+    return {**core, **city_sections}
+
+async def _generate_city_guide(sanitized_answers: Dict[str, Any], city: str) -> Dict[str, Any]:
+    """Generate one city's guide and keep it as a reusable fragment"""
+    guide = await _generate_sections(
+        create_city_guide_prompt(sanitized_answers, city), CityGuide, CITY_GUIDE_SECTIONS, f"{city} guide",
+        budget_for("city_guide", trip_days(sanitized_answers), 1)
+    )
+    if CITY_FRAGMENT_CACHE and len(guide) == len(CITY_GUIDE_SECTIONS):
+        await store_result(city_fragment_key(sanitized_answers, city), guide)
+    return guide
+
+async def _lookup_city_fragments(sanitized_answers: Dict[str, Any], cities: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch cached city guides and record the fragment hit rate"""
+    # Guides are only generated, and so only cached, by the fan-out path
+    if not (FANOUT_ENABLED and CITY_FRAGMENT_CACHE) or not cities:
+        return {}
+
+    found = await asyncio.gather(*[get_cached_result(city_fragment_key(sanitized_answers, city)) for city in cities])
+    fragments = {city: guide for city, guide in zip(cities, found) if guide is not None}
+
+    fragment_stats.record(len(fragments), len(cities) - len(fragments))
+    record_cache("city_fragment", hits=len(fragments), misses=len(cities) - len(fragments))
+    logger.info(
+        f"City fragment cache: {len(fragments)}/{len(cities)} cached "
+        f"(hit rate {fragment_stats.hit_rate:.1%} over {fragment_stats.hits + fragment_stats.misses} lookups)"
+    )
+    return fragments
+
+async def _generate_core(sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate the summary, day plan and costs, chunking the day plan for long trips"""
+    destinations = len(split_destinations(sanitized_answers["destinations"]))
+    if not needs_chunking(sanitized_answers):
+        core_prompt = create_trip_sections_prompt(sanitized_answers, list(CORE_SECTIONS), {})
+        return await _generate_sections(
+            core_prompt, Itinerary, CORE_SECTIONS, "itinerary",
+            budget_for("itinerary_days", trip_days(sanitized_answers), destinations), required=True
+        )
+
+    total_days = trip_days(sanitized_answers)
+    windows = day_windows(total_days)
+    logger.info(f"Generating {total_days}-day itinerary in {len(windows)} windows")
+
+    # The skeleton is small, so waiting for it costs little and keeps the windows consistent
+    skeleton = await _generate_sections(
+        create_trip_skeleton_prompt(sanitized_answers), TripSkeleton, SKELETON_SECTIONS, "itinerary skeleton",
+        budget_for("itinerary_skeleton", total_days, destinations),
+        required=True
+    )
+    outline = format_outline(skeleton.get("day_outline", []))
+
+    async def window(first: int, last: int) -> Optional[List[Dict[str, Any]]]:
+        plan = await _generate_sections(
+            create_day_window_prompt(
+                sanitized_answers, skeleton, outline, first, last,
+                " to ".join(window_dates(sanitized_answers["start_date"], first, last))
+            ),
+            Itinerary,
+            ("daily_itinerary",),
+            f"itinerary days {first}-{last}",
+            budget_for("itinerary_days", last - first + 1, destinations)
+        )
+        return plan.get("daily_itinerary")
+
+    plans = dict(zip(windows, await _gather_or_cancel(*[window(first, last) for first, last in windows])))
+
+    # Retry just the windows that failed or came back short, each with its own budget
+    retry = missing_windows(list(plans.items()))
+    if retry:
+        PARSE_FAILURES.labels("invalid_sections").inc()
+        logger.warning(f"Regenerating itinerary days {', '.join(f'{first}-{last}' for first, last in retry)}")
+        plans.update(zip(retry, await _gather_or_cancel(*[window(first, last) for first, last in retry])))
+
+    core = {k: v for k, v in skeleton.items() if k != "day_outline"}
+    daily_itinerary = stitch_days(list(plans.items()), total_days)
+    if daily_itinerary is not None:
+        core["daily_itinerary"] = daily_itinerary
+    return core
+
+async def _generate_vacation(sanitized_answers: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    """Generate vacation recommendations and cache them under `cache_key`, sharing the work with identical in-flight requests"""
+    # Generate the prompt
+    with stage("vacation", "prompt"):
+        prompt = create_vacation_prompt(sanitized_answers)
+    PROMPT_TOKENS.labels("vacation", PROMPT_VARIANT).observe(estimate_tokens(vacation_system_instruction()) + estimate_tokens(prompt))
+    logger.info(f"Generating vacation for: {sanitized_answers['vacation_style'][0].capitalize()}")
+
+    async def admitted() -> Dict[str, Any]:
+        async with vacation_admission.admit():
+            try:
+                with deadline(GENERATION_DEADLINE):
+                    vacation = await _complete_vacation(prompt, sanitized_answers)
+            except DeadlineExceeded as e:
+                raise _deadline_error(e)
+        with stage("vacation", "cache_store"):
+            await store_result(cache_key, vacation)
+        return vacation
+
+    return await generation_flight.do(prompt_key("vacation", prompt), admitted)
+
+async def _complete_vacation(prompt: str, sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Call Gemini for vacation recommendations and parse the JSON response"""
+    # Structured output: Gemini returns JSON matching the schema
+    budget = _vacation_budget(sanitized_answers)
+    response = await generate_content(prompt, VacationOutput, vacation_system_instruction(), budget)
+    budget.record(response)
+
+    if not response.text:
+        logger.error("Empty response from Gemini AI")
+        raise HTTPException(
+            status_code=500,
+            detail="The vacation planner service is currently unavailable. Please try again later."
+        )
+
+    # Parse response as JSON
+    with stage("vacation", "parse"):
+        vacation = _parse_model_output(response.text, "vacation")
+
+    # Re-request only the sections that are missing or invalid
+    with stage("vacation", "validate"):
+        missing = invalid_sections(vacation, VacationOutput)
+    if missing:
+        PARSE_FAILURES.labels("invalid_sections").inc()
+        logger.warning(f"Regenerating vacation sections: {', '.join(missing)}")
+        vacation.update(await _generate_sections(
+            create_vacation_sections_prompt(sanitized_answers, missing, vacation),
+            VacationOutput,
+            missing,
+            "vacation"
+        ))
+        _require_complete(invalid_sections(vacation, VacationOutput), "vacation")
+
+    return vacation
 
-        # Generate request ID and log success
-        request_id = str(uuid4())
-        logger.info(f"Successfully generated itinerary {request_id} for {answers.destinations}")
-
-        return {
-            "success": True,
-            "trip_itinerary": itinerary,
-            "meta": {
-                "request_id": request_id,
-                "generated_at": datetime.utcnow().isoformat(),
-                "destination_count": len(answers.destinations),
-                "duration": sanitized_answers["duration"]
-            }
+async def _itinerary_result(sanitized_answers: Dict[str, Any], bypass_cache: bool = False) -> Tuple[Dict[str, Any], str]:
+    """Serve an itinerary from the result cache or generate it; returns it with its X-Cache status"""
+    cache_key = make_cache_key("itinerary", sanitized_answers)
+    if not bypass_cache:
+        with stage("itinerary", "cache_lookup"):
+            itinerary = await get_cached_result(cache_key)
+        record_cache("itinerary", hits=int(itinerary is not None), misses=int(itinerary is None))
+        if itinerary is not None:
+            itinerary_prefetcher.used(cache_key)
+            return itinerary, "HIT"
+
+    with stage("itinerary", "generate"):
+        itinerary = await _generate_itinerary(sanitized_answers, cache_key)
+    return itinerary, "BYPASS" if bypass_cache else "MISS"
+
+async def _vacation_result(sanitized_answers: Dict[str, Any], bypass_cache: bool = False) -> Tuple[Dict[str, Any], str]:
+    """Serve vacation recommendations from the result cache or generate them"""
+    cache_key = make_cache_key("vacation", sanitized_answers)
+    if not bypass_cache:
+        with stage("vacation", "cache_lookup"):
+            vacation = await get_cached_result(cache_key)
+        record_cache("vacation", hits=int(vacation is not None), misses=int(vacation is None))
+        if vacation is not None:
+            return vacation, "HIT"
+
+    with stage("vacation", "generate"):
+        vacation = await _generate_vacation(sanitized_answers, cache_key)
+    return vacation, "BYPASS" if bypass_cache else "MISS"
+
+def _itinerary_envelope(itinerary: Dict[str, Any], sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap an itinerary in the /generate-itinerary response format"""
+    # Generate request ID and log success
+    request_id = str(uuid4())
+    logger.info(f"Successfully generated itinerary {request_id} for {sanitized_answers['destinations']}")
+
+    return {
+        "success": True,
+        "trip_itinerary": itinerary,
+        "meta": {
+            "request_id": request_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "destination_count": len(sanitized_answers["destinations"]),
+            "duration": sanitized_answers["duration"]
         }
+    }
+
+def _vacation_envelope(vacation: Dict[str, Any], sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap vacation recommendations in the /generate-vacation response format"""
+    # Generate request ID and log success
+    request_id = str(uuid4())
+    logger.info(f"Successfully generated vacation {request_id} for {sanitized_answers['vacation_style'][0].capitalize()}")
+
+    return {
+        "success": True,
+        "vacation_itinerary": vacation,
+        "meta": {
+            "request_id": request_id,
+            "generated_at": datetime.now(UTC).isoformat(),
+            "destination_count": len(sanitized_answers["departure_location"]),
+        }
+    }
+
+@app.post("/generate-itinerary", response_model=Dict[str, Any])
+async def generate_itinerary(answers: TripAnswers, bypass_cache: bool = False):
+    """Generate a personalized trip itinerary using Gemini AI"""
+    try:
+        # Validate API key
+        _require_gemini_key()
+
+        # Sanitize and prepare answers
+        with stage("itinerary", "sanitize"):
+            sanitized_answers = _sanitize_trip_answers(answers)
+
+        itinerary, cache_status = await _itinerary_result(sanitized_answers, bypass_cache)
 
+        with stage("itinerary", "serialize"):
+            return FastJSONResponse(_itinerary_envelope(itinerary, sanitized_answers), headers={"X-Cache": cache_status})
+
+    except Overloaded as e:
+        raise _overloaded_error(e)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -242,105 +673,210 @@ async def generate_itinerary(answers: TripAnswers):
             detail="An unexpected error occurred. Our team has been notified."
         )
     
-@app.post("/generate-vacation", response_model=Dict[str, Any])
-async def generate_vacation(answers: VacationAnswers):
-    """Generate a personalized vacation itinerary using Gemini AI"""
-    try:
-        # Validate API key
-        if not os.getenv("GEMINI_API_KEY"):
-            logger.error("Gemini API key not configured")
-            raise HTTPException(
-                status_code=500,
-                detail="Service configuration error. Please contact support."
-            )
+def _replay_itinerary(itinerary: Dict[str, Any]):
+    """Yield SSE events for an already generated itinerary"""
+    inner = itinerary.get("itinerary", itinerary)
+    if not isinstance(inner, dict):
+        inner = itinerary
+    for key, value in inner.items():
+        if key == "daily_itinerary" and isinstance(value, list):
+            for day in value:
+                yield format_sse("day", day)
+        else:
+            yield format_sse(key, value)
 
-        # Create the model
-        model = genai.GenerativeModel('gemini-2.5-flash-preview-05-20') 
+async def _itinerary_events(sanitized_answers: Dict[str, Any], cache_key: str, cached: Optional[Dict[str, Any]]):
+    """Generate itinerary sections as SSE frames, emitting each one as soon as it is complete.
 
-        # Sanitize and prepare answers
-        sanitized_answers = {
-            "vacation_style": [sanitize_input(s) for s in answers.vacation_style],
-            "departure_location": sanitize_input(answers.departure_location),
-            "start_date": answers.start_date,
-            "end_date": answers.end_date,
-            "budget": sanitize_input(answers.budget),
-            "preferred_region": sanitize_input(answers.preferred_region),
-            "visa_flexibility": sanitize_input(answers.visa_flexibility),
-            "special_requirements": sanitize_input(answers.special_requirements),
-            "group_size": sanitize_input(answers.group_size)
+    The first item is None, yielded once the request holds an admission slot
+    (or is served from cache): stream_itinerary waits for it so an overloaded
+    request is rejected with a 429 before the response starts. The slot is
+    released when the generator finishes or is closed.
+    """
+    if cached is not None:
+        yield None
+        for frame in _replay_itinerary(cached):
+            yield frame
+    else:
+        prompt = create_trip_prompt(sanitized_answers)
+        budget = _itinerary_budget(sanitized_answers)
+
+        async with itinerary_admission.admit():
+            yield None
+            logger.info(f"Streaming itinerary for: {sanitized_answers['destinations']}")
+
+            parser = IncrementalJSONParser(want_itinerary_section)
+            try:
+                with deadline(GENERATION_DEADLINE):
+                    async for chunk in stream_content(prompt, trip_system_instruction(), budget):
+                        for path, value in parser.feed(chunk):
+                            yield format_sse(*itinerary_event(path, value))
+                # Streamed chunks carry no usage metadata, so estimate the output from its length
+                budget.record_tokens(estimate_tokens(parser.text))
+
+                itinerary = _wrap_itinerary(_parse_model_output(parser.text, "itinerary"))
+            except DeadlineExceeded as e:
+                logger.error(f"Streaming generation deadline exceeded: {str(e)}")
+                yield format_sse("error", {"detail": DEADLINE_DETAIL})
+                return
+            except Exception as e:
+                logger.error(f"Streaming generation failed: {str(e)}")
+                yield format_sse("error", {"detail": "An error occurred while processing your itinerary."})
+                return
+
+        # A truncated or incomplete stream is reported as failed and never cached
+        missing = _invalid_itinerary_sections(itinerary["itinerary"], sanitized_answers)
+        if missing:
+            PARSE_FAILURES.labels("invalid_sections").inc()
+            logger.error(f"Streamed itinerary is missing sections: {', '.join(missing)}")
+            yield format_sse("error", {"detail": "We couldn't generate a complete itinerary. Please try again."})
+            return
+
+        await store_result(cache_key, itinerary)
+
+    request_id = str(uuid4())
+    logger.info(f"Successfully streamed itinerary {request_id} for {sanitized_answers['destinations']}")
+    yield format_sse("done", {
+        "request_id": request_id,
+        "generated_at": datetime.now(UTC).isoformat(),
+        "duration": sanitized_answers["duration"],
+        "cached": cached is not None
+    })
+
+@app.post("/generate-itinerary/stream")
+async def stream_itinerary(answers: TripAnswers, bypass_cache: bool = False):
+    """Stream a personalized trip itinerary as Server-Sent Events.
+
+    Emits `summary`, one `day` event per daily_itinerary entry, then the
+    remaining sections (`accommodation`, `dining`, `hidden_gems`, ...) as soon
+    as each is generated, followed by a final `done` or `error` event.
+    Requests beyond the generation capacity get a 429 with Retry-After.
+    """
+    # Validate API key
+    _require_gemini_key()
+
+    with stage("itinerary", "sanitize"):
+        sanitized_answers = _sanitize_trip_answers(answers)
+    cache_key = make_cache_key("itinerary", sanitized_answers)
+    cached = None
+    if not bypass_cache:
+        with stage("itinerary", "cache_lookup"):
+            cached = await get_cached_result(cache_key)
+        record_cache("itinerary", hits=int(cached is not None), misses=int(cached is None))
+
+    events = _itinerary_events(sanitized_answers, cache_key, cached)
+    try:
+        await events.__anext__()
+    except Overloaded as e:
+        raise _overloaded_error(e)
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Cache": "HIT" if cached is not None else ("BYPASS" if bypass_cache else "MISS")
         }
+    )
 
-        # Generate the prompt
-        prompt = create_vacation_prompt(sanitized_answers)
-        logger.info(f"Generating vacation for: {answers.vacation_style[0].capitalize()}")
-        
-        # Generate content with safety settings
-        response = model.generate_content(
-            prompt,
-            safety_settings={
-                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
-            }
-        )
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
 
-        if not response.text:
-            logger.error("Empty response from Gemini AI")
-            raise HTTPException(
-                status_code=500,
-                detail="The vacation planner service is currently unavailable. Please try again later."
-            )
-        
-        # Parse response as JSON
+def _ndjson(data: Dict[str, Any]) -> str:
+    return fastjson.dumps(data).decode("utf-8") + "\n"
+
+def _batch_error(index: int, status_code: int, detail: Any) -> str:
+    return _ndjson({"index": index, "success": False, "error": {"status_code": status_code, "detail": detail}})
+
+async def _batch_lines(items: List[Dict[str, Any]]):
+    """Validate, deduplicate and generate batch items, yielding one NDJSON line per item as each finishes"""
+    # Group identical trips so each distinct one is generated only once
+    groups: Dict[str, Tuple[Dict[str, Any], List[int]]] = {}
+    for index, item in enumerate(items):
         try:
-            vacation = json.loads(response.text)
-            if not isinstance(vacation, dict):
-                raise ValueError("Invalid vacation format")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON: {str(e)}")
-            # Attempt to extract JSON from malformed response
-            json_match = re.search(r'```json\n(.*?)\n```', response.text, re.DOTALL)
-            if json_match:
-                retries = 0
-                max_retries = 2
-                while retries <= max_retries:
-                    try:
-                        vacation = json.loads(json_match.group(1))
-                        break
-                    except json.JSONDecodeError:
-                        if retries == max_retries:
-                            raise HTTPException(
-                                status_code=500,
-                                detail="We couldn't process the vacation after multiple attempts. Please adjust your inputs and try again."
-                            )
-                        retries += 1
-                        logger.warning(f"JSON decode failed, attempt {retries} of {max_retries}")
-            else:
-                raise HTTPException(
+            answers = TripAnswers.model_validate(item)
+        except ValidationError as e:
+            yield _batch_error(index, 422, json.loads(e.json(include_url=False)))
+            continue
+        sanitized_answers = _sanitize_trip_answers(answers)
+        cache_key = make_cache_key("itinerary", sanitized_answers)
+        groups.setdefault(cache_key, (sanitized_answers, []))[1].append(index)
+
+    logger.info(f"Batch of {len(items)} items: {len(groups)} distinct itineraries")
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(sanitized_answers: Dict[str, Any], indices: List[int]):
+        async with semaphore:
+            try:
+                itinerary, _ = await _retry_when_overloaded(lambda: _itinerary_result(sanitized_answers))
+                return sanitized_answers, indices, itinerary, None
+            except HTTPException as e:
+                return sanitized_answers, indices, None, e
+            except Exception as e:
+                logger.error(f"Batch item failed: {str(e)}", exc_info=True)
+                return sanitized_answers, indices, None, HTTPException(
                     status_code=500,
-                    detail="We couldn't process the vacation. Please adjust your inputs and try again."
+                    detail="An unexpected error occurred. Our team has been notified."
                 )
-        except Exception as e:
-            logger.error(f"Unexpected parsing error: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail="An error occurred while processing your vacation."
-            )
-        
-        # Generate request ID and log success
-        request_id = str(uuid4())
-        logger.info(f"Successfully generated vacation {request_id} for {answers.vacation_style[0].capitalize()}")
-
-        return {
-            "success": True,
-            "vacation_itinerary": vacation,
-            "meta": {
-                "request_id": request_id,
-                "generated_at": datetime.now(UTC).isoformat(),
-                "destination_count": len(answers.departure_location),
-            }
-        }
+
+    tasks = [asyncio.create_task(run(sanitized_answers, indices)) for sanitized_answers, indices in groups.values()]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            sanitized_answers, indices, itinerary, error = await finished
+            for index in indices:
+                if error is not None:
+                    yield _batch_error(index, error.status_code, error.detail)
+                else:
+                    yield _ndjson({"index": index, **_itinerary_envelope(itinerary, sanitized_answers)})
+    finally:
+        # Stop outstanding work if the client goes away mid-stream
+        for task in tasks:
+            task.cancel()
+
+@app.post("/generate-itinerary/batch")
+async def generate_itinerary_batch(items: List[Dict[str, Any]]):
+    """Generate itineraries for a list of TripAnswers, streamed back as NDJSON.
+
+    Identical entries are generated once and at most BATCH_CONCURRENCY run at
+    a time. Each line carries the item's `index`; invalid or failed items get
+    an `error` line instead of failing the whole batch.
+    """
+    _require_gemini_key()
+    if not items or len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch must contain between 1 and {BATCH_MAX_ITEMS} items."
+        )
+
+    return StreamingResponse(_batch_lines(items), media_type="application/x-ndjson")
+
+@app.post("/generate-vacation", response_model=Dict[str, Any])
+async def generate_vacation(answers: VacationAnswers, bypass_cache: bool = False):
+    """Generate a personalized vacation itinerary using Gemini AI"""
+    try:
+        # Validate API key
+        _require_gemini_key()
+
+        # Sanitize and prepare answers
+        with stage("vacation", "sanitize"):
+            sanitized_answers = _sanitize_vacation_answers(answers)
+
+        vacation, cache_status = await _vacation_result(sanitized_answers, bypass_cache)
+
+        envelope = _vacation_envelope(vacation, sanitized_answers)
+        prefetch = None
+        if itinerary_prefetcher.enabled:
+            # Prefetch is an optimisation; never fail the response over it
+            try:
+                envelope["itinerary_requests"], prefetch = _plan_prefetch(answers, vacation)
+            except Exception as e:
+                logger.warning(f"Could not plan itinerary prefetch: {str(e)}", exc_info=True)
+
+        with stage("vacation", "serialize"):
+            return FastJSONResponse(envelope, headers={"X-Cache": cache_status}, background=prefetch)
+    except Overloaded as e:
+        raise _overloaded_error(e)
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -350,6 +886,133 @@ async def generate_vacation(answers: VacationAnswers):
             detail="An unexpected error occurred. Our team has been notified."
         )
 
+def _itinerary_request(answers: VacationAnswers, recommendation: Dict[str, Any]) -> Dict[str, Any]:
+    """The /generate-itinerary payload for a recommended destination and the same trip"""
+    destination = recommendation["destination"]
+    activities = [activity["name"] for activity in recommendation.get("must_do_activities", [])[:5]]
+    return {
+        "start_location": answers.departure_location,
+        "destinations": f"{destination['region']} ({destination['country']})",
+        "budget": answers.budget,
+        "travel_style": answers.vacation_style,
+        "accommodation": ["hotels"],
+        "interests": activities or answers.vacation_style,
+        "group_size": answers.group_size,
+        "transportation": "public" if recommendation.get("transportation", {}).get("score", 0) >= 7 else "mix",
+        "dietary_restrictions": None,
+        "special_requirements": answers.special_requirements,
+        "pace": "Moderate",
+        "start_date": answers.start_date,
+        "end_date": answers.end_date,
+    }
+
+def _plan_prefetch(
+    answers: VacationAnswers, vacation: Dict[str, Any]
+) -> Tuple[List[Optional[Dict[str, Any]]], BackgroundTask]:
+    """Follow-up itinerary payloads for every recommendation, and a task prefetching the best ones.
+
+    Clients send the payload of the chosen recommendation as is, so its cache
+    key matches the prefetched result. Recommendations that don't validate
+    get None and are never prefetched.
+    """
+    recommendations = vacation.get("recommendations", [])
+    requests: List[Optional[Dict[str, Any]]] = []
+    for recommendation in recommendations:
+        try:
+            VacationRecommendation.model_validate(recommendation)
+        except ValidationError:
+            requests.append(None)
+            continue
+        requests.append(_itinerary_request(answers, recommendation))
+
+    # Keyed by identity, since two recommendations may be equal
+    payloads = {id(r): request for r, request in zip(recommendations, requests) if request is not None}
+    picked = [payloads[id(r)] for r in itinerary_prefetcher.pick([r for r in recommendations if id(r) in payloads])]
+
+    async def start() -> None:
+        for request in picked:
+            try:
+                sanitized_answers = _sanitize_trip_answers(TripAnswers(**request))
+            except ValidationError as e:
+                logger.warning(f"Not prefetching an invalid itinerary request: {str(e)}")
+                continue
+            itinerary_prefetcher.schedule(
+                make_cache_key("itinerary", sanitized_answers),
+                _itinerary_budget(sanitized_answers).output_tokens,
+                lambda sanitized_answers=sanitized_answers: _prefetch_itinerary(sanitized_answers),
+            )
+
+    return requests, BackgroundTask(start)
+
+async def _prefetch_itinerary(sanitized_answers: Dict[str, Any]) -> str:
+    logger.info(f"Prefetching itinerary for: {sanitized_answers['destinations']}")
+    _, cache_status = await _itinerary_result(sanitized_answers)
+    return cache_status
+
+async def _retry_when_overloaded(run: Callable[[], Awaitable[Any]]) -> Any:
+    """Background jobs wait out admission rejections instead of failing"""
+    while True:
+        try:
+            return await run()
+        except Overloaded as e:
+            logger.info(f"Job deferred for {e.retry_after}s: generation is at capacity")
+            await asyncio.sleep(e.retry_after)
+
+async def _run_itinerary_job(sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    itinerary, _ = await _retry_when_overloaded(lambda: _itinerary_result(sanitized_answers))
+    return _itinerary_envelope(itinerary, sanitized_answers)
+
+async def _run_vacation_job(sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    vacation, _ = await _retry_when_overloaded(lambda: _vacation_result(sanitized_answers))
+    return _vacation_envelope(vacation, sanitized_answers)
+
+job_queue.register("itinerary", _run_itinerary_job)
+job_queue.register("vacation", _run_vacation_job)
+
+def _require_jobs() -> None:
+    """Fail fast if the job store couldn't be opened"""
+    if not job_queue.enabled:
+        raise HTTPException(
+            status_code=503,
+            detail="Background jobs are unavailable right now. Please use the synchronous endpoints."
+        )
+
+async def _submit_job(kind: str, sanitized_answers: Dict[str, Any]) -> Dict[str, Any]:
+    _require_jobs()
+    if job_queue.pending >= job_queue.max_pending:
+        logger.warning(f"Job queue full ({job_queue.pending} pending)")
+        raise HTTPException(
+            status_code=429,
+            detail=OVERLOADED_DETAIL,
+            headers={"Retry-After": "30"}
+        )
+
+    job_id = await job_queue.submit(kind, sanitized_answers)
+    logger.info(f"Queued {kind} job {job_id}")
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.post("/jobs/itinerary", status_code=202, response_model=Dict[str, Any])
+async def create_itinerary_job(answers: TripAnswers):
+    """Queue itinerary generation and return a job id to poll"""
+    _require_gemini_key()
+    return await _submit_job("itinerary", _sanitize_trip_answers(answers))
+
+@app.post("/jobs/vacation", status_code=202, response_model=Dict[str, Any])
+async def create_vacation_job(answers: VacationAnswers):
+    """Queue vacation generation and return a job id to poll"""
+    _require_gemini_key()
+    return await _submit_job("vacation", _sanitize_vacation_answers(answers))
+
+@app.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str):
+    """Return a job's status, and its result once generation has finished"""
+    _require_jobs()
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # The result was validated when it was generated; send it as stored
+    return FastJSONResponse(job)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,142 @@
+"""
+Prometheus metrics for the generation pipeline.
+Per-stage latency histograms show where a slow request spent its time
+(sanitization, prompt building, cache lookup, the Gemini call, parsing,
+serialization). LLM calls record latency, outcome and token usage; caches
+record hits and misses (the hit ratio is hits / (hits + misses)); in-flight
+work is exposed as gauges set whenever it changes, since callback gauges
+aren't exported in multiprocess mode.
+
+Set PROMETHEUS_MULTIPROC_DIR when running several workers so /metrics
+aggregates all of them.
+"""
+
+import os
+import time
+from functools import lru_cache
+from typing import Any, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 45, 60, 90, 120)
+
+STAGE_SECONDS = Histogram(
+    "trip_planner_stage_seconds",
+    "Time spent in each stage of a generation request",
+    ["pipeline", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "trip_planner_llm_call_seconds",
+    "Latency of individual upstream LLM calls",
+    ["model", "outcome"],
+    buckets=LLM_BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "trip_planner_prompt_tokens",
+    "Estimated size of the main generation prompts, by prompt variant",
+    ["pipeline", "variant"],
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+OUTPUT_BUDGET_USED = Histogram(
+    "trip_planner_output_budget_used_ratio",
+    "Response tokens of a main generation call over its output-token budget (1 or more was truncated)",
+    ["pipeline"],
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+LLM_TOKENS = Counter(
+    "trip_planner_llm_tokens_total",
+    "Tokens reported in LLM usage metadata",
+    ["model", "direction"],
+)
+LLM_HEDGES = Counter("trip_planner_llm_hedges_total", "Upstream calls that were hedged with a second request")
+LLM_IN_FLIGHT = Gauge("trip_planner_llm_in_flight", "Upstream LLM calls currently running", multiprocess_mode="livesum")
+CACHE_LOOKUPS = Counter(
+    "trip_planner_cache_lookups_total",
+    "Result and fragment cache lookups",
+    ["cache", "result"],
+)
+ADMISSION_REQUESTS = Gauge(
+    "trip_planner_admission_requests",
+    "Generation requests holding (in_flight) or waiting for (queued) a slot",
+    ["pipeline", "state"],
+    multiprocess_mode="livesum",
+)
+JOBS_PENDING = Gauge("trip_planner_jobs_pending", "Queued background jobs", multiprocess_mode="livesum")
+LLM_CIRCUIT_OPEN = Gauge(
+    "trip_planner_llm_circuit_open",
+    "1 while the primary model tier's circuit breaker is open or half-open",
+    multiprocess_mode="max",
+)
+PREFETCH = Counter(
+    "trip_planner_prefetch_total",
+    "Speculative itinerary prefetches by outcome (generated, cached, skipped_busy, skipped_budget, failed, used)",
+    ["outcome"],
+)
+PARSE_FAILURES = Counter(
+    "trip_planner_parse_failures_total",
+    "Model outputs that failed to parse or validate, by failure type",
+    ["type"],
+)
+
+
+class StageTimer:
+    """Context manager that observes elapsed time into a pre-bound histogram child"""
+
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: Any):
+        self._histogram = histogram
+
+    def __enter__(self) -> "StageTimer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+@lru_cache(maxsize=None)
+def _stage_child(pipeline: str, stage: str) -> Any:
+    # labels() takes a lock and builds a key on every call; resolve each child once
+    return STAGE_SECONDS.labels(pipeline, stage)
+
+
+def stage(pipeline: str, name: str) -> StageTimer:
+    """Time a block as `name` within the `pipeline` ("itinerary" or "vacation")"""
+    return StageTimer(_stage_child(pipeline, name))
+
+
+def record_cache(cache: str, hits: int, misses: int = 0) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def record_llm_call(model: str, outcome: str, seconds: float, response: Any = None) -> None:
+    LLM_CALL_SECONDS.labels(model, outcome).observe(seconds)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        LLM_TOKENS.labels(model, "prompt").inc(getattr(usage, "prompt_token_count", 0) or 0)
+        LLM_TOKENS.labels(model, "response").inc(getattr(usage, "candidates_token_count", 0) or 0)
+        # Part of the prompt count that was served from an upstream context cache
+        LLM_TOKENS.labels(model, "cached").inc(getattr(usage, "cached_content_token_count", 0) or 0)
+
+
+def render() -> Tuple[bytes, str]:
+    """Serialize all metrics in the Prometheus text format"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,74 @@
+"""
+Precomputed responses for static JSON payloads.
+The question sets never change while the process runs, so they are
+serialized and compressed once at import and served straight from memory,
+with a content-hash ETag for conditional requests and a long Cache-Control.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+QUESTIONS_MAX_AGE = int(os.getenv("QUESTIONS_MAX_AGE", "86400"))
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    encodings: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            encodings[name.strip().lower()] = q
+    return encodings
+
+
+class PrecomputedJSON:
+    """A JSON payload serialized once, with gzip and (if available) brotli variants"""
+
+    def __init__(self, data: Any, max_age: int = QUESTIONS_MAX_AGE):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.variants: Dict[str, bytes] = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+        self.headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={max_age}",
+            "Vary": "Accept-Encoding",
+        }
+
+    def _not_modified(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as for GET: W/"x" matches "x"
+        return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+    def response(self, request: Request) -> Response:
+        if self._not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return Response(
+                    content=self.variants[encoding],
+                    media_type="application/json",
+                    headers={**self.headers, "Content-Encoding": encoding},
+                )
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
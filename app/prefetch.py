@@ -0,0 +1,155 @@
+"""
+Speculative itinerary prefetch after vacation recommendations.
+Most users follow /generate-vacation by picking one recommendation and
+asking for its itinerary over the same dates. With ITINERARY_PREFETCH
+enabled, the best-matched recommendations are generated in the background
+as soon as the vacation response is sent, and stored in the result cache,
+so that follow-up request is a cache hit (or joins the generation still in
+flight).
+
+Speculative work leaves headroom for real requests. A prefetch is only
+admitted while nothing is queued for an itinerary slot and, with it
+running, more than ITINERARY_PREFETCH_CONCURRENCY slots would still be
+free; it never waits in the admission queue, and is dropped instead. At
+most ITINERARY_PREFETCH_CONCURRENCY run at a time per worker, within
+ITINERARY_PREFETCH_TOKENS_PER_HOUR of budgeted output tokens per worker.
+A prefetch that was admitted keeps its slot until it finishes, so the
+headroom is what absorbs real traffic arriving meanwhile.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Set, Tuple
+
+from .admission import AdmissionController, Overloaded, itinerary_admission, speculative
+from .metrics import PREFETCH
+
+logger = logging.getLogger(__name__)
+
+ITINERARY_PREFETCH = os.getenv("ITINERARY_PREFETCH", "false").lower() in ("1", "true", "yes")
+# Recommendations prefetched per vacation response, best match_score first
+ITINERARY_PREFETCH_TOP = int(os.getenv("ITINERARY_PREFETCH_TOP", "2"))
+ITINERARY_PREFETCH_MIN_SCORE = int(os.getenv("ITINERARY_PREFETCH_MIN_SCORE", "80"))
+ITINERARY_PREFETCH_CONCURRENCY = int(os.getenv("ITINERARY_PREFETCH_CONCURRENCY", "2"))
+# Spend cap, counted as the output-token budgets of the prefetched itineraries
+ITINERARY_PREFETCH_TOKENS_PER_HOUR = int(os.getenv("ITINERARY_PREFETCH_TOKENS_PER_HOUR", "200000"))
+
+# Prefetched cache keys remembered to count hits
+_TRACKED_KEYS = 4096
+
+
+class Prefetcher:
+    """Runs speculative generations within a concurrency and hourly token cap"""
+
+    def __init__(
+        self,
+        admission: AdmissionController,
+        enabled: bool,
+        top: int,
+        min_score: int,
+        concurrency: int,
+        tokens_per_hour: int,
+    ):
+        self.admission = admission
+        self.enabled = enabled
+        self.top = top
+        self.min_score = min_score
+        self.concurrency = concurrency
+        self.tokens_per_hour = tokens_per_hour
+        self._spend: Deque[Tuple[float, int]] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._prefetched: "OrderedDict[str, None]" = OrderedDict()
+
+    @staticmethod
+    def _score(recommendation: Dict[str, Any]) -> float:
+        """A recommendation's match_score, or 0 if it is missing or not a number"""
+        try:
+            return float(recommendation["destination"]["match_score"])
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+
+    def pick(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The recommendations worth prefetching, best match first"""
+        scored = [r for r in recommendations if self._score(r) >= self.min_score]
+        scored.sort(key=self._score, reverse=True)
+        return scored[:self.top]
+
+    def spent(self) -> int:
+        """Output tokens budgeted for prefetches in the last hour"""
+        cutoff = time.monotonic() - 3600
+        while self._spend and self._spend[0][0] < cutoff:
+            self._spend.popleft()
+        return sum(tokens for _, tokens in self._spend)
+
+    def schedule(self, key: str, tokens: int, run: Callable[[], Awaitable[Any]]) -> bool:
+        """Start `run` in the background unless a cap is reached; `key` is its result cache key"""
+        # Same rule the admission controller applies when the prefetch gets there
+        busy = self.admission.queued or self.admission.in_flight + self.concurrency >= self.admission.max_in_flight
+        if busy or len(self._tasks) >= self.concurrency:
+            PREFETCH.labels("skipped_busy").inc()
+            return False
+        if self.spent() + tokens > self.tokens_per_hour:
+            PREFETCH.labels("skipped_budget").inc()
+            return False
+
+        reservation = (time.monotonic(), tokens)
+        self._spend.append(reservation)
+        task = asyncio.create_task(self._run(key, run, reservation))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    def _refund(self, reservation: Tuple[float, int]) -> None:
+        try:
+            self._spend.remove(reservation)
+        except ValueError:
+            pass
+
+    async def _run(self, key: str, run: Callable[[], Awaitable[Any]], reservation: Tuple[float, int]) -> None:
+        try:
+            with speculative(self.concurrency):
+                cache_status = await run()
+        except asyncio.CancelledError:
+            raise
+        except Overloaded:
+            # Real requests took the capacity in the meantime
+            PREFETCH.labels("skipped_busy").inc()
+            self._refund(reservation)
+            return
+        except Exception as e:
+            PREFETCH.labels("failed").inc()
+            logger.warning(f"Itinerary prefetch failed: {str(e)}")
+            return
+        if cache_status == "HIT":
+            # Already cached, so nothing was spent
+            PREFETCH.labels("cached").inc()
+            self._refund(reservation)
+            return
+        PREFETCH.labels("generated").inc()
+        self._prefetched[key] = None
+        while len(self._prefetched) > _TRACKED_KEYS:
+            self._prefetched.popitem(last=False)
+
+    def used(self, key: str) -> None:
+        """Count a cache hit on a prefetched result (the first one only)"""
+        if key in self._prefetched:
+            del self._prefetched[key]
+            PREFETCH.labels("used").inc()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+itinerary_prefetcher = Prefetcher(
+    itinerary_admission,
+    ITINERARY_PREFETCH,
+    ITINERARY_PREFETCH_TOP,
+    ITINERARY_PREFETCH_MIN_SCORE,
+    ITINERARY_PREFETCH_CONCURRENCY,
+    ITINERARY_PREFETCH_TOKENS_PER_HOUR,
+)
@@ -0,0 +1,142 @@
+"""
+Tail-latency protection for upstream Gemini calls.
+A per-request deadline bounds how long any generation may take, a rolling
+latency window gives the p95 budget after which a call is hedged, and a
+circuit breaker moves traffic to the fallback model tier while the primary
+tier's error rate is high.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a generation runs past its request deadline"""
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("generation_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound every Gemini call made in this context (and tasks it spawns) to `seconds` from now"""
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    # A nested deadline can only tighten the outer one
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_to_deadline() -> Optional[float]:
+    """Seconds until the current deadline, or None outside of one"""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def time_left(default: float) -> float:
+    """Seconds until the current deadline, capped at `default`"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return default
+    return min(default, expires_at - time.monotonic())
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile `q`, or None until enough calls have been seen"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class CircuitBreaker:
+    """Opens when the recent error rate crosses a threshold.
+
+    While open, `allow()` is False and callers should use the fallback tier.
+    After `cooldown` seconds a single probe call is let through; its outcome
+    closes the breaker or keeps it open for another cooldown. `on_change` is
+    called with True when the breaker opens and False when it closes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        cooldown: float,
+        on_change: Optional[Callable[[bool], None]] = None,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._on_change = on_change
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = time.monotonic()
+        # A probe that never reported back (e.g. cancelled) doesn't block the next one
+        if self._probe_started is not None and now - self._probe_started < self.cooldown:
+            return False
+        self._probe_started = now
+        return True
+
+    def record(self, ok: bool) -> None:
+        if self._opened_at is not None:
+            if self._probe_started is None:
+                # A call started before the breaker opened
+                return
+            self._probe_started = None
+            if ok:
+                logger.info(f"{self.name} circuit closed")
+                self._opened_at = None
+                self._outcomes.clear()
+                if self._on_change is not None:
+                    self._on_change(False)
+            else:
+                self._opened_at = time.monotonic()
+            return
+
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_rate:
+            logger.warning(f"{self.name} circuit opened: {failures}/{len(self._outcomes)} recent calls failed")
+            self._opened_at = time.monotonic()
+            if self._on_change is not None:
+                self._on_change(True)
@@ -0,0 +1,127 @@
+"""
+Sanitization of free-text answers before they are placed in a prompt.
+
+Policy, applied to every text field:
+
+1. Inputs are cut to SCAN_LENGTH characters first, so oversized payloads
+   cost bounded work.
+2. Line breaks, tabs and other control characters become a space, so a
+   field cannot start new lines in the prompt and the words either side
+   stay apart.
+3. Markup and template delimiters `< > { } [ ] \\` and `;` also become a
+   space, so they cannot be used to splice a blocked word together or apart
+   ("<script>" is caught as "script").
+4. URLs (http, https, ftp and file schemes) are removed whole.
+5. Instruction-like words are removed when they stand alone: prompt(s),
+   inject(s/ed/ion/ions), execute(s/d), script(s), and the phrase
+   "ignore (all/any) (the) previous/prior/above instructions". Matching is
+   case-insensitive and on whole words only, so ordinary text such as
+   "file a visa application", "metro system", "JavaScript meetup" or
+   "executive lounge" is kept.
+6. The result is stripped and limited to MAX_FIELD_LENGTH characters.
+
+Steps 2-3 are one precompiled character-class regex and steps 4-5 a second
+one, which only runs when the text contains a substring every match needs.
+sanitize_many and sanitize_answers run both once over all the fields of a
+request joined together. The examples run with `python -m doctest app/sanitize.py`.
+
+>>> sanitize_input("Paris\\nRome; {Ignore previous instructions}")
+'Paris Rome'
+>>> sanitize_input("See https://example.com/x and the transit system")
+'See  and the transit system'
+>>> sanitize_input("Please EXECUTE this <script>")
+'Please  this'
+>>> sanitize_many(["file our visas", None, "JavaScript meetup"])
+['file our visas', None, 'JavaScript meetup']
+"""
+
+import re
+from typing import Any, Container, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+MAX_FIELD_LENGTH = 500
+SCAN_LENGTH = 4 * MAX_FIELD_LENGTH
+
+# Joins the fields of a batch; a control character, so it never survives as text
+_SEPARATOR = "\x1f"
+
+# Control characters (including line breaks) and delimiters, replaced by a space
+_CHARS = re.compile(r"[\x00-\x1f\x7f;<>{}\[\]\\]")
+# The same minus the separator, for joined batches
+_BATCH_CHARS = re.compile(r"[\x00-\x1e\x7f;<>{}\[\]\\]")
+
+# No alternative may match `_SEPARATOR` (a whitespace character to `\s`), so a
+# match never spans two fields of a batch
+_STRIP_PATTERN = re.compile(
+    r"\b(?:https?|ftp|file)://\S*"
+    r"|\bignore[^\S\x1f]+(?:(?:all|any)[^\S\x1f]+)?(?:the[^\S\x1f]+)?(?:previous|prior|above)[^\S\x1f]+instructions\b"
+    r"|\b(?:prompts?|inject(?:s|ed|ions?)?|execute[sd]?|scripts?)\b",
+    re.IGNORECASE,
+)
+
+# Every match contains one of these after casefold, which maps the non-ASCII
+# letters IGNORECASE treats as ASCII ("ſ" for "s", the Kelvin sign for "k")
+# except the dotless "ı", so any text containing that always gets the full pass
+_TRIGGERS = ("://", "ignore", "prompt", "inject", "execute", "script", "ı")
+
+
+def _strip(text: str) -> str:
+    folded = text.casefold()
+    if any(trigger in folded for trigger in _TRIGGERS):
+        return _STRIP_PATTERN.sub("", text)
+    return text
+
+
+def sanitize_input(text: Optional[str]) -> Optional[str]:
+    """Sanitize one field to prevent prompt injection"""
+    if not text:
+        return text
+    return _strip(_CHARS.sub(" ", text[:SCAN_LENGTH])).strip()[:MAX_FIELD_LENGTH]
+
+
+def sanitize_many(texts: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """Sanitize several fields with a single regex pass; empty values are returned as given"""
+    present = [i for i, text in enumerate(texts) if text]
+    fields = [texts[i][:SCAN_LENGTH] for i in present]
+    joined = _SEPARATOR.join(fields)
+    if joined.count(_SEPARATOR) != len(fields) - 1:
+        # Some input contains the separator itself; blank it like any other control character
+        joined = _SEPARATOR.join(field.replace(_SEPARATOR, " ") for field in fields)
+    parts = _strip(_BATCH_CHARS.sub(" ", joined)).split(_SEPARATOR)
+
+    sanitized = list(texts)
+    for i, part in zip(present, parts):
+        sanitized[i] = part.strip()[:MAX_FIELD_LENGTH]
+    return sanitized
+
+
+def sanitize_answers(answers: BaseModel, exclude: Container[str] = ()) -> Dict[str, Any]:
+    """Sanitize every string and list-of-strings field of an answers model in one batch.
+
+    Fields named in `exclude` (and non-text fields) are copied unchanged.
+    """
+    data = {name: getattr(answers, name) for name in type(answers).model_fields}
+
+    # (field, index in list or None) for each string handed to sanitize_many
+    slots = []
+    texts = []
+    for name, value in data.items():
+        if name in exclude:
+            continue
+        if isinstance(value, str):
+            slots.append((name, None))
+            texts.append(value)
+        elif isinstance(value, list):
+            data[name] = value = list(value)
+            for index, item in enumerate(value):
+                if isinstance(item, str):
+                    slots.append((name, index))
+                    texts.append(item)
+
+    for (name, index), text in zip(slots, sanitize_many(texts)):
+        if index is None:
+            data[name] = text
+        else:
+            data[name][index] = text
+    return data
@@ -0,0 +1,189 @@
+"""
+Output schemas for Gemini structured generation.
+These models are passed to Gemini as the JSON response schema and used to
+validate what comes back, so the output shape is enforced by the model
+rather than recovered from free text.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type, get_args, get_origin
+
+from pydantic import BaseModel, Field, create_model
+
+
+class TripDuration(BaseModel):
+    start_date: str = Field(..., description="YYYY-MM-DD")
+    end_date: str = Field(..., description="YYYY-MM-DD")
+    total_days: int
+
+
+class DayPlan(BaseModel):
+    day_number: int
+    date: str = Field(..., description="YYYY-MM-DD")
+    title: str
+    description: str = Field(..., description="Detailed description of the day's activities")
+
+
+class PlaceRecommendation(BaseModel):
+    name: str
+    address: str = Field(..., description="Full address including street, city, state, zip code")
+
+
+class CityRecommendations(BaseModel):
+    city: str
+    recommendations: List[PlaceRecommendation]
+
+
+class EstimatedCosts(BaseModel):
+    currency: str = Field(..., description="Currency code of the departure location")
+    minimum_total: float
+    maximum_total: float
+
+
+class Itinerary(BaseModel):
+    summary: str = Field(..., description="Brief engaging overview of the trip")
+    destinations: List[str]
+    trip_duration: TripDuration
+    daily_itinerary: List[DayPlan]
+    accommodation: List[CityRecommendations]
+    dining: List[CityRecommendations]
+    hidden_gems: List[str]
+    estimated_costs: EstimatedCosts
+
+
+class TripItineraryOutput(BaseModel):
+    itinerary: Itinerary
+
+
+class DayOutline(BaseModel):
+    day_number: int
+    date: str = Field(..., description="YYYY-MM-DD")
+    city: str
+    title: str
+
+
+class TripSkeleton(BaseModel):
+    summary: str = Field(..., description="Brief engaging overview of the trip")
+    destinations: List[str]
+    trip_duration: TripDuration
+    estimated_costs: EstimatedCosts
+    day_outline: List[DayOutline] = Field(..., description="One entry per day of the trip")
+
+
+class CityGuide(BaseModel):
+    accommodation: List[PlaceRecommendation]
+    dining: List[PlaceRecommendation]
+    hidden_gems: List[str]
+
+
+class VacationDestination(BaseModel):
+    country: str
+    region: str = Field(..., description="Specific region/city")
+    match_score: int = Field(..., description="0-100 score based on preference match")
+
+
+class CostBreakdown(BaseModel):
+    accommodation: float
+    food: float
+    activities: float
+    transportation: float
+
+
+class VacationCosts(BaseModel):
+    currency: str = Field(..., description="Currency code of the departure location")
+    total_per_person: float
+    breakdown: CostBreakdown
+
+
+class VisaRequirements(BaseModel):
+    type: str = Field(..., description="visa-free/visa-on-arrival/e-visa/embassy-visa")
+    processing_time: str
+    cost: str
+    requirements: List[str]
+
+
+class BestTimeToVisit(BaseModel):
+    peak_season: List[str]
+    shoulder_season: List[str]
+    weather: str = Field(..., description="Description of weather during requested dates")
+
+
+class TransportationAssessment(BaseModel):
+    score: int = Field(..., description="1-10")
+    explanation: str
+    main_options: List[str]
+
+
+class SafetyAssessment(BaseModel):
+    score: int = Field(..., description="1-10")
+    explanation: str
+    special_considerations: List[str]
+
+
+class Activity(BaseModel):
+    name: str
+    description: str
+    estimated_cost: str
+
+
+class RecommendedDuration(BaseModel):
+    minimum_days: int
+    optimal_days: int
+    explanation: str
+
+
+class VacationRecommendation(BaseModel):
+    destination: VacationDestination
+    why_perfect_match: str
+    costs: VacationCosts
+    visa_requirements: VisaRequirements
+    best_time_to_visit: BestTimeToVisit
+    transportation: TransportationAssessment
+    safety: SafetyAssessment
+    must_do_activities: List[Activity]
+    recommended_duration: RecommendedDuration
+
+
+class SearchCriteria(BaseModel):
+    vacation_style: str
+    budget_range: str
+    dates: str
+
+
+class VacationMeta(BaseModel):
+    currency: str
+    search_criteria: SearchCriteria
+
+
+class VacationOutput(BaseModel):
+    summary: str = Field(..., description="Brief engaging overview of the trip")
+    recommendations: List[VacationRecommendation]
+    meta: VacationMeta
+
+
+@lru_cache(maxsize=64)
+def section_schema(schema: Type[BaseModel], sections: Tuple[str, ...]) -> Type[BaseModel]:
+    """Build a schema containing only the given top-level sections of `schema`"""
+    fields = {name: (schema.model_fields[name].annotation, ...) for name in sections}
+    return create_model(f"{schema.__name__}Sections", **fields)
+
+
+_SKETCH_TYPES = {str: "str", int: "int", float: "number", bool: "bool"}
+
+
+def _sketch(annotation: Any, description: Optional[str]) -> Any:
+    if get_origin(annotation) is list:
+        return [_sketch(get_args(annotation)[0], None)]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {name: _sketch(field.annotation, field.description) for name, field in annotation.model_fields.items()}
+    kind = _SKETCH_TYPES.get(annotation, "str")
+    if description is None:
+        return kind
+    return description if annotation is str else f"{kind} {description}"
+
+
+@lru_cache(maxsize=64)
+def schema_sketch(schema: Type[BaseModel]) -> str:
+    """One-line JSON outline of `schema` for prompts: each field's type, or its description for strings"""
+    return json.dumps(_sketch(schema, None), separators=(",", ":"))
@@ -0,0 +1,50 @@
+"""
+Single-flight coalescing for identical in-flight generation requests.
+Concurrent callers with the same key share one upstream call and all receive
+its result or its exception.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            logger.info(f"Joining in-flight generation {key[:24]}")
+
+        # Shield the shared task so one caller disconnecting doesn't cancel
+        # the call for everybody else still waiting on it
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+
+def prompt_key(kind: str, prompt: str) -> str:
+    """Build a coalescing key from the canonical prompt text"""
+    return f"{kind}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+
+generation_flight = SingleFlight()
@@ -0,0 +1,41 @@
+"""
+SQLite databases shared by every worker process on the host.
+Used by the disk result cache and the job store.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Sequence
+
+
+class SQLiteDatabase:
+    """A SQLite file with one connection per thread.
+
+    WAL mode lets every worker read while one writes. The schema statements
+    run once when the database is opened; sqlite3.Error or OSError is raised
+    if it can't be.
+    """
+
+    BUSY_TIMEOUT_MS = 5000
+
+    def __init__(self, path: str, schema: Sequence[str]):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        for statement in schema:
+            conn.execute(statement)
+
+    def connect(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,164 @@
+"""
+Incremental JSON parsing and Server-Sent Events helpers for streamed generation.
+The parser consumes model output chunk by chunk and reports each nested value
+as soon as its closing character arrives, so sections of an itinerary can be
+sent to the client before the whole document has been generated.
+"""
+
+import json
+from typing import Any, Callable, List, Optional, Tuple
+
+from . import fastjson
+
+Path = Tuple[Any, ...]
+
+_WHITESPACE = " \t\r\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "start", "key", "index", "expecting_key")
+
+    def __init__(self, kind: str, path: Path, start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expecting_key = kind == "object"
+
+    def child_path(self) -> Path:
+        return self.path + ((self.key,) if self.kind == "object" else (self.index,))
+
+
+class IncrementalJSONParser:
+    """Streaming scanner that emits (path, value) pairs for completed values.
+
+    Text before the first '{' (e.g. a ```json fence) and after the root object
+    is ignored. Only values whose path satisfies ``want`` are decoded, so
+    large enclosing containers are never parsed twice.
+    """
+
+    def __init__(self, want: Callable[[Path], bool]):
+        self.want = want
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._token_start: Optional[int] = None
+        self._string_is_key = False
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        self._buf += chunk
+        events: List[Tuple[Path, Any]] = []
+        buf = self._buf
+        i = self._pos
+        end = len(buf)
+
+        while i < end and not self._done:
+            c = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    raw = buf[self._token_start:i + 1]
+                    self._token_start = None
+                    if self._string_is_key:
+                        frame.key = json.loads(raw)
+                    else:
+                        self._emit(frame.child_path(), raw, events)
+                i += 1
+                continue
+
+            if not self._stack:
+                # Skip anything before the root object
+                if c == "{":
+                    self._stack.append(_Frame("object", (), i))
+                i += 1
+                continue
+
+            frame = self._stack[-1]
+            if c == '"':
+                self._in_string = True
+                self._token_start = i
+                self._string_is_key = frame.kind == "object" and frame.expecting_key
+            elif c in "{[":
+                self._stack.append(_Frame("object" if c == "{" else "array", frame.child_path(), i))
+            elif c in "}]":
+                self._flush_scalar(i, events)
+                closed = self._stack.pop()
+                if self._stack:
+                    self._emit(closed.path, buf[closed.start:i + 1], events)
+                else:
+                    self._done = True
+            elif c == ":":
+                frame.expecting_key = False
+            elif c == ",":
+                self._flush_scalar(i, events)
+                if frame.kind == "array":
+                    frame.index += 1
+                else:
+                    frame.expecting_key = True
+            elif c not in _WHITESPACE and self._token_start is None:
+                # Start of a number or a true/false/null literal
+                self._token_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def _flush_scalar(self, i: int, events: List[Tuple[Path, Any]]) -> None:
+        if self._token_start is None:
+            return
+        raw = self._buf[self._token_start:i].strip()
+        self._token_start = None
+        if raw:
+            self._emit(self._stack[-1].child_path(), raw, events)
+
+    def _emit(self, path: Path, raw: str, events: List[Tuple[Path, Any]]) -> None:
+        if not self.want(path):
+            return
+        try:
+            events.append((path, fastjson.loads(raw)))
+        except fastjson.JSONDecodeError:
+            # Leave malformed fragments to the final full-document parse
+            pass
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {fastjson.dumps(data).decode('utf-8')}\n\n"
+
+
+def _itinerary_path(path: Path) -> Path:
+    # The prompt wraps the itinerary in an "itinerary" key, but models
+    # sometimes return the inner object directly
+    if path and path[0] == "itinerary":
+        return path[1:]
+    return path
+
+
+def want_itinerary_section(path: Path) -> bool:
+    """Select top-level itinerary sections and individual daily_itinerary entries"""
+    inner = _itinerary_path(path)
+    if len(inner) == 1:
+        return inner[0] != "daily_itinerary"
+    return len(inner) == 2 and inner[0] == "daily_itinerary"
+
+
+def itinerary_event(path: Path, value: Any) -> Tuple[str, Any]:
+    """Map a completed itinerary value onto an SSE event name and payload"""
+    inner = _itinerary_path(path)
+    if inner[0] == "daily_itinerary":
+        return "day", value
+    return inner[0], value
@@ -0,0 +1,250 @@
+"""
+Benchmark suite for the API endpoints.
+Starts one uvicorn worker on the stub LLM backend (no network), drives
+/questions, /vacation-questions, /generate-itinerary and /generate-vacation
+at each requested concurrency, and reports throughput, p50/p95/p99 latency,
+event-loop lag and worker memory. Results are saved as JSON; pass an earlier
+file as --baseline to see the change between commits.
+
+Usage: python -m benchmarks.api_suite [--concurrency 1 16 64] [--requests 500]
+       [--generation-requests 100] [--stub-latency 0.5] [--cache miss|hit]
+       [--baseline benchmarks/results/<earlier>.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .load_generation import TRIP_PAYLOAD
+
+VACATION_PAYLOAD = {
+    "vacation_style": ["Beach", "Cultural"],
+    "departure_location": "New York City",
+    "start_date": "2025-07-01",
+    "end_date": "2025-07-10",
+    "budget": "USD 1500-2500",
+    "preferred_region": "Europe",
+    "visa_flexibility": "Visa-free only",
+    "special_requirements": "None",
+    "group_size": "Couple",
+}
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# name -> (method, path, build json body for request i, is a generation endpoint)
+Scenario = Tuple[str, str, Optional[Callable[[int, str], Dict[str, Any]]], bool]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "questions": ("GET", "/questions", None, False),
+    "vacation-questions": ("GET", "/vacation-questions", None, False),
+    "generate-itinerary": (
+        "POST", "/generate-itinerary",
+        lambda i, cache: dict(TRIP_PAYLOAD, start_location=f"Benchmark City {i}") if cache == "miss" else TRIP_PAYLOAD,
+        True,
+    ),
+    "generate-vacation": (
+        "POST", "/generate-vacation",
+        lambda i, cache: dict(VACATION_PAYLOAD, departure_location=f"Benchmark City {i}") if cache == "miss" else VACATION_PAYLOAD,
+        True,
+    ),
+}
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_worker(port: int, args: argparse.Namespace, workdir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        LLM_BACKEND="stub",
+        STUB_LATENCY=str(args.stub_latency),
+        STUB_TOKENS_PER_SECOND=str(args.stub_tokens_per_second),
+        STUB_SEED="0",
+        RESULT_CACHE_DB="",
+        JOBS_DB=os.path.join(workdir, "jobs.sqlite3"),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, worker: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if worker.poll() is not None:
+            raise SystemExit(f"Worker exited with code {worker.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise SystemExit("Worker did not start in time")
+
+
+async def drive(client: httpx.AsyncClient, name: str, concurrency: int, total: int, cache: str) -> Dict[str, Any]:
+    """Closed-loop load: `concurrency` clients issue `total` requests between them"""
+    method, path, body, generation = SCENARIOS[name]
+    params = {"bypass_cache": "true"} if generation and cache == "miss" else None
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = itertools.count()
+
+    async def client_loop() -> None:
+        for i in iter(lambda: next(counter), None):
+            if i >= total:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    method, path, json=body(i, cache) if body else None, params=params
+                )
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            statuses[str(response.status_code)] += 1
+            if response.status_code < 400:
+                latencies.append(time.perf_counter() - started)
+
+    await client.post("/__bench__/reset")
+    started = time.perf_counter()
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    probes = (await client.get("/__bench__/stats")).json()
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "wall_time_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies, default=0.0) * 1000, 2),
+        },
+        "statuses": dict(statuses),
+        **probes,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    port = _free_port()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        worker = start_worker(port, args, workdir)
+        try:
+            limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+                await wait_ready(client, worker)
+                for name in args.scenarios:
+                    total = args.generation_requests if SCENARIOS[name][3] else args.requests
+                    for concurrency in args.concurrency:
+                        result = await drive(client, name, concurrency, total, args.cache)
+                        results.append(result)
+                        print(
+                            f"{name:<20} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                            f"p50 {result['latency_ms']['p50']:>8.1f}ms  p95 {result['latency_ms']['p95']:>8.1f}ms  "
+                            f"p99 {result['latency_ms']['p99']:>8.1f}ms  lag p99 {result['loop_lag_ms']['p99']:>6.1f}ms  "
+                            f"rss {result['rss_mb']:>6.1f}MB  {result['statuses']}",
+                            file=sys.stderr,
+                        )
+        finally:
+            worker.terminate()
+            worker.wait(timeout=10)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old:+.1%}" if old else "n/a"
+
+    print(f"\nChange vs {baseline_path}:", file=sys.stderr)
+    for result in results:
+        old = baseline.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        print(
+            f"{result['scenario']:<20} c={result['concurrency']:<4} "
+            f"throughput {change(result['throughput_rps'], old['throughput_rps']):>8}  "
+            f"p95 {change(result['latency_ms']['p95'], old['latency_ms']['p95']):>8}  "
+            f"p99 {change(result['latency_ms']['p99'], old['latency_ms']['p99']):>8}",
+            file=sys.stderr,
+        )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="requests per run for the questions endpoints")
+    parser.add_argument("--generation-requests", type=int, default=100, help="requests per run for the generate endpoints")
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="stub time to first token, seconds")
+    parser.add_argument("--stub-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--cache", choices=("miss", "hit"), default="miss",
+                        help="miss: unique payloads with bypass_cache; hit: one repeated payload")
+    parser.add_argument("--output", help="where to save the JSON results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(UTC).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"api-{commit or 'nogit'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}", file=sys.stderr)
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,65 @@
+"""
+The API app with benchmark probes, served by benchmarks.api_suite.
+Adds an event-loop lag monitor and /__bench__ routes that report lag and
+resident memory for this worker. Never deploy this module.
+"""
+
+import asyncio
+import os
+import resource
+import time
+from typing import List, Optional
+
+from app.main import app
+
+LAG_INTERVAL = 0.01
+
+_lag_samples: List[float] = []
+_monitor: Optional[asyncio.Task] = None
+
+
+async def _monitor_lag() -> None:
+    # Sleep a fixed interval and record how late the loop wakes us up
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        _lag_samples.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@app.post("/__bench__/reset", include_in_schema=False)
+async def reset_probes():
+    global _monitor
+    if _monitor is None:
+        _monitor = asyncio.create_task(_monitor_lag())
+    _lag_samples.clear()
+    return {"rss_mb": round(_rss_mb(), 1)}
+
+
+@app.get("/__bench__/stats", include_in_schema=False)
+async def probe_stats():
+    samples = list(_lag_samples)
+    return {
+        "loop_lag_ms": {
+            "p50": round(_percentile(samples, 0.50) * 1000, 2),
+            "p99": round(_percentile(samples, 0.99) * 1000, 2),
+            "max": round(max(samples, default=0.0) * 1000, 2),
+        },
+        "rss_mb": round(_rss_mb(), 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
@@ -0,0 +1,149 @@
+"""
+Benchmark chunked vs single-shot generation of long itineraries.
+Uses a fake Gemini model whose latency is a fixed time-to-first-token plus
+output size divided by a token rate, which is how real generation time
+scales with the number of days requested.
+
+Usage: python -m benchmarks.chunked_generation [--days 7 14 30] [--chunk-days 7]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+# The fake models have no cache service behind them
+os.environ.setdefault("GEMINI_CONTEXT_CACHE", "false")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+from app import chunking, llm, main  # noqa: E402
+from app.backends import gemini  # noqa: E402
+
+DESCRIPTION = "Morning walking tour of the old town, lunch at a local market, afternoon museum visit. " * 6
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class TokenRateModel:
+    """Fake model: latency = ttft + output tokens / tokens_per_second"""
+
+    ttft = 0.5
+    tokens_per_second = 250.0
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def generate_content_async(self, prompt, **kwargs):
+        TokenRateModel.calls += 1
+        text = json.dumps(self._respond(prompt))
+        await asyncio.sleep(self.ttft + len(text) / 4 / self.tokens_per_second)
+        return FakeResponse(text)
+
+    def _respond(self, prompt: str) -> dict:
+        days = int(re.search(r"Duration: (\d+)", prompt).group(1)) + 1
+        start = datetime.strptime(re.search(r"from (\d{4}-\d{2}-\d{2})", prompt).group(1), "%Y-%m-%d")
+        head = {
+            "summary": "A long trip",
+            "destinations": ["Paris", "Rome"],
+            "trip_duration": {"start_date": "2025-07-01", "end_date": "2025-07-30", "total_days": days},
+            "estimated_costs": {"currency": "USD", "minimum_total": 3000, "maximum_total": 5000},
+        }
+        city = {
+            "accommodation": [{"city": "Paris", "recommendations": [{"name": "Hotel", "address": "1 Rue"}] * 3}],
+            "dining": [{"city": "Paris", "recommendations": [{"name": "Bistro", "address": "2 Rue"}] * 3}],
+            "hidden_gems": ["Canal Saint-Martin"] * 4,
+        }
+
+        def plans(first: int, last: int) -> list:
+            return [
+                {"day_number": n, "date": (start + timedelta(days=n - 1)).strftime("%Y-%m-%d"), "title": f"Day {n}", "description": DESCRIPTION}
+                for n in range(first, last + 1)
+            ]
+
+        window = re.search(r"itinerary for days (\d+) to (\d+)", prompt)
+        if window:
+            return {"daily_itinerary": plans(int(window.group(1)), int(window.group(2)))}
+        if "outline the trip below" in prompt:
+            outline = [{"day_number": d["day_number"], "date": d["date"], "city": "Paris", "title": d["title"]} for d in plans(1, days)]
+            return dict(head, day_outline=outline)
+        if "only these keys: accommodation" in prompt:
+            return city
+        if "only these keys" in prompt:
+            return dict(head, daily_itinerary=plans(1, days))
+        return {"itinerary": dict(head, daily_itinerary=plans(1, days), **city)}
+
+
+def sanitized_answers(days: int) -> dict:
+    start = datetime(2025, 7, 1)
+    return {
+        "start_location": "New York City",
+        "destinations": "Paris, Rome",
+        "budget": "USD 150-250/day",
+        "travel_style": ["Cultural"],
+        "accommodation": ["Hotel"],
+        "interests": ["Food", "History"],
+        "group_size": "Couple",
+        "transportation": "Train",
+        "dietary_restrictions": None,
+        "special_requirements": None,
+        "pace": "Moderate",
+        "start_date": start.strftime("%Y-%m-%d"),
+        "end_date": (start + timedelta(days=days - 1)).strftime("%Y-%m-%d"),
+        "duration": days - 1,
+    }
+
+
+async def measure(days: int, chunk_days: int) -> dict:
+    chunking.CHUNK_DAYS = chunk_days
+    TokenRateModel.calls = 0
+    answers = sanitized_answers(days)
+    started = time.perf_counter()
+    itinerary = await main._complete_itinerary(main.create_trip_prompt(answers), answers)
+    elapsed = time.perf_counter() - started
+    return {
+        "wall_time_s": round(elapsed, 3),
+        "upstream_calls": TokenRateModel.calls,
+        "days_returned": len(itinerary["itinerary"].get("daily_itinerary", [])),
+    }
+
+
+async def run(day_counts: list, chunk_days: int) -> list:
+    gemini.genai.GenerativeModel = TokenRateModel
+    llm.backend = gemini.GeminiBackend([llm.GEMINI_MODEL])
+    results = []
+    for days in day_counts:
+        single = await measure(days, 0)
+        chunked = await measure(days, chunk_days)
+        results.append({
+            "days": days,
+            "chunk_days": chunk_days,
+            "single_shot": single,
+            "chunked": chunked,
+            "speedup": round(single["wall_time_s"] / chunked["wall_time_s"], 2),
+        })
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 14, 30])
+    parser.add_argument("--chunk-days", type=int, default=chunking.CHUNK_DAYS or 7)
+    parser.add_argument("--ttft", type=float, default=TokenRateModel.ttft)
+    parser.add_argument("--tokens-per-second", type=float, default=TokenRateModel.tokens_per_second)
+    args = parser.parse_args()
+
+    TokenRateModel.ttft = args.ttft
+    TokenRateModel.tokens_per_second = args.tokens_per_second
+    print(json.dumps(asyncio.run(run(args.days, args.chunk_days)), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark of per-request Gemini client setup.
+Compares building a GenerativeModel on every request (reading the API key,
+rebuilding the safety settings and converting the generation config each
+time) with the pre-built handles held by the Gemini backend. Both paths build
+the full GenerateContentRequest, so only the network call is left out.
+
+Usage: python -m benchmarks.client_setup [--iterations 2000]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+import google.generativeai as genai  # noqa: E402
+
+from app import llm  # noqa: E402
+from app.backends.gemini import GeminiBackend, json_generation_config  # noqa: E402
+from app.schemas import TripItineraryOutput  # noqa: E402
+
+registry = GeminiBackend([llm.GEMINI_MODEL])
+
+PROMPT = "Create a detailed 5-day trip itinerary for Paris and Rome. " * 20
+
+
+def per_request_setup() -> object:
+    if not os.getenv("GEMINI_API_KEY"):
+        raise SystemExit("GEMINI_API_KEY is not set")
+    safety_settings = {
+        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE'
+    }
+    model = genai.GenerativeModel(llm.GEMINI_MODEL)
+    return model._prepare_request(
+        contents=PROMPT,
+        generation_config=json_generation_config(TripItineraryOutput),
+        safety_settings=safety_settings,
+        tools=None,
+        tool_config=None,
+    )
+
+
+def registry_setup() -> object:
+    model = registry.model(llm.GEMINI_MODEL, TripItineraryOutput)
+    return model._prepare_request(contents=PROMPT, tools=None, tool_config=None)
+
+
+def measure(fn, iterations: int) -> dict:
+    # Both paths must produce the same request
+    assert per_request_setup() == registry_setup()
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    return {"per_call_us": round(elapsed / iterations * 1e6, 1)}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    registry.configure(os.getenv("GEMINI_API_KEY"))
+    before = measure(per_request_setup, args.iterations)
+    after = measure(registry_setup, args.iterations)
+    print(json.dumps({
+        "iterations": args.iterations,
+        "per_request_model": before,
+        "model_registry": after,
+        "saved_per_call_us": round(before["per_call_us"] - after["per_call_us"], 1),
+        "speedup": round(before["per_call_us"] / after["per_call_us"], 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,115 @@
+"""
+Benchmark of sending the static prompt instructions as a cached system instruction.
+Runs /generate-itinerary and /generate-vacation on the stub backend with
+context caching off (the whole prompt is prefilled on every call) and on
+(the system instruction registered at startup is served from the cache),
+and reports latency and the uncached input tokens per upstream call, read
+from the usage metadata. Time to first token grows with uncached prompt
+length at --prefill-tokens-per-second.
+
+Like Gemini, the stub only caches instructions of at least
+--min-cache-tokens (default 1024, Gemini's minimum). The shipped
+instructions are smaller, so at the default nothing is cached; pass
+--min-cache-tokens 0 to see what caching would save if they qualified.
+
+Usage: python -m benchmarks.context_cache [--requests 50] [--stub-latency 0.2]
+       [--prefill-tokens-per-second 2000] [--min-cache-tokens 1024]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+import httpx  # noqa: E402
+
+from app import llm, main  # noqa: E402
+from app.backends.stub import StubBackend  # noqa: E402
+
+from .api_suite import VACATION_PAYLOAD  # noqa: E402
+from .load_generation import TRIP_PAYLOAD  # noqa: E402
+
+PIPELINES = {
+    "itinerary": ("/generate-itinerary", TRIP_PAYLOAD),
+    "vacation": ("/generate-vacation", VACATION_PAYLOAD),
+}
+
+
+class UsageRecorder:
+    """Wraps a backend and keeps the usage metadata of every generate call"""
+
+    def __init__(self, backend: StubBackend):
+        self.backend = backend
+        self.usage: List[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.backend, name)
+
+    async def generate(self, *args: Any, **kwargs: Any) -> Any:
+        response = await self.backend.generate(*args, **kwargs)
+        self.usage.append(response.usage_metadata)
+        return response
+
+
+async def run(context_cache: bool, args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = UsageRecorder(StubBackend(
+        latency=args.stub_latency,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        context_cache=context_cache,
+        context_cache_min_tokens=args.min_cache_tokens,
+        seed=0,
+    ))
+    llm.backend = recorder
+    results = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for pipeline, (path, payload) in PIPELINES.items():
+                recorder.usage.clear()
+                samples: List[float] = []
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = await client.post(path, json=payload, params={"bypass_cache": "true"})
+                    response.raise_for_status()
+                    samples.append(time.perf_counter() - started)
+                samples.sort()
+                results[pipeline] = {
+                    "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+                    "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 1),
+                    "prompt_tokens_per_call": statistics.fmean(u.prompt_token_count for u in recorder.usage),
+                    "uncached_tokens_per_call": statistics.fmean(
+                        u.prompt_token_count - u.cached_content_token_count for u in recorder.usage
+                    ),
+                }
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="sequential requests per pipeline and mode")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--min-cache-tokens", type=int, default=1024, help="smallest instruction the cache accepts")
+    args = parser.parse_args()
+
+    inline = asyncio.run(run(False, args))
+    cached = asyncio.run(run(True, args))
+    print(json.dumps({
+        "config": vars(args),
+        "inline": inline,
+        "cached": cached,
+        "latency_saving": {
+            pipeline: round(1 - cached[pipeline]["mean_ms"] / inline[pipeline]["mean_ms"], 3) for pipeline in PIPELINES
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
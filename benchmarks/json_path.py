@@ -0,0 +1,137 @@
+"""
+Microbenchmark of the JSON path for generation results.
+Uses a realistic 30-day, six-city itinerary and compares the stdlib path
+with app.fastjson for parsing the model output, rendering the
+/generate-itinerary response, and the result cache's store/load round trip.
+The previous response path validates the envelope through
+`response_model=Dict[str, Any]` and renders it with JSONResponse. The new
+path renders the already validated envelope directly.
+
+Usage: python -m benchmarks.json_path [--iterations 500]
+"""
+
+import argparse
+import json
+import os
+import time
+import zlib
+from datetime import date, timedelta
+from typing import Any, Callable, Dict
+
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from app import fastjson  # noqa: E402
+from app.data.samples import SAMPLE_ITINERARY  # noqa: E402
+from app.fastjson import FastJSONResponse  # noqa: E402
+from app.main import _itinerary_envelope  # noqa: E402
+from app.schemas import TripItineraryOutput  # noqa: E402
+
+CITIES = ["Paris", "Lyon", "Nice", "Rome", "Florence", "Venice"]
+DAYS = 30
+
+RESPONSE_FIELD = create_model_field("Response_generate_itinerary", Dict[str, Any], mode="serialization")
+
+
+def thirty_day_itinerary() -> Dict[str, Any]:
+    """Scale the sample itinerary to the size Gemini returns for a month-long trip"""
+    start = date(2025, 7, 1)
+    sample_days = SAMPLE_ITINERARY["daily_itinerary"]
+    days = []
+    for i in range(DAYS):
+        sample = sample_days[i % len(sample_days)]
+        city = CITIES[i * len(CITIES) // DAYS]
+        days.append({
+            "day_number": i + 1,
+            "date": (start + timedelta(days=i)).isoformat(),
+            "title": f"{city}: {sample['title']}",
+            # Real day descriptions run to several sentences of logistics and tips
+            "description": " ".join([sample["description"]] * 4),
+        })
+
+    def per_city(section: str) -> list:
+        recommendations = SAMPLE_ITINERARY[section][0]["recommendations"] * 2
+        return [{"city": city, "recommendations": recommendations} for city in CITIES]
+
+    return {"itinerary": {
+        **SAMPLE_ITINERARY,
+        "destinations": CITIES,
+        "trip_duration": {"start_date": days[0]["date"], "end_date": days[-1]["date"], "total_days": DAYS},
+        "daily_itinerary": days,
+        "accommodation": per_city("accommodation"),
+        "dining": per_city("dining"),
+        "hidden_gems": SAMPLE_ITINERARY["hidden_gems"] * len(CITIES),
+    }}
+
+
+def measure(fn: Callable[[], Any], iterations: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def compare(name: str, before: Callable[[], Any], after: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    before_us, after_us = measure(before, iterations), measure(after, iterations)
+    return {
+        "stage": name,
+        "stdlib_us": round(before_us, 1),
+        "fast_us": round(after_us, 1),
+        "speedup": round(before_us / after_us, 2),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    if not fastjson.FAST_JSON:
+        raise SystemExit("orjson is not installed (or FAST_JSON=false); nothing to compare")
+
+    itinerary = thirty_day_itinerary()
+    TripItineraryOutput.model_validate(itinerary)
+    model_text = json.dumps(itinerary, ensure_ascii=False)
+    envelope = _itinerary_envelope(itinerary, {"destinations": ", ".join(CITIES), "duration": DAYS - 1})
+    blob = zlib.compress(json.dumps(envelope["trip_itinerary"], separators=(",", ":")).encode("utf-8"))
+
+    def stdlib_response() -> bytes:
+        # What fastapi.routing.serialize_response does for response_model=Dict[str, Any]
+        value, _ = RESPONSE_FIELD.validate(envelope, {}, loc=("response",))
+        return JSONResponse(RESPONSE_FIELD.serialize(value, mode="json")).body
+
+    def fast_response() -> bytes:
+        return FastJSONResponse(envelope).body
+
+    # Both paths must send the same document
+    assert json.loads(stdlib_response()) == json.loads(fast_response())
+
+    results = [
+        compare("parse_model_output", lambda: json.loads(model_text), lambda: fastjson.loads(model_text), args.iterations),
+        compare("render_response", stdlib_response, fast_response, args.iterations),
+        compare(
+            "cache_store",
+            lambda: zlib.compress(json.dumps(itinerary, separators=(",", ":")).encode("utf-8")),
+            lambda: zlib.compress(fastjson.dumps(itinerary)),
+            args.iterations,
+        ),
+        compare(
+            "cache_load",
+            lambda: json.loads(zlib.decompress(blob)),
+            lambda: fastjson.loads(zlib.decompress(blob)),
+            args.iterations,
+        ),
+    ]
+    print(json.dumps({
+        "iterations": args.iterations,
+        "itinerary_days": DAYS,
+        "model_output_bytes": len(model_text.encode("utf-8")),
+        "response_bytes": len(fast_response()),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
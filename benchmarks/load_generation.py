@@ -0,0 +1,94 @@
+"""
+Load test for the generation endpoints.
+Fires N concurrent /generate-itinerary requests against the stub backend
+with a fixed latency, and checks that the batch finishes in about
+the time of a single call while /questions stays responsive.
+
+Usage: python -m benchmarks.load_generation [--requests 10] [--latency 1.0]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+
+import httpx
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+from app import llm, main  # noqa: E402
+from app.backends.stub import StubBackend  # noqa: E402
+
+TRIP_PAYLOAD = {
+    "start_location": "New York City",
+    "destinations": "Paris, Rome",
+    "budget": "USD 100-200/day",
+    "travel_style": ["Cultural"],
+    "accommodation": ["Hotel"],
+    "interests": ["Food", "History"],
+    "group_size": "Couple",
+    "transportation": "Train",
+    "start_date": "2025-07-01",
+    "end_date": "2025-07-05",
+}
+
+
+async def run(requests: int, latency: float) -> dict:
+    llm.backend = StubBackend(latency=latency)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        # Distinct payloads so every request pays for its own upstream call
+        generations = [
+            client.post(
+                "/generate-itinerary",
+                json=dict(TRIP_PAYLOAD, start_location=f"Benchmark City {i}"),
+                params={"bypass_cache": "true"},
+            )
+            for i in range(requests)
+        ]
+        gen_task = asyncio.gather(*generations)
+
+        # Probe a cheap endpoint while generations are in flight
+        await asyncio.sleep(latency / 4)
+        probe_started = time.perf_counter()
+        probe = await client.get("/questions")
+        probe_latency = time.perf_counter() - probe_started
+
+        responses = await gen_task
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "upstream_latency_s": latency,
+        "wall_time_s": round(elapsed, 3),
+        "serial_estimate_s": round(requests * latency, 3),
+        "speedup": round(requests * latency / elapsed, 2),
+        "questions_probe_s": round(probe_latency, 4),
+        "statuses": sorted({r.status_code for r in responses} | {probe.status_code}),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.requests, args.latency))
+    print(json.dumps(result, indent=2))
+
+    # Concurrent generations should take one upstream latency per concurrency
+    # window (GEMINI_MAX_CONCURRENCY or the admission limit), not one per request
+    window = min(llm.MAX_CONCURRENCY, main.itinerary_admission.max_in_flight)
+    waves = math.ceil(args.requests / window)
+    if result["wall_time_s"] > args.latency * (waves + 1):
+        raise SystemExit("Generations were serialized: event loop is being blocked")
+
+
+if __name__ == "__main__":
+    main_cli()
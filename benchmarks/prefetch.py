@@ -0,0 +1,84 @@
+"""
+Benchmark of speculative itinerary prefetch.
+Simulates the usual session on the stub backend: /generate-vacation, a pause
+while the user reads the recommendations (--think-time), then
+/generate-itinerary for the payload of the recommendation they picked. The
+run is done with prefetch off and on, for a user who picks the best match
+and one who picks the last recommendation, and reports the follow-up
+latency and the number of upstream calls per session (the speculative
+spend).
+
+Usage: python -m benchmarks.prefetch [--sessions 10] [--stub-latency 0.5]
+       [--think-time 2.0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+import httpx  # noqa: E402
+
+from app import llm, main  # noqa: E402
+from app.backends.stub import StubBackend  # noqa: E402
+from app.prefetch import itinerary_prefetcher  # noqa: E402
+
+from .api_suite import VACATION_PAYLOAD  # noqa: E402
+from .context_cache import UsageRecorder  # noqa: E402
+
+
+async def run(prefetch: bool, pick: int, args: argparse.Namespace) -> Dict[str, Any]:
+    itinerary_prefetcher.enabled = prefetch
+    recorder = UsageRecorder(StubBackend(latency=args.stub_latency, seed=0))
+    llm.backend = recorder
+    follow_up: List[float] = []
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for session in range(args.sessions):
+                # A different trip per run and session, so nothing is served from earlier ones
+                payload = {**VACATION_PAYLOAD, "special_requirements": f"Run {prefetch} {pick} session {session}"}
+                response = await client.post("/generate-vacation", json=payload)
+                response.raise_for_status()
+                body = response.json()
+                requests = body.get("itinerary_requests")
+                if requests and requests[pick] is not None:
+                    request = requests[pick]
+                else:
+                    recommendation = body["vacation_itinerary"]["recommendations"][pick]
+                    request = main._itinerary_request(main.VacationAnswers(**payload), recommendation)
+
+                await asyncio.sleep(args.think_time)
+                started = time.perf_counter()
+                response = await client.post("/generate-itinerary", json=request)
+                response.raise_for_status()
+                follow_up.append(time.perf_counter() - started)
+    return {
+        "follow_up_mean_ms": round(statistics.fmean(follow_up) * 1000, 1),
+        "follow_up_max_ms": round(max(follow_up) * 1000, 1),
+        "upstream_calls_per_session": round(len(recorder.usage) / args.sessions, 2),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--stub-latency", type=float, default=0.5)
+    parser.add_argument("--think-time", type=float, default=2.0, help="seconds between the two requests")
+    args = parser.parse_args()
+
+    results = {}
+    for prefetch in (False, True):
+        for name, pick in (("best_match", 0), ("last_match", -1)):
+            results[f"{'prefetch' if prefetch else 'no_prefetch'}/{name}"] = asyncio.run(run(prefetch, pick, args))
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
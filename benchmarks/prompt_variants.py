@@ -0,0 +1,129 @@
+"""
+Regression benchmark for the prompt variants.
+Reports the size (characters and estimated tokens, system instruction plus
+user part) and build time of the itinerary and vacation prompts for
+PROMPT_VARIANT=full and compact, then the end-to-end latency of
+/generate-itinerary and /generate-vacation for each variant on the stub
+backend. Its time to first token grows with prompt length at
+--prefill-tokens-per-second; context caching is off so each variant pays for
+its whole prompt. Exits non-zero if the compact prompts are
+not at least --min-saving smaller than the full ones.
+
+Usage: python -m benchmarks.prompt_variants [--requests 50] [--stub-latency 0.2]
+       [--prefill-tokens-per-second 2000] [--min-saving 0.3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+import httpx  # noqa: E402
+
+from app import llm, main  # noqa: E402
+from app.backends.stub import StubBackend  # noqa: E402
+from app.data import prompts  # noqa: E402
+
+from .api_suite import VACATION_PAYLOAD  # noqa: E402
+from .load_generation import TRIP_PAYLOAD  # noqa: E402
+
+VARIANTS = ("full", "compact")
+
+PIPELINES = {
+    "itinerary": (
+        "/generate-itinerary", TRIP_PAYLOAD, main.TripAnswers, main._sanitize_trip_answers,
+        # Only the system instruction differs between itinerary variants
+        prompts.trip_system_instruction, lambda answers, variant: prompts.create_trip_prompt(answers),
+    ),
+    "vacation": (
+        "/generate-vacation", VACATION_PAYLOAD, main.VacationAnswers, main._sanitize_vacation_answers,
+        prompts.vacation_system_instruction, prompts.create_vacation_prompt,
+    ),
+}
+
+
+def prompt_sizes(iterations: int) -> Dict[str, Any]:
+    sizes = {}
+    for pipeline, (_, payload, model, sanitize, system, build) in PIPELINES.items():
+        answers = sanitize(model(**payload))
+        for variant in VARIANTS:
+            instruction, prompt = system(variant), build(answers, variant)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                build(answers, variant)
+            sizes[f"{pipeline}/{variant}"] = {
+                "chars": len(instruction) + len(prompt),
+                "system_tokens": prompts.estimate_tokens(instruction),
+                "user_tokens": prompts.estimate_tokens(prompt),
+                "estimated_tokens": prompts.estimate_tokens(instruction) + prompts.estimate_tokens(prompt),
+                "build_us": round((time.perf_counter() - started) / iterations * 1e6, 2),
+            }
+    return sizes
+
+
+async def latencies(requests: int) -> Dict[str, Any]:
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=120) as client:
+        for pipeline, (path, payload, *_) in PIPELINES.items():
+            for variant in VARIANTS:
+                # The prompt builders read the module setting on every call
+                prompts.PROMPT_VARIANT = variant
+                samples: List[float] = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = await client.post(path, json=payload, params={"bypass_cache": "true"})
+                    response.raise_for_status()
+                    samples.append(time.perf_counter() - started)
+                samples.sort()
+                results[f"{pipeline}/{variant}"] = {
+                    "mean_ms": round(statistics.fmean(samples) * 1000, 1),
+                    "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+                    "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 1),
+                }
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="sequential requests per pipeline and variant")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--min-saving", type=float, default=0.3, help="required fraction of tokens saved by compact")
+    parser.add_argument("--build-iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    llm.backend = StubBackend(
+        latency=args.stub_latency,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        context_cache=False,
+        seed=0,
+    )
+    sizes = prompt_sizes(args.build_iterations)
+    timings = asyncio.run(latencies(args.requests))
+
+    savings = {
+        pipeline: round(1 - sizes[f"{pipeline}/compact"]["estimated_tokens"] / sizes[f"{pipeline}/full"]["estimated_tokens"], 3)
+        for pipeline in PIPELINES
+    }
+    print(json.dumps({
+        "config": vars(args),
+        "prompts": sizes,
+        "latency": timings,
+        "token_saving": savings,
+    }, indent=2))
+
+    failing = [pipeline for pipeline, saving in savings.items() if saving < args.min_saving]
+    if failing:
+        print(f"Compact prompts saved less than {args.min_saving:.0%} for: {', '.join(failing)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
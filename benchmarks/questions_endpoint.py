@@ -0,0 +1,97 @@
+"""
+Benchmark the precomputed /questions responses against the previous path.
+The previous path is mounted on the same app (same middleware) as a plain
+endpoint that returns the dict through `response_model=Dict[str, Any]`, so
+it is validated and serialized on every call. Requests are fed straight
+into the ASGI app, so the numbers are server cost per worker without the
+network or an HTTP client's parsing and decompression.
+
+Usage: python -m benchmarks.questions_endpoint [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+
+from app import main  # noqa: E402
+from app.data.questions import TRIP_QUESTIONS  # noqa: E402
+
+LEGACY_PATH = "/__bench__/legacy-questions"
+
+
+@main.app.get(LEGACY_PATH, response_model=Dict[str, Any], include_in_schema=False)
+async def legacy_questions():
+    return TRIP_QUESTIONS
+
+
+async def call(path: str, headers: List[Tuple[bytes, bytes]]) -> Tuple[int, int]:
+    """Run one GET through the ASGI app; returns (status, body bytes sent)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), *headers],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    status, size = 0, 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status, size
+
+
+async def measure(path: str, headers: Dict[str, str], requests: int) -> Dict[str, Any]:
+    raw = [(k.encode(), v.encode()) for k, v in headers.items()]
+    status, size = await call(path, raw)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(path, raw)
+    elapsed = time.perf_counter() - started
+    return {
+        "status": status,
+        "wire_bytes": size,
+        "requests_per_s": round(requests / elapsed, 1),
+        "per_request_us": round(elapsed / requests * 1e6, 1),
+    }
+
+
+async def run(requests: int) -> Dict[str, Any]:
+    identity = {"accept-encoding": "identity"}
+    compressed = {"accept-encoding": "gzip, br"}
+    etag = main.TRIP_QUESTIONS_RESPONSE.etag
+
+    results = {
+        "legacy": await measure(LEGACY_PATH, identity, requests),
+        "precomputed": await measure("/questions", identity, requests),
+        "precomputed_compressed": await measure("/questions", compressed, requests),
+        "not_modified": await measure("/questions", {**compressed, "if-none-match": etag}, requests),
+    }
+    base = results["legacy"]["requests_per_s"]
+    for result in results.values():
+        result["speedup"] = round(result["requests_per_s"] / base, 2)
+    return {"requests": requests, "results": results}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
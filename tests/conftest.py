@@ -0,0 +1,26 @@
+import os
+
+# Run the app offline on the stub backend, with nothing persisted to disk
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("STUB_LATENCY", "0")
+os.environ.setdefault("RESULT_CACHE_DB", "")
+os.environ.setdefault("JOBS_DB", "")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def trip_payload():
+    """A /generate-itinerary request the stub backend's canned itinerary fully covers"""
+    return {
+        "start_location": "New York City",
+        "destinations": "Paris, Rome",
+        "budget": "USD 100-200/day",
+        "travel_style": ["Cultural"],
+        "accommodation": ["Hotel"],
+        "interests": ["Food", "History"],
+        "group_size": "Couple",
+        "transportation": "Train",
+        "start_date": "2025-07-01",
+        "end_date": "2025-07-05",
+    }
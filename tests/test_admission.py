@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, Overloaded, speculative
+
+
+def controller(max_in_flight=1, max_queue=4, queue_timeout=1.0):
+    return AdmissionController("test", max_in_flight, max_queue, queue_timeout)
+
+
+def test_slots_are_handed_over_in_fifo_order():
+    admission = controller()
+    order = []
+
+    async def request(name):
+        async with admission.admit():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await admission.acquire()
+        tasks = []
+        for name in ("a", "b", "c"):
+            tasks.append(asyncio.create_task(request(name)))
+            await asyncio.sleep(0)
+        assert admission.queued == 3
+        admission.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["a", "b", "c"]
+    assert (admission.in_flight, admission.queued) == (0, 0)
+
+
+def test_timed_out_waiter_is_removed_without_leaking_a_slot():
+    admission = controller(queue_timeout=0.01)
+
+    async def scenario():
+        await admission.acquire()
+        with pytest.raises(Overloaded) as raised:
+            await admission.acquire()
+        assert raised.value.retry_after >= 1
+        assert (admission.in_flight, admission.queued) == (1, 0)
+
+        admission.release()
+        assert (admission.in_flight, admission.queued) == (0, 0)
+        # The slot is free again rather than handed to the timed-out waiter
+        await asyncio.wait_for(admission.acquire(), 0.1)
+        assert admission.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    admission = controller()
+
+    async def scenario():
+        await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert (admission.in_flight, admission.queued) == (1, 0)
+        admission.release()
+        assert admission.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    admission = controller()
+    admitted = []
+
+    async def request(name):
+        await admission.acquire()
+        admitted.append(name)
+        await asyncio.sleep(0.01)
+        admission.release()
+
+    async def scenario():
+        await admission.acquire()
+        first = asyncio.create_task(request("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request("second"))
+        await asyncio.sleep(0)
+
+        # The slot is handed to `first`, which is cancelled before it resumes
+        admission.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await second
+
+    asyncio.run(scenario())
+    assert admitted == ["second"]
+    assert (admission.in_flight, admission.queued) == (0, 0)
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    admission = controller(max_in_flight=2, max_queue=2)
+    admission._service_time = 4.0
+
+    async def scenario():
+        await admission.acquire()
+        await admission.acquire()
+        waiters = [asyncio.create_task(admission.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert admission.queued == 2
+
+        with pytest.raises(Overloaded) as raised:
+            await admission.acquire()
+        # Two queued plus this one, over two slots, at 4s each
+        assert raised.value.retry_after == 6
+        assert admission.queued == 2
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_speculative_work_leaves_headroom_and_never_queues():
+    admission = controller(max_in_flight=4)
+
+    async def scenario():
+        await admission.acquire()
+        with speculative(2):
+            # 1 in flight + this one leaves 2 free
+            await admission.acquire()
+            with pytest.raises(Overloaded):
+                await admission.acquire()
+        assert (admission.in_flight, admission.queued) == (2, 0)
+
+        # Real requests still get the headroom
+        await admission.acquire()
+        await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        admission.release()
+        await waiting
+        assert admission.in_flight == 4
+
+        for _ in range(4):
+            admission.release()
+        with speculative(2):
+            await admission.acquire()
+        assert admission.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_speculative_work_is_rejected_while_requests_are_queued():
+    admission = controller(max_in_flight=1)
+
+    async def scenario():
+        await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        admission.in_flight = 0
+        with speculative(0):
+            with pytest.raises(Overloaded):
+                await admission.acquire()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    asyncio.run(scenario())
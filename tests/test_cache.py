@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.cache import DiskCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "results.sqlite3"), ttl=3600, max_bytes=1024 * 1024)
+
+
+def accessed_at(cache, key):
+    return cache.db.connect().execute("SELECT accessed_at FROM results WHERE key = ?", (key,)).fetchone()[0]
+
+
+def age(cache, key, seconds):
+    cache.db.connect().execute("UPDATE results SET accessed_at = accessed_at - ? WHERE key = ?", (seconds, key))
+
+
+def test_recent_hits_do_not_write(cache):
+    cache.set("k", {"a": 1})
+    stored = accessed_at(cache, "k")
+    assert cache.get("k") == {"a": 1}
+    assert accessed_at(cache, "k") == stored
+
+
+def test_stale_hits_update_access_time(cache):
+    cache.set("k", {"a": 1})
+    age(cache, "k", DiskCache.TOUCH_INTERVAL + 1)
+    before = time.time()
+    assert cache.get("k") == {"a": 1}
+    assert accessed_at(cache, "k") >= before
+
+
+def test_hit_is_served_while_another_writer_holds_the_lock(cache):
+    cache.set("k", {"a": 1})
+    age(cache, "k", DiskCache.TOUCH_INTERVAL + 1)
+    stored = accessed_at(cache, "k")
+
+    writer = sqlite3.connect(cache.db.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        assert cache.get("k") == {"a": 1}
+        assert time.monotonic() - started < 1
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+    assert accessed_at(cache, "k") == stored
+
+
+def test_expired_entries_are_misses(cache):
+    cache.set("k", {"a": 1})
+    cache.db.connect().execute("UPDATE results SET expires_at = ?", (time.time() - 1,))
+    assert cache.get("k") is None
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import llm, main
+from app.backends.stub import StubBackend
+from app.chunking import missing_windows, stitch_days
+
+
+def days(first, last):
+    return [{"day_number": n} for n in range(first, last + 1)]
+
+
+def test_missing_windows():
+    windows = [((1, 7), days(1, 7)), ((8, 14), days(8, 12)), ((15, 20), None)]
+    assert missing_windows(windows) == [(8, 14), (15, 20)]
+    assert missing_windows([((1, 7), days(1, 7)), ((8, 10), days(8, 10))]) == []
+
+
+def test_stitch_days_needs_every_day():
+    assert stitch_days([((1, 3), days(1, 3)), ((4, 5), days(4, 5))], 5) == days(1, 5)
+    assert stitch_days([((1, 3), days(1, 3)), ((4, 5), days(4, 4))], 5) is None
+
+
+def record_windows(monkeypatch, fail):
+    """Wrap _generate_sections so day windows fail `fail(label, attempt)` and every call is recorded"""
+    calls = []
+    generate_sections = main._generate_sections
+
+    async def wrapped(prompt, schema, sections, label, budget=None, required=False):
+        calls.append((label, tuple(sections), budget))
+        if fail(label, sum(1 for call in calls if call[0] == label)):
+            return {}
+        return await generate_sections(prompt, schema, sections, label, budget, required)
+
+    monkeypatch.setattr(llm, "backend", StubBackend(latency=0, seed=0))
+    monkeypatch.setattr(main, "_generate_sections", wrapped)
+    return calls
+
+
+def long_trip(trip_payload):
+    return main._sanitize_trip_answers(main.TripAnswers(**{**trip_payload, "end_date": "2025-07-20"}))
+
+
+def test_only_the_failed_window_is_regenerated(monkeypatch, trip_payload):
+    calls = record_windows(monkeypatch, lambda label, attempt: label == "itinerary days 8-14" and attempt == 1)
+    answers = long_trip(trip_payload)
+
+    itinerary = asyncio.run(main._complete_itinerary(main.create_trip_prompt(answers), answers))
+
+    assert [day["day_number"] for day in itinerary["itinerary"]["daily_itinerary"]] == list(range(1, 21))
+    window_calls = [label for label, _, _ in calls if label.startswith("itinerary days")]
+    assert sorted(window_calls) == ["itinerary days 1-7", "itinerary days 15-20", "itinerary days 8-14", "itinerary days 8-14"]
+    retry = [budget for label, _, budget in calls if label == "itinerary days 8-14"][-1]
+    assert retry.pipeline == "itinerary_days" and retry.days == 7
+    assert not any("daily_itinerary" in sections for label, sections, _ in calls if label == "itinerary")
+
+
+def test_a_window_that_keeps_failing_fails_the_itinerary(monkeypatch, trip_payload):
+    calls = record_windows(monkeypatch, lambda label, attempt: label == "itinerary days 8-14")
+    answers = long_trip(trip_payload)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(main._complete_itinerary(main.create_trip_prompt(answers), answers))
+
+    assert raised.value.status_code == 500
+    # Never falls back to generating all twenty days in one call
+    assert not any("daily_itinerary" in sections for label, sections, _ in calls if label == "itinerary")
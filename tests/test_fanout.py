@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import main
+
+
+def test_core_failure_cancels_city_guides(monkeypatch, trip_payload):
+    cancelled = []
+
+    async def failing_core(sanitized_answers):
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=500, detail="core failed")
+
+    async def slow_guide(sanitized_answers, city):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(city)
+            raise
+
+    monkeypatch.setattr(main, "FANOUT_ENABLED", True)
+    monkeypatch.setattr(main, "_generate_core", failing_core)
+    monkeypatch.setattr(main, "_generate_city_guide", slow_guide)
+    answers = main._sanitize_trip_answers(main.TripAnswers(**trip_payload))
+
+    async def scenario():
+        with pytest.raises(HTTPException) as raised:
+            await main._sectioned_itinerary(answers, ["Paris", "Rome"], {})
+        assert raised.value.detail == "core failed"
+
+    asyncio.run(scenario())
+    assert sorted(cancelled) == ["Paris", "Rome"]
+
+
+def test_gather_or_cancel_keeps_order():
+    async def value(n, delay):
+        await asyncio.sleep(delay)
+        return n
+
+    assert asyncio.run(main._gather_or_cancel(value(1, 0.02), value(2, 0), value(3, 0.01))) == [1, 2, 3]
@@ -0,0 +1,26 @@
+from app.backends import gemini
+from app.budgets import budget_for
+
+
+def test_non_thinking_tier_is_capped():
+    budget = budget_for("itinerary", 30, 5)
+    config = gemini.call_config("gemini-2.0-flash-lite", budget)
+    assert config["max_output_tokens"] == min(budget.output_tokens, 8192)
+    assert "thinking_config" not in config
+
+
+def test_thinking_tier_is_capped_only_with_a_thinking_budget(monkeypatch):
+    budget = budget_for("itinerary", 5, 2)
+
+    monkeypatch.setattr(gemini, "_THINKING_CONFIG", True)
+    config = gemini.call_config("gemini-2.5-flash", budget)
+    assert config["max_output_tokens"] == budget.max_output_tokens
+    assert config["thinking_config"] == {"thinking_budget": budget.thinking_budget}
+
+    monkeypatch.setattr(gemini, "_THINKING_CONFIG", False)
+    config = gemini.call_config("gemini-2.5-flash", budget)
+    assert config == {"temperature": budget.temperature}
+
+
+def test_no_budget_keeps_model_defaults():
+    assert gemini.call_config("gemini-2.5-flash", None) is None
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from app import jobs
+from app.jobs import JobQueue, JobStore
+
+
+def make_store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def age(store, job_id, seconds):
+    store.db.connect().execute("UPDATE jobs SET updated_at = updated_at - ? WHERE id = ?", (seconds, job_id))
+
+
+def test_sweep_requeues_a_running_job_whose_heartbeat_stopped(tmp_path):
+    store = make_store(tmp_path)
+    orphan = store.create("itinerary", {})
+    alive = store.create("itinerary", {})
+    store.claim(orphan)
+    store.claim(alive)
+    age(store, orphan, jobs.JOB_STALE_AFTER + 1)
+    age(store, alive, jobs.JOB_STALE_AFTER + 1)
+    store.touch(alive)
+
+    assert store.sweep() == [orphan]
+    assert store.get(orphan)["status"] == jobs.QUEUED
+    assert store.get(alive)["status"] == jobs.RUNNING
+    # Another worker sweeping at the same time doesn't pick it up again
+    assert store.sweep() == []
+
+
+def test_sweep_picks_up_jobs_nobody_claimed(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.create("itinerary", {})
+    assert store.sweep() == []
+    age(store, job_id, jobs.JOB_STALE_AFTER + 1)
+    assert store.sweep() == [job_id]
+
+
+def test_touch_ignores_finished_jobs(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.create("itinerary", {})
+    store.claim(job_id)
+    store.finish(job_id, {"ok": True})
+    finished_at = store.get(job_id)["updated_at"]
+    store.touch(job_id)
+    assert store.get(job_id)["updated_at"] == finished_at
+
+
+def test_running_job_heartbeats_and_orphans_are_rerun(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT", 0.01)
+    store = make_store(tmp_path)
+    queue = JobQueue(store, workers=1, max_pending=10)
+    heartbeats = []
+
+    async def runner(payload):
+        started = time.time()
+        await asyncio.sleep(0.05)
+        running = store.db.connect().execute("SELECT updated_at FROM jobs WHERE status = ?", (jobs.RUNNING,)).fetchall()
+        heartbeats.extend(updated_at > started for (updated_at,) in running)
+        return {"done": payload["name"]}
+
+    queue.register("itinerary", runner)
+
+    async def scenario():
+        await queue.start()
+        try:
+            # A job left running by another worker that has since died
+            orphan = store.create("itinerary", {"name": "orphan"})
+            store.claim(orphan)
+            age(store, orphan, jobs.JOB_STALE_AFTER + 1)
+            job_id = await queue.submit("itinerary", {"name": "fresh"})
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline:
+                if all(store.get(j)["status"] == jobs.SUCCEEDED for j in (job_id, orphan)):
+                    break
+                await asyncio.sleep(0.01)
+            return job_id, orphan
+        finally:
+            await queue.stop()
+
+    job_id, orphan = asyncio.run(scenario())
+    assert store.get(job_id)["result"] == {"done": "fresh"}
+    assert store.get(orphan)["result"] == {"done": "orphan"}
+    assert heartbeats and all(heartbeats)
@@ -0,0 +1,81 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from app.json_repair import invalid_sections, repair_json
+
+
+class Place(BaseModel):
+    name: str
+    rating: float
+
+
+class Guide(BaseModel):
+    summary: str
+    places: List[Place]
+    tips: List[str]
+
+
+def test_valid_json_is_unchanged():
+    assert repair_json('{"a": 1, "b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+
+
+def test_strips_code_fences_and_prose():
+    text = 'Here you go:\n```json\n{"a": 1}\n```'
+    assert repair_json(text) == {"a": 1}
+
+
+def test_trailing_commas():
+    assert repair_json('{"a": [1, 2,], "b": {"c": 3,},}') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_unquoted_keys():
+    assert repair_json('{summary: "Paris", day_count: 3}') == {"summary": "Paris", "day_count": 3}
+
+
+def test_comments_are_dropped():
+    text = '{\n  "a": 1, # the first\n  "b": 2 # the second\n}'
+    assert repair_json(text) == {"a": 1, "b": 2}
+
+
+def test_hash_inside_string_is_kept():
+    assert repair_json('{"tip": "Take bus #42", "room": "#3",}') == {"tip": "Take bus #42", "room": "#3"}
+
+
+def test_raw_newline_inside_string():
+    assert repair_json('{"a": "line one\nline two"}') == {"a": "line one\nline two"}
+
+
+def test_truncated_output_keeps_complete_values():
+    text = '{"summary": "Trip", "tips": ["one", "two", "thr'
+    assert repair_json(text) == {"summary": "Trip", "tips": ["one", "two"]}
+
+
+def test_truncated_inside_key_drops_the_entry():
+    text = '{"summary": "Trip", "places": [{"name": "Cafe", "rati'
+    assert repair_json(text) == {"summary": "Trip", "places": [{"name": "Cafe"}]}
+
+
+def test_hopeless_input():
+    assert repair_json("no json here") is None
+
+
+def test_invalid_sections_valid():
+    data = {"summary": "Trip", "places": [{"name": "Cafe", "rating": 4.5}], "tips": []}
+    assert invalid_sections(data, Guide) == []
+
+
+def test_invalid_sections_reports_missing_and_invalid_fields():
+    data = {"summary": "Trip", "places": [{"name": "Cafe"}]}
+    assert invalid_sections(data, Guide) == ["places", "tips"]
+
+
+def test_invalid_sections_of_truncated_output():
+    data = repair_json('{"summary": "Trip", "places": [{"name": "Cafe", "rating": 4.5}], "tips": ["Go ea')
+    assert invalid_sections(data, Guide) == ["tips"]
+    data = repair_json('{"summary": "Trip", "places": [{"name": "Cafe", "rati')
+    assert invalid_sections(data, Guide) == ["places", "tips"]
+
+
+def test_invalid_sections_of_non_object():
+    assert invalid_sections(["not", "an", "object"], Guide) == ["summary", "places", "tips"]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app import llm
+from app.budgets import budget_for
+from app.resilience import CircuitBreaker, DeadlineExceeded, deadline
+
+
+class Response:
+    text = "{}"
+
+
+class SlowBackend:
+    """Sleeps for the number of seconds given as the prompt and records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model_name, prompt, schema, system, budget):
+        self.calls.append(prompt)
+        await asyncio.sleep(float(prompt))
+        return Response()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = SlowBackend()
+    monkeypatch.setattr(llm, "backend", fake)
+    monkeypatch.setattr(llm, "GEMINI_HEDGE", True)
+    monkeypatch.setattr(llm, "GEMINI_HEDGE_AFTER", 0.05)
+    monkeypatch.setattr(llm, "primary_latency", {})
+    monkeypatch.setattr(llm, "primary_breaker", CircuitBreaker("test", window=10, min_calls=10, error_rate=0.5, cooldown=30))
+    return fake
+
+
+def slots(monkeypatch, n):
+    monkeypatch.setattr(llm, "_semaphore", None)
+    monkeypatch.setattr(llm, "MAX_CONCURRENCY", n)
+
+
+def test_slow_call_is_hedged_when_a_slot_is_free(monkeypatch, backend):
+    slots(monkeypatch, 4)
+    asyncio.run(llm.generate_content("0.15"))
+    assert backend.calls == ["0.15", "0.15"]
+
+
+def test_hedge_clock_starts_once_the_call_holds_a_slot(monkeypatch, backend):
+    slots(monkeypatch, 1)
+
+    async def scenario():
+        holder = asyncio.create_task(llm.generate_content("0.1"))
+        await asyncio.sleep(0)
+        # Queued for longer than the hedge delay, then quick once running
+        await llm.generate_content("0.01")
+        await holder
+
+    asyncio.run(scenario())
+    assert backend.calls == ["0.1", "0.01"]
+
+
+def test_no_hedge_while_every_slot_is_taken(monkeypatch, backend):
+    slots(monkeypatch, 2)
+
+    async def scenario():
+        await asyncio.gather(llm.generate_content("0.15"), llm.generate_content("0.15"))
+
+    asyncio.run(scenario())
+    assert backend.calls == ["0.15", "0.15"]
+
+
+def test_waiting_for_a_slot_does_not_trip_the_breaker(monkeypatch, backend):
+    slots(monkeypatch, 1)
+    monkeypatch.setattr(llm, "GEMINI_HEDGE", False)
+
+    async def scenario():
+        holder = asyncio.create_task(llm.generate_content("0.2"))
+        await asyncio.sleep(0)
+        with deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await llm.generate_content("0.01")
+        await holder
+
+    asyncio.run(scenario())
+    assert backend.calls == ["0.2"]
+    assert list(llm.primary_breaker._outcomes) == [True]
+
+
+def test_upstream_timeout_trips_the_breaker(monkeypatch, backend):
+    slots(monkeypatch, 1)
+    monkeypatch.setattr(llm, "GEMINI_HEDGE", False)
+    monkeypatch.setattr(llm, "GEMINI_TIMEOUT", 0.02)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(llm.generate_content("0.1"))
+    assert list(llm.primary_breaker._outcomes) == [False]
+
+
+def test_hedge_delay_is_tracked_per_pipeline(backend):
+    city = budget_for("city_guide", 5, 1)
+    days = budget_for("itinerary_days", 7, 2)
+    for _ in range(20):
+        llm._latency_for(city).record(1.0)
+        llm._latency_for(days).record(8.0)
+    assert llm.hedge_delay(city) == 1.0
+    assert llm.hedge_delay(days) == 8.0
+    assert llm.hedge_delay() == llm.GEMINI_HEDGE_AFTER
@@ -0,0 +1,49 @@
+import asyncio
+
+from app.admission import AdmissionController
+from app.prefetch import Prefetcher
+
+
+def prefetcher(admission):
+    return Prefetcher(admission, enabled=True, top=2, min_score=80, concurrency=2, tokens_per_hour=100000)
+
+
+def test_prefetch_needs_headroom_beyond_its_own_slots():
+    admission = AdmissionController("test", max_in_flight=4, max_queue=4, queue_timeout=1.0)
+    ran = []
+
+    async def run():
+        async with admission.admit():
+            ran.append(admission.in_flight)
+        return "MISS"
+
+    async def scenario():
+        prefetch = prefetcher(admission)
+        admission.in_flight = 2
+        assert not prefetch.schedule("busy", 100, run)
+
+        admission.in_flight = 1
+        assert prefetch.schedule("free", 100, run)
+        await asyncio.gather(*prefetch._tasks)
+
+    asyncio.run(scenario())
+    assert ran == [2]
+
+
+def test_prefetch_that_lost_its_headroom_is_dropped_and_refunded():
+    admission = AdmissionController("test", max_in_flight=4, max_queue=4, queue_timeout=1.0)
+
+    async def run():
+        async with admission.admit():
+            raise AssertionError("should not be admitted")
+
+    async def scenario():
+        prefetch = prefetcher(admission)
+        assert prefetch.schedule("late", 100, run)
+        # Real requests take the capacity before the prefetch reaches admission
+        admission.in_flight = 3
+        await asyncio.gather(*prefetch._tasks)
+        assert admission.queued == 0
+        assert prefetch.spent() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app import llm, main
+from app.backends.stub import StubBackend
+from app.cache import get_cached_result, make_cache_key, result_cache
+from app.singleflight import SingleFlight
+
+
+def test_waiters_share_one_call():
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*[flight.do("key", fn) for _ in range(3)])
+        assert results == ["result"] * 3
+        assert calls == [1]
+        assert len(flight) == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", fn))
+        second = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+
+
+def test_shared_call_completes_when_every_waiter_is_cancelled():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        finished = []
+
+        async def fn():
+            await release.wait()
+            finished.append("result")
+            return "result"
+
+        waiters = [asyncio.create_task(flight.do("key", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert finished == ["result"]
+        assert len(flight) == 0
+
+    asyncio.run(run())
+
+
+def test_exception_reaches_every_waiter_and_releases_the_key():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(flight) == 0
+
+        async def succeed():
+            return "retried"
+
+        assert await flight.do("key", succeed) == "retried"
+
+    asyncio.run(run())
+
+
+def test_generation_is_cached_after_every_waiter_is_cancelled(monkeypatch, trip_payload):
+    monkeypatch.setattr(llm, "backend", StubBackend(latency=0.05, seed=0))
+    trip_payload["special_requirements"] = "Cancelled waiters"
+    answers = main._sanitize_trip_answers(main.TripAnswers(**trip_payload))
+    cache_key = make_cache_key("itinerary", answers)
+    result_cache.pop(cache_key, None)
+
+    async def run():
+        waiters = [asyncio.create_task(main._generate_itinerary(answers, cache_key)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        while len(main.generation_flight):
+            await asyncio.sleep(0.01)
+        return await get_cached_result(cache_key)
+
+    cached = asyncio.run(run())
+    assert cached is not None
+    assert cached["itinerary"]["destinations"]
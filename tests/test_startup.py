@@ -0,0 +1,14 @@
+from fastapi.testclient import TestClient
+
+from app import llm, main
+from app.backends.gemini import GeminiBackend
+
+
+def test_app_starts_without_an_api_key(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_APPLICATION_CREDENTIALS", raising=False)
+    monkeypatch.setattr(main, "GEMINI_API_KEY", None)
+    monkeypatch.setattr(llm, "backend", GeminiBackend([llm.GEMINI_MODEL], transport="grpc", context_cache=True))
+
+    with TestClient(main.app) as client:
+        assert client.get("/questions").status_code == 200
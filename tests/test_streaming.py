@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from app import llm, main
+from app.backends.stub import StubBackend
+from app.cache import get_cached_result, make_cache_key, result_cache
+from app.streaming import IncrementalJSONParser, itinerary_event, want_itinerary_section
+
+DOCUMENT = {
+    "itinerary": {
+        "summary": 'A "quoted" {brace} [bracket] trip \\ with escapes\nand newlines',
+        "daily_itinerary": [
+            {"day": 1, "title": "Arrive }]{[", "done": True, "cost": 12.5},
+            {"day": 2, "title": "Museums", "done": False, "cost": None},
+        ],
+        "hidden_gems": ["Café ☕", "Rooftop, \"secret\""],
+    }
+}
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalJSONParser(want_itinerary_section)
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, [itinerary_event(path, value) for path, value in events]
+
+
+EXPECTED = [
+    ("summary", DOCUMENT["itinerary"]["summary"]),
+    ("day", DOCUMENT["itinerary"]["daily_itinerary"][0]),
+    ("day", DOCUMENT["itinerary"]["daily_itinerary"][1]),
+    ("hidden_gems", DOCUMENT["itinerary"]["hidden_gems"]),
+]
+
+
+def test_any_chunk_boundary_gives_the_same_events():
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    for size in range(1, 40):
+        parser, events = feed_in_chunks(text, size)
+        assert events == EXPECTED, size
+        assert parser.text == text
+
+
+def test_split_scalar_literals():
+    text = '{"a": true, "b": false, "c": null, "d": -12.5e1}'
+    parser = IncrementalJSONParser(lambda path: True)
+    events = []
+    for c in text:
+        events.extend(parser.feed(c))
+    assert events == [(("a",), True), (("b",), False), (("c",), None), (("d",), -125.0)]
+
+
+def test_code_fence_and_trailing_text_are_ignored():
+    text = "```json\n" + json.dumps(DOCUMENT) + "\n```\nEnjoy {your} trip!"
+    _, events = feed_in_chunks(text, 7)
+    assert events == EXPECTED
+
+
+def test_unwrapped_root_object():
+    text = json.dumps(DOCUMENT["itinerary"])
+    _, events = feed_in_chunks(text, 5)
+    assert events == EXPECTED
+
+
+def test_truncated_input_emits_only_complete_values():
+    text = json.dumps(DOCUMENT)
+    cut = text.index('"Museums"') + 4
+    _, events = feed_in_chunks(text[:cut], 3)
+    assert events == EXPECTED[:2]
+
+
+async def _collect(events):
+    return [frame async for frame in events if frame is not None]
+
+
+def test_incomplete_stream_sends_error_and_caches_nothing(monkeypatch, trip_payload):
+    # Every response is cut off part way, like one that ran out of output tokens
+    monkeypatch.setattr(llm, "backend", StubBackend(latency=0, malformed_rate=1.0, seed=0))
+    trip_payload["special_requirements"] = "Truncated stream"
+    answers = main._sanitize_trip_answers(main.TripAnswers(**trip_payload))
+    cache_key = make_cache_key("itinerary", answers)
+    result_cache.pop(cache_key, None)
+
+    frames = asyncio.run(_collect(main._itinerary_events(answers, cache_key, None)))
+
+    assert frames[-1].startswith("event: error\n")
+    assert not any(frame.startswith("event: done\n") for frame in frames)
+    assert asyncio.run(get_cached_result(cache_key)) is None
+
+
+def test_complete_stream_is_cached(monkeypatch, trip_payload):
+    monkeypatch.setattr(llm, "backend", StubBackend(latency=0, seed=0))
+    trip_payload["special_requirements"] = "Complete stream"
+    answers = main._sanitize_trip_answers(main.TripAnswers(**trip_payload))
+    cache_key = make_cache_key("itinerary", answers)
+    result_cache.pop(cache_key, None)
+
+    frames = asyncio.run(_collect(main._itinerary_events(answers, cache_key, None)))
+
+    assert frames[-1].startswith("event: done\n")
+    cached = asyncio.run(get_cached_result(cache_key))
+    assert set(cached) == {"itinerary"}
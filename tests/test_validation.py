@@ -0,0 +1,46 @@
+import copy
+import json
+
+from app import main
+from app.chunking import complete_days
+from app.data.samples import SAMPLE_ITINERARY
+from app.json_repair import repair_json
+
+
+def sanitized(trip_payload, **changes):
+    return main._sanitize_trip_answers(main.TripAnswers(**{**trip_payload, **changes}))
+
+
+def test_complete_days():
+    days = [{"day_number": n} for n in range(1, 6)]
+    assert complete_days(days, 5)
+    assert not complete_days(days[:4], 5)
+    assert not complete_days(days + [{"day_number": 6}], 5)
+    assert not complete_days([days[0], days[2], days[1], days[3], days[4]], 5)
+    # Trips without dates can't be checked
+    assert complete_days(days[:2], 0)
+
+
+def test_sample_itinerary_is_complete(trip_payload):
+    assert main._invalid_itinerary_sections(copy.deepcopy(SAMPLE_ITINERARY), sanitized(trip_payload)) == []
+
+
+def test_missing_days_are_invalid(trip_payload):
+    # Five sample days for a ten-day trip
+    answers = sanitized(trip_payload, end_date="2025-07-10")
+    assert main._invalid_itinerary_sections(copy.deepcopy(SAMPLE_ITINERARY), answers) == ["daily_itinerary"]
+
+
+def test_destination_without_recommendations_is_invalid(trip_payload):
+    answers = sanitized(trip_payload, destinations="Paris, Rome, Florence")
+    assert main._invalid_itinerary_sections(copy.deepcopy(SAMPLE_ITINERARY), answers) == ["accommodation", "dining"]
+
+
+def test_truncated_output_is_invalid_after_repair(trip_payload):
+    text = json.dumps({"itinerary": SAMPLE_ITINERARY})
+    # Cut off part way through the third day
+    cut = text.index('"day_number": 3') + 5
+    repaired = repair_json(text[:cut])["itinerary"]
+    invalid = main._invalid_itinerary_sections(repaired, sanitized(trip_payload))
+    assert "daily_itinerary" in invalid
+    assert {"accommodation", "dining", "hidden_gems", "estimated_costs"} <= set(invalid)